@@ -9,20 +9,24 @@ import atexit
 import sys
 import gc
 import psutil
-import requests
 from packaging import version
 from dotenv import load_dotenv
 
 # Import our modules
 from lazy_config import LazyConfig
+from http_client import HttpClient
 from memory_manager import MemoryManager
 from update_manager import UpdateManager
+from event_bus import EventBus
+from metrics import Metrics
+from tracing import Tracer
 from utils import SharedUtils
 import routes
 
 # Global variables for tunnel functionality - define them at module level
 tunnel_process = None
 tunnel_url = None
+shutdown_started = False
 
 # Setup basic logging
 def setup_basic_logging():
@@ -45,9 +49,23 @@ app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_DEBUG') if os.getenv('FLASK_DEBUG') else os.urandom(24)
 
 CONFIG = LazyConfig()
+CONFIG.start()  # Picks up .env edits without a restart
+metrics = Metrics(CONFIG)
+metrics.instrument(app)
+tracer = Tracer(CONFIG)
+tracer.instrument(app)
+http_client = HttpClient(CONFIG, metrics)
 memory_manager = MemoryManager(CONFIG)
-update_manager = UpdateManager(CONFIG)
-utils = SharedUtils(CONFIG)
+events = EventBus(CONFIG)
+update_manager = UpdateManager(CONFIG, http_client, events)
+utils = SharedUtils(CONFIG, http_client, events, metrics, tracer)
+
+# Caches the memory governor may shrink, lowest priority first; the library index is only reported
+memory_manager.register('library_views', utils.library_pager, 10)
+memory_manager.register('tmdb', utils.tmdb_cache, 20)
+memory_manager.register('search', utils.search_cache, 30)
+memory_manager.register('trending', utils.trending, 40)
+memory_manager.register('library_index', utils.library_index, 90)
 
 # ============ TUNNEL AND NETWORK FUNCTIONS ============
 
@@ -155,6 +173,7 @@ def start_pinggy_tunnel():
                 print(f"✅ Pinggy Pro tunnel started successfully!")
                 print(f"   🌐 Public URL: {tunnel_url}")                
                 logging.info(f"Pinggy Pro tunnel started: {tunnel_url}")
+                events.publish('tunnel', get_network_info())
             else:
                 raise Exception("No tunnel URLs received")
             
@@ -162,6 +181,7 @@ def start_pinggy_tunnel():
             print(f"\n❌ Tunnel failed: {e}")
             logging.error(f"Tunnel failed: {str(e)}")
             tunnel_url = None
+            events.publish('tunnel', get_network_info())
     
     # Start tunnel in separate thread
     print("🧵 Starting tunnel thread...")
@@ -183,6 +203,7 @@ def cleanup_tunnel():
                     print(f"Warning: Error closing tunnel gracefully: {e}")
             tunnel_process = None
             tunnel_url = None
+            events.publish('tunnel', get_network_info())
         except Exception as e:
             print(f"Warning: Error during tunnel cleanup: {e}")
             logging.warning(f"Error during tunnel cleanup: {str(e)}")
@@ -244,7 +265,7 @@ def perform_immediate_update_check():
         print("🔍 Checking for updates...")
         
         # Force config reload to get latest version
-        CONFIG._reload_config()
+        CONFIG.reload()
         
         # Check for updates synchronously
         update_info = update_manager._check_github_for_updates()
@@ -309,6 +330,16 @@ def restart_application():
         except:
             pass
             
+        try:
+            utils.library_index.stop()
+        except:
+            pass
+            
+        try:
+            utils.trending.stop()
+        except:
+            pass
+            
         try:
             cleanup_tunnel()
         except:
@@ -385,21 +416,16 @@ routes.init_routes(
     debug_decorator=conditional_debug_log,
     shared_utils=utils,
     network_info_func=get_network_info,
-    update_manager=update_manager
+    update_manager=update_manager,
+    memory_manager=memory_manager
 )
 
 # ============ STARTUP AND SHUTDOWN ============
 
-def startup_sequence():
+def run_startup_checks():
+    """Apply pending updates and open the tunnel; returns False if the app is restarting"""
     global tunnel_url  # Add this line to access the global variable
     
-    import gc
-    gc.collect()
-    
-    # Only run in the main process, not the reloader process
-    if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
-        return
-        
     # Check for updates FIRST before anything else
     if CONFIG.update.enabled:
         print("🔧 Checking for updates...")
@@ -408,7 +434,7 @@ def startup_sequence():
             # If update was applied, we need to restart
             print("🔄 Update applied. Restarting application...")
             restart_application()
-            return  # Don't continue if we're restarting
+            return False  # Don't continue if we're restarting
 
     # Only continue if no update was applied
     # Start tunnel if enabled
@@ -424,15 +450,36 @@ def startup_sequence():
             time.sleep(1)
             print(".", end="", flush=True)
         print()  # New line after progress dots
-
     
+    return True
+
+def start_background_services():
+    """Start the background managers; must run in exactly one serving process"""
     # Start update manager if enabled (background checks)
     if CONFIG.update.enabled:
         update_manager.start()
     
-    # Start memory manager
+    # Keep the Radarr/Sonarr library index and TMDB trending lists warm in the background
+    utils.library_index.start()
+    utils.trending.start()
+
+def startup_sequence():
+    import gc
+    gc.collect()
+    
+    # With the reloader on, only the serving child runs this, not the watching parent;
+    # without it there is no child and WERKZEUG_RUN_MAIN is never set
+    if CONFIG.app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    
+    # The memory governor runs in every serving process, whatever the startup checks decide
     memory_manager.start()
     
+    if not run_startup_checks():
+        return
+    
+    start_background_services()
+    
     # Print welcome message
     print_welcome()
 
@@ -441,7 +488,12 @@ def startup_sequence():
     #     print_welcome()
 
 def shutdown_sequence():
-    global tunnel_process  # Add this line to access the global variable
+    global tunnel_process, shutdown_started  # Add this line to access the global variable
+    
+    # Reached from signal handlers, server hooks and atexit; only run once
+    if shutdown_started:
+        return
+    shutdown_started = True
     
     logging.info("Shutting down application...")
     
@@ -458,11 +510,46 @@ def shutdown_sequence():
     except Exception as e:
         logging.warning(f"Error stopping memory manager: {e}")
     
+    try:
+        utils.library_index.stop()
+    except Exception as e:
+        logging.warning(f"Error stopping library index: {e}")
+    
+    try:
+        utils.trending.stop()
+    except Exception as e:
+        logging.warning(f"Error stopping trending prefetcher: {e}")
+    
     try:
         cleanup_tunnel()
     except Exception as e:
         logging.warning(f"Error during tunnel cleanup: {e}")
     
+    try:
+        events.stop()
+    except Exception as e:
+        logging.warning(f"Error closing event streams: {e}")
+    
+    try:
+        metrics.stop()
+    except Exception as e:
+        logging.warning(f"Error stopping metrics publisher: {e}")
+    
+    try:
+        CONFIG.stop()
+    except Exception as e:
+        logging.warning(f"Error stopping config watcher: {e}")
+    
+    try:
+        utils.shutdown()
+    except Exception as e:
+        logging.warning(f"Error stopping upstream workers: {e}")
+    
+    try:
+        http_client.close()
+    except Exception as e:
+        logging.warning(f"Error closing HTTP sessions: {e}")
+    
     logging.info("Shutdown complete")
 
 atexit.register(shutdown_sequence)
@@ -0,0 +1,229 @@
+"""Measure Addarr's main routes against stand-in Radarr, Sonarr, TMDB and GitHub.
+
+For each library size the stand-ins are started with a generated library and
+a copy of Addarr is pointed at them. Every endpoint is then measured in two
+ways:
+
+  test-client  sequential requests through Flask's test client, in a fresh
+               process: the cost of Addarr's own code, without a network
+  http         concurrent requests to `python wsgi.py`, as deployed
+
+Each endpoint is warmed up first, so the numbers describe a running server
+with its library index loaded. The JSON report keeps the settings it was
+produced with; pass an earlier report to --compare to see what changed.
+
+    python benchmarks/endpoints.py [--sizes 1000,10000,50000] [--latency 20]
+                                   [--requests 200] [--concurrency 8]
+                                   [--output report.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import (ENDPOINTS, AddarrServer, change, free_port, git_commit, load_report,
+                     prepare_sandbox, request_for, summarize, write_report)
+from stand_ins import StandIns
+
+TRANSPORTS = ('test-client', 'http')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# ============ TEST CLIENT ============
+
+def measure_test_client(sandbox, counts, args):
+    """Run the test-client pass in a fresh interpreter importing the sandboxed app"""
+    output = os.path.join(sandbox, 'test-client.json')
+    subprocess.run([
+        sys.executable, os.path.abspath(__file__), '--child', sandbox, '--child-output', output,
+        '--child-counts', json.dumps(counts),
+        '--requests', str(args.requests), '--warmup', str(args.warmup),
+        '--endpoints', ','.join(args.endpoints)
+    ], check=True)
+    with open(output) as f:
+        return json.load(f)
+
+def run_child(args):
+    sys.path.insert(0, args.child)
+    os.chdir(args.child)
+    import app as addarr
+
+    counts = json.loads(args.child_counts)
+    client = addarr.app.test_client()
+    results = {}
+    for endpoint in args.endpoints:
+        for n in range(args.warmup):
+            _test_client_request(client, *request_for(endpoint, 100000 + n, counts))
+
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for n in range(args.requests):
+            start = time.perf_counter()
+            status = _test_client_request(client, *request_for(endpoint, n, counts))
+            latencies.append(time.perf_counter() - start)
+            errors += status >= 400
+        results[endpoint] = summarize(latencies, errors, time.perf_counter() - started)
+
+    with open(args.child_output, 'w') as f:
+        json.dump(results, f)
+    addarr.shutdown_sequence()
+
+def _test_client_request(client, method, path, data):
+    response = client.open(path, method=method, data=data)
+    # Streamed responses are only produced while they are read
+    response.get_data()
+    status = response.status_code
+    response.close()
+    return status
+
+# ============ HTTP ============
+
+def measure_http(sandbox, counts, args):
+    results = {}
+    with AddarrServer(sandbox, args.port) as server:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            sessions = {}
+
+            def send(request):
+                session = sessions.setdefault(threading.get_ident(), requests.Session())
+                method, path, data = request
+                start = time.perf_counter()
+                try:
+                    response = session.request(method, f"{server.url}{path}", data=data, timeout=120)
+                    failed = response.status_code >= 400
+                except requests.RequestException:
+                    failed = True
+                return time.perf_counter() - start, failed
+
+            for endpoint in args.endpoints:
+                list(pool.map(send, [request_for(endpoint, 100000 + n, counts) for n in range(args.warmup)]))
+
+                started = time.perf_counter()
+                outcomes = list(pool.map(send, [request_for(endpoint, n, counts) for n in range(args.requests)]))
+                elapsed = time.perf_counter() - started
+                results[endpoint] = summarize(
+                    [latency for latency, _ in outcomes],
+                    sum(failed for _, failed in outcomes),
+                    elapsed
+                )
+    return results
+
+# ============ REPORT ============
+
+def print_report(report, previous=None):
+    previous_results = (previous or {}).get('results', {})
+    if previous and previous.get('settings') != report['settings']:
+        print("⚠️ The previous report was produced with different settings:")
+        for key, value in report['settings'].items():
+            if previous.get('settings', {}).get(key) != value:
+                print(f"   {key}: {previous['settings'].get(key)} -> {value}")
+
+    header = f"| {'items':>6} | {'transport':<11} | {'endpoint':<20} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'req/s':>7} | errors |"
+    if previous:
+        header += " Δp50    | Δp95    | Δreq/s  |"
+    print(header)
+    print(re.sub(r'[^|]', '-', header))
+
+    for size, transports in report['results'].items():
+        for transport, endpoints in transports.items():
+            if 'error' in endpoints:
+                print(f"| {size:>6} | {transport:<11} | {'failed: ' + endpoints['error'][:60]} |")
+                continue
+            for endpoint, stats in endpoints.items():
+                line = (f"| {size:>6} | {transport:<11} | {endpoint:<20} | {stats['p50_ms']:>8.1f} | "
+                        f"{stats['p95_ms']:>8.1f} | {stats['p99_ms']:>8.1f} | {stats['rps']:>7.1f} | {stats['errors']:>6} |")
+                if previous:
+                    old = previous_results.get(size, {}).get(transport, {}).get(endpoint, {})
+                    line += (f" {change(stats['p50_ms'], old.get('p50_ms')):<7} | {change(stats['p95_ms'], old.get('p95_ms')):<7} |"
+                             f" {change(stats['rps'], old.get('rps')):<7} |")
+                print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,50000', help='library sizes, comma separated')
+    parser.add_argument('--latency', type=float, default=20, help='milliseconds every stand-in response takes')
+    parser.add_argument('--jitter', type=float, default=0, help='extra random stand-in milliseconds, up to this many')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per endpoint first')
+    parser.add_argument('--concurrency', type=int, default=8, help='parallel clients over HTTP')
+    parser.add_argument('--workers', type=int, default=2, help='SERVER_WORKERS for the HTTP pass')
+    parser.add_argument('--threads', type=int, default=4, help='SERVER_THREADS for the HTTP pass')
+    parser.add_argument('--transports', default=','.join(TRANSPORTS))
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--output', help='report path (default: benchmarks/results/endpoints-<time>.json)')
+    parser.add_argument('--compare', help='earlier report to compare against')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--child-output', help=argparse.SUPPRESS)
+    parser.add_argument('--child-counts', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.endpoints = [endpoint.strip() for endpoint in args.endpoints.split(',') if endpoint.strip()]
+
+    if args.child:
+        run_child(args)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    transports = [transport.strip() for transport in args.transports.split(',')]
+    previous = load_report(args.compare) if args.compare else None
+    output = args.output or os.path.join(RESULTS_DIR, f"endpoints-{datetime.now():%Y%m%d-%H%M%S}.json")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'latency_ms': args.latency, 'jitter_ms': args.jitter, 'requests': args.requests,
+            'warmup': args.warmup, 'concurrency': args.concurrency,
+            'workers': args.workers, 'threads': args.threads
+        },
+        'results': {},
+        'upstream_requests': {}
+    }
+
+    for size in sizes:
+        print(f"📚 {size} library items: starting stand-ins...")
+        results = report['results'][str(size)] = {}
+        with StandIns(size, args.latency / 1000, args.jitter / 1000) as stand_ins, \
+                tempfile.TemporaryDirectory(prefix='addarr-bench-') as directory:
+            args.port = free_port()
+            sandbox = prepare_sandbox(directory, dict(
+                stand_ins.env(),
+                SERVER_PORT=args.port,
+                SERVER_WORKERS=args.workers,
+                SERVER_THREADS=args.threads
+            ))
+
+            for transport in transports:
+                print(f"   ⏱️ {transport}...")
+                hits_before = sum(stand_ins.hits().values())
+                try:
+                    if transport == 'test-client':
+                        results[transport] = measure_test_client(sandbox, stand_ins.library.counts, args)
+                    else:
+                        results[transport] = measure_http(sandbox, stand_ins.library.counts, args)
+                except (RuntimeError, subprocess.CalledProcessError) as e:
+                    results[transport] = {'error': str(e)}
+                    continue
+                # Requests Addarr made to the stand-ins, warm-up included
+                report['upstream_requests'].setdefault(str(size), {})[transport] = (
+                    sum(stand_ins.hits().values()) - hits_before
+                )
+
+    write_report(output, report)
+    print_report(report, previous)
+    print(f"📄 Report written to {output}")
+
+if __name__ == '__main__':
+    main()
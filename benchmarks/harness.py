@@ -0,0 +1,197 @@
+"""Shared pieces of the benchmark scripts: an isolated Addarr copy, a served
+instance of it, the request mix per endpoint and latency statistics."""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import signal
+import socket
+import subprocess
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Everything a run could write or read besides the application itself
+SANDBOX_IGNORE = shutil.ignore_patterns(
+    '.git', '__pycache__', 'benchmarks', 'cache', 'updates', 'backups', 'venv', '.venv',
+    '.env', '.env.*', '*.log', 'requests.jsonl', 'last_ip.txt'
+)
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def prepare_sandbox(directory, settings):
+    """Copy Addarr into `directory` with a .env built from `settings`.
+
+    The copy finds its own .env first, so a local install's settings, caches
+    and update state are neither used nor touched by a run.
+    """
+    target = os.path.join(directory, 'addarr')
+    shutil.copytree(ROOT, target, ignore=SANDBOX_IGNORE)
+    env = {
+        'AUTH_ENABLED': 'false',
+        'TUNNEL_ENABLED': 'false',
+        'DUCKDNS_ENABLED': 'false',
+        'ENABLE_AUTO_UPDATE': 'false',
+        'UPDATE_NOTIFICATION': 'false',
+        'MOCK_UPDATE': 'false',
+        'FLASK_DEBUG': 'false',
+        'LOG_LEVEL': 'WARNING',
+        'CACHE_STORE_PATH': os.path.join(target, 'cache', 'addarr.db'),
+        'TMDB_CACHE_DIR': '',
+        'IMAGE_CACHE_DIR': os.path.join(target, 'cache', 'images')
+    }
+    env.update(settings)
+    with open(os.path.join(target, '.env'), 'w') as f:
+        for key, value in env.items():
+            f.write(f"{key}={value}\n")
+    return target
+
+class AddarrServer:
+    """Addarr served from a sandbox by `python wsgi.py`, as in production"""
+
+    def __init__(self, sandbox, port, startup_timeout=120):
+        self.sandbox = sandbox
+        self.port = port
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.log = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.log = open(os.path.join(self.sandbox, 'server.log'), 'ab')
+        self.process = subprocess.Popen(
+            [sys.executable, 'wsgi.py'],
+            cwd=self.sandbox,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with {self.process.returncode}; see {self.log.name}")
+            try:
+                requests.get(f"{self.url}/offline.html", timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.25)
+        self.stop()
+        raise RuntimeError(f"Server did not answer within {self.startup_timeout}s; see {self.log.name}")
+
+    def pids(self):
+        """The server process and its workers"""
+        if not self.process:
+            return []
+        try:
+            output = subprocess.run(
+                ['pgrep', '-s', str(os.getsid(self.process.pid))],
+                capture_output=True, text=True, timeout=5
+            ).stdout
+            return [int(pid) for pid in output.split()]
+        except (OSError, subprocess.SubprocessError):
+            return [self.process.pid]
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+        if self.log:
+            self.log.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+# ============ REQUEST MIX ============
+
+ENDPOINTS = ('search', 'manage', 'check_library_status', 'get_media_details', 'trending')
+
+def request_for(endpoint, n, counts):
+    """(method, path, form data) of the n-th request to an endpoint.
+
+    Requests cycle through library items and items that are not in the
+    library, movies and series, so every code path behind the route runs.
+    `counts` is the stand-in library's {'movie': n, 'tv': n}.
+    """
+    movies, series = counts['movie'], counts['tv']
+    if endpoint == 'search':
+        # A new term each time, so Radarr and Sonarr are really asked
+        return 'POST', '/search', {'query': f"Synthetic Movie {n + 1}"}
+    if endpoint == 'manage':
+        return 'GET', '/manage', None
+    if endpoint == 'check_library_status':
+        if n % 2:
+            return 'GET', f"/check_library_status?type=tv&id={300000 + 1 + n % (2 * series)}", None
+        return 'GET', f"/check_library_status?type=movie&id={100000 + 1 + n % (2 * movies)}", None
+    if endpoint == 'get_media_details':
+        outside = (n // 2) % 2
+        if n % 2:
+            item_id = series + 1 + n % 100 if outside else 1 + n % series
+            return 'GET', f"/get_media_details?type=tv&id={300000 + item_id}", None
+        item_id = movies + 1 + n % 100 if outside else 1 + n % movies
+        return 'GET', f"/get_media_details?type=movie&id={100000 + item_id}", None
+    if endpoint == 'trending':
+        return 'GET', f"/trending?type=all&page={1 + n % 5}", None
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+# ============ STATISTICS ============
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered), math.ceil(fraction * len(ordered))) - 1)
+    return ordered[index]
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles in milliseconds and throughput in requests/second"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        'requests': count,
+        'errors': errors,
+        'mean_ms': round(1000 * sum(ordered) / count, 2) if count else 0.0,
+        'p50_ms': round(1000 * percentile(ordered, 0.50), 2),
+        'p95_ms': round(1000 * percentile(ordered, 0.95), 2),
+        'p99_ms': round(1000 * percentile(ordered, 0.99), 2),
+        'max_ms': round(1000 * ordered[-1], 2) if count else 0.0,
+        'rps': round(count / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def write_report(path, report):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def change(current, previous):
+    """Signed percentage change, or '' when there is nothing to compare"""
+    if not previous:
+        return ''
+    return f"{100 * (current - previous) / previous:+.1f}%"
@@ -0,0 +1,144 @@
+"""Measure library index memory: raw arr JSON vs compact LibraryRecords.
+
+Builds a synthetic Radarr/Sonarr library shaped like real /api/v3 payloads,
+then compares the retained and peak size of the parsed JSON, the compact
+records built from it, and the compact records built from a streamed parse.
+
+    python benchmarks/library_memory.py [--items 10000]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_records import MovieRecord, SeriesRecord
+from json_stream import iter_json_array
+
+CHUNK_SIZE = 64 * 1024
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama',
+          'Family', 'Fantasy', 'Horror', 'Mystery', 'Romance', 'Science Fiction', 'Thriller']
+ROOT_FOLDERS = ['/data/media/movies', '/data/media/movies-4k', '/data/media/tv', '/data/media/anime']
+STATUSES = ['released', 'announced', 'inCinemas']
+CERTIFICATIONS = ['G', 'PG', 'PG-13', 'R', 'NR', 'TV-MA', 'TV-14']
+
+def _images(i, kind):
+    return [
+        {'coverType': cover, 'url': f"/MediaCover/{i}/{cover}.jpg?lastWrite=638{i:012d}",
+         'remoteUrl': f"https://image.tmdb.org/t/p/original/{kind}{i:08d}{cover}.jpg"}
+        for cover in ('poster', 'fanart', 'banner')
+    ]
+
+def fake_movie(i, rng):
+    return {
+        'id': i, 'tmdbId': 100000 + i, 'imdbId': f"tt{1000000 + i}",
+        'title': f"Synthetic Movie {i}", 'originalTitle': f"Synthetic Movie {i}",
+        'sortTitle': f"synthetic movie {i}", 'cleanTitle': f"syntheticmovie{i}",
+        'titleSlug': f"synthetic-movie-{i}-{100000 + i}",
+        'alternateTitles': [{'sourceType': 'tmdb', 'movieMetadataId': i, 'title': f"Alt Title {i} {n}"} for n in range(3)],
+        'overview': ' '.join(rng.choice(GENRES).lower() for _ in range(60)),
+        'year': 1980 + i % 45, 'runtime': 80 + i % 80, 'status': rng.choice(STATUSES),
+        'monitored': bool(i % 3), 'hasFile': bool(i % 2), 'isAvailable': True,
+        'certification': rng.choice(CERTIFICATIONS), 'studio': f"Studio {i % 200}",
+        'genres': rng.sample(GENRES, 3), 'tags': [1, 2],
+        'path': f"{ROOT_FOLDERS[i % 2]}/Synthetic Movie {i} ({1980 + i % 45})",
+        'rootFolderPath': ROOT_FOLDERS[i % 2], 'folderName': f"Synthetic Movie {i}",
+        'qualityProfileId': 1 + i % 4, 'minimumAvailability': 'released',
+        'added': f"2023-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00Z",
+        'inCinemas': '2020-01-01T00:00:00Z', 'physicalRelease': '2020-04-01T00:00:00Z',
+        'digitalRelease': '2020-03-01T00:00:00Z', 'sizeOnDisk': rng.randint(0, 60 * 1024 ** 3),
+        'images': _images(i, 'm'),
+        'ratings': {source: {'votes': rng.randint(0, 10 ** 6), 'value': rng.random() * 10, 'type': 'user'}
+                    for source in ('imdb', 'tmdb', 'metacritic', 'rottenTomatoes')},
+        'movieFile': {'id': i, 'relativePath': f"Synthetic Movie {i}.mkv", 'size': rng.randint(0, 10 ** 10),
+                      'quality': {'quality': {'id': 7, 'name': 'Bluray-1080p', 'source': 'bluray', 'resolution': 1080}},
+                      'mediaInfo': {'audioCodec': 'DTS', 'videoCodec': 'x264', 'runTime': '1:45:00'}},
+        'statistics': {'movieFileCount': 1, 'sizeOnDisk': rng.randint(0, 10 ** 10), 'releaseGroups': ['GRP']}
+    }
+
+def fake_series(i, rng):
+    return {
+        'id': i, 'tvdbId': 300000 + i, 'tmdbId': 50000 + i, 'imdbId': f"tt{2000000 + i}",
+        'title': f"Synthetic Show {i}", 'sortTitle': f"synthetic show {i}",
+        'titleSlug': f"synthetic-show-{i}", 'cleanTitle': f"syntheticshow{i}",
+        'alternateTitles': [{'title': f"Alt Show {i}", 'seasonNumber': -1}],
+        'overview': ' '.join(rng.choice(GENRES).lower() for _ in range(60)),
+        'year': 1990 + i % 35, 'runtime': 45, 'status': rng.choice(['continuing', 'ended']),
+        'monitored': bool(i % 3), 'network': f"Network {i % 30}", 'airTime': '21:00',
+        'certification': rng.choice(CERTIFICATIONS), 'genres': rng.sample(GENRES, 2),
+        'path': f"/data/media/tv/Synthetic Show {i}", 'rootFolderPath': ROOT_FOLDERS[2],
+        'qualityProfileId': 1, 'seriesType': 'standard', 'seasonFolder': True,
+        'added': f"2022-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00Z",
+        'images': _images(i, 's'),
+        'seasons': [{'seasonNumber': n, 'monitored': True,
+                     'statistics': {'episodeFileCount': 10, 'episodeCount': 10, 'totalEpisodeCount': 10,
+                                    'sizeOnDisk': rng.randint(0, 10 ** 10), 'percentOfEpisodes': 100.0}}
+                    for n in range(1 + i % 6)],
+        'statistics': {'seasonCount': 1 + i % 6, 'episodeFileCount': 40, 'episodeCount': 50,
+                       'totalEpisodeCount': 60, 'sizeOnDisk': rng.randint(0, 10 ** 11),
+                       'percentOfEpisodes': 80.0}
+    }
+
+def build_payload(items, seed=1):
+    """JSON bytes for a library of `items` entries, 70% movies and 30% series.
+
+    Measurements parse these bytes, so no strings are shared with the generator.
+    """
+    rng = random.Random(seed)
+    movie_count = int(items * 0.7)
+    movies = [fake_movie(i, rng) for i in range(movie_count)]
+    series = [fake_series(i, rng) for i in range(items - movie_count)]
+    return json.dumps(movies).encode('utf-8'), json.dumps(series).encode('utf-8')
+
+def chunked(payload):
+    """Feed a payload the way response.iter_content() would"""
+    for start in range(0, len(payload), CHUNK_SIZE):
+        yield payload[start:start + CHUNK_SIZE]
+
+def measure(build):
+    """Bytes still allocated after build() returns, while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000)
+    args = parser.parse_args()
+
+    movie_payload, series_payload = build_payload(args.items)
+
+    raw, raw_size, raw_peak = measure(lambda: (json.loads(movie_payload), json.loads(series_payload)))
+    del raw
+
+    compact, compact_size, compact_peak = measure(lambda: (
+        [MovieRecord.from_json(item) for item in json.loads(movie_payload)],
+        [SeriesRecord.from_json(item) for item in json.loads(series_payload)]
+    ))
+    del compact
+
+    streamed, streamed_size, streamed_peak = measure(lambda: (
+        [MovieRecord.from_json(item) for item in iter_json_array(chunked(movie_payload))],
+        [SeriesRecord.from_json(item) for item in iter_json_array(chunked(series_payload))]
+    ))
+
+    mib = 1024 * 1024
+    print(f"Library items:        {args.items}")
+    print(f"Payload size:         {(len(movie_payload) + len(series_payload)) / mib:8.1f} MiB")
+    print(f"Raw JSON retained:    {raw_size / mib:8.1f} MiB (peak {raw_peak / mib:.1f} MiB)")
+    print(f"Compact retained:     {compact_size / mib:8.1f} MiB (peak {compact_peak / mib:.1f} MiB)")
+    print(f"Streamed retained:    {streamed_size / mib:8.1f} MiB (peak {streamed_peak / mib:.1f} MiB)")
+    print(f"Reduction:            {100 * (1 - compact_size / raw_size):8.1f}%")
+    print(f"Per item:             {raw_size / args.items:8.0f} B -> {compact_size / args.items:.0f} B")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+"""Soak-test Addarr with many simulated users against stand-in upstreams.
+
+Serves a copy of Addarr with `python wsgi.py` against the stand-in Radarr,
+Sonarr, TMDB and GitHub servers. Simulated users then repeat the same
+journey with think time between steps: search, open details, check library
+status, browse the library a page at a time, and now and then add a title.
+
+At every interval the harness samples each server process: RSS, thread
+count and open files, the figures /api/debug/memory reports. It also
+records request latency per step. After the warm-up, the first windows form
+the baseline. The run reports these findings:
+  - memory that keeps growing (RSS trend and total growth);
+  - threads or open files that pile up;
+  - steps whose p95 latency drifts above the baseline;
+  - steps that start failing.
+
+Pass an earlier report to --compare to check steady-state latency and
+memory against it as well. The exit status is 1 when anything is flagged.
+
+    python benchmarks/soak.py [--duration 2h] [--users 25] [--items 10000]
+                              [--interval 30s] [--warmup 5m]
+                              [--output soak.json] [--compare earlier.json]
+"""
+import argparse
+import itertools
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import psutil
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import (ROOT, AddarrServer, change, free_port, git_commit, load_report,
+                     prepare_sandbox, request_for, summarize, write_report)
+from stand_ins import MOVIE_TMDB_OFFSET, SERIES_TVDB_OFFSET, StandIns
+
+sys.path.insert(0, ROOT)
+
+from memory_manager import process_memory
+
+STEPS = ('search', 'details', 'status', 'manage', 'library', 'add')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def parse_duration(value):
+    """Seconds from '90', '45s', '30m' or '2h'"""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    value = str(value).strip().lower()
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+class Recorder:
+    """Per-step latencies of the current sampling window, plus the whole run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window = {}
+        self._errors = {}
+        self.totals = {}
+        self.total_errors = {}
+
+    def record(self, step, latency, failed):
+        with self._lock:
+            self._window.setdefault(step, []).append(latency)
+            self._errors[step] = self._errors.get(step, 0) + failed
+
+    def take(self, elapsed, keep):
+        """Summaries of the window that just ended; `keep` adds it to the run totals"""
+        with self._lock:
+            window, errors = self._window, self._errors
+            self._window, self._errors = {}, {}
+        if keep:
+            for step, latencies in window.items():
+                self.totals.setdefault(step, []).extend(latencies)
+                self.total_errors[step] = self.total_errors.get(step, 0) + errors.get(step, 0)
+        return {step: summarize(latencies, errors.get(step, 0), elapsed) for step, latencies in window.items()}
+
+class SimulatedUser(threading.Thread):
+    """One browser session walking the search → details → library → add journey"""
+
+    def __init__(self, number, url, counts, recorder, stop_event, args, add_ids):
+        super().__init__(daemon=True, name=f"User-{number}")
+        self.number = number
+        self.url = url
+        self.counts = counts
+        self.recorder = recorder
+        self.stop_event = stop_event
+        self.think = args.think
+        self.add_ratio = args.add_ratio
+        self.add_ids = add_ids
+        self.rng = random.Random(number)
+        self.session = requests.Session()
+
+    def run(self):
+        # Users start spread over one think time instead of all at once
+        if self.stop_event.wait(self.rng.uniform(0, self.think)):
+            return
+        for journey in itertools.count(self.number * 1000000):
+            if not self._journey(journey):
+                break
+        self.session.close()
+
+    def _journey(self, n):
+        steps = [
+            ('search',) + request_for('search', n, self.counts),
+            ('details',) + request_for('get_media_details', n, self.counts),
+        ]
+        steps += [('status',) + request_for('check_library_status', 3 * n + k, self.counts) for k in range(3)]
+        steps.append(('manage', 'GET', '/manage', None))
+        for step, method, path, data in steps:
+            if self._send(step, method, path, data=data) is False:
+                return False
+
+        # Scroll one page further, as the manage page does on scroll
+        page = self._send('library', 'GET', '/api/library?limit=50', json_response=True)
+        if page is False:
+            return False
+        if page and page.get('next_cursor'):
+            if self._send('library', 'GET', f"/api/library?limit=50&cursor={page['next_cursor']}") is False:
+                return False
+
+        if self.rng.random() < self.add_ratio:
+            number = next(self.add_ids)
+            if number % 2:
+                item = {'media_type': 'tv', 'media_id': SERIES_TVDB_OFFSET + self.counts['tv'] + number}
+            else:
+                item = {'media_type': 'movie', 'media_id': MOVIE_TMDB_OFFSET + self.counts['movie'] + number}
+            if self._send('add', 'POST', '/add', json=item) is False:
+                return False
+        return True
+
+    def _send(self, step, method, path, data=None, json=None, json_response=False):
+        """Send one request after the user's think time; False once the run is over"""
+        if self.stop_event.wait(self.rng.expovariate(1 / self.think) if self.think else 0):
+            return False
+        start = time.perf_counter()
+        body = None
+        try:
+            response = self.session.request(method, f"{self.url}{path}", data=data, json=json, timeout=120)
+            failed = response.status_code >= 400
+            if json_response and not failed:
+                body = response.json()
+        except (requests.RequestException, ValueError):
+            failed = True
+        self.recorder.record(step, time.perf_counter() - start, failed)
+        return body
+
+# ============ SAMPLING ============
+
+def sample_processes(server):
+    """process_memory() of every server process, keyed by PID"""
+    processes = {}
+    for pid in server.pids():
+        try:
+            processes[str(pid)] = process_memory(psutil.Process(pid))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return processes
+
+def _slope_per_hour(points):
+    """Least-squares slope of (seconds, value) points, per hour"""
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    return 3600 * sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+def analyse(samples, args):
+    """Leak and drift findings for the samples taken after the warm-up"""
+    steady = [sample for sample in samples if sample['elapsed'] >= args.warmup]
+    if len(steady) < 4:
+        return {'findings': [f"Only {len(steady)} samples after the warm-up; run longer to judge"], 'trend': {}}
+
+    # Baseline and recent state are medians over the first and last quarter
+    span = max(2, len(steady) // 4)
+    first, last = steady[:span], steady[-span:]
+    findings = []
+
+    def median(window, key):
+        return statistics.median(sample[key] for sample in window)
+
+    rss_rate = _slope_per_hour([(sample['elapsed'], sample['rss_mb']) for sample in steady])
+    rss_growth = median(last, 'rss_mb') - median(first, 'rss_mb')
+    if rss_rate > args.leak_rate and rss_growth > args.leak_mb:
+        findings.append(f"Memory leak: RSS grew {rss_growth:.1f} MB, trending {rss_rate:+.1f} MB/hour")
+
+    for key, tolerance in (('threads', args.thread_growth), ('open_files', args.file_growth)):
+        growth = median(last, key) - median(first, key)
+        if growth > tolerance:
+            findings.append(f"{key.replace('_', ' ').capitalize()} pile up: {median(first, key):.0f} -> {median(last, key):.0f}")
+
+    latency = {}
+    for step in STEPS:
+        baseline = [sample['latency'][step]['p95_ms'] for sample in first if step in sample['latency']]
+        recent = [sample['latency'][step]['p95_ms'] for sample in last if step in sample['latency']]
+        if not baseline or not recent:
+            continue
+        baseline_p95, recent_p95 = statistics.median(baseline), statistics.median(recent)
+        latency[step] = {'baseline_p95_ms': baseline_p95, 'recent_p95_ms': recent_p95}
+        # Sub-millisecond noise is not drift
+        if recent_p95 > baseline_p95 * args.drift and recent_p95 - baseline_p95 > args.drift_floor:
+            findings.append(f"Latency drift in {step}: p95 {baseline_p95:.1f} ms -> {recent_p95:.1f} ms")
+
+        requests_made = sum(sample['latency'][step]['requests'] for sample in steady if step in sample['latency'])
+        errors = sum(sample['latency'][step]['errors'] for sample in steady if step in sample['latency'])
+        if requests_made and errors / requests_made > args.error_rate:
+            findings.append(f"Errors in {step}: {errors} of {requests_made} requests failed")
+
+    return {
+        'findings': findings,
+        'trend': {
+            'rss_mb_per_hour': round(rss_rate, 2),
+            'rss_growth_mb': round(rss_growth, 2),
+            'threads': [median(first, 'threads'), median(last, 'threads')],
+            'open_files': [median(first, 'open_files'), median(last, 'open_files')],
+            'latency': latency
+        }
+    }
+
+def compare_reports(report, previous, args):
+    """Findings against an earlier run's steady state"""
+    findings = []
+    for step, stats in report['steps'].items():
+        old = previous.get('steps', {}).get(step)
+        if not old:
+            continue
+        print(f"   {step:<8} p95 {old['p95_ms']:>8.1f} -> {stats['p95_ms']:>8.1f} ms {change(stats['p95_ms'], old['p95_ms'])}")
+        if stats['p95_ms'] > old['p95_ms'] * args.drift and stats['p95_ms'] - old['p95_ms'] > args.drift_floor:
+            findings.append(f"Slower than the earlier run in {step}: p95 {old['p95_ms']:.1f} ms -> {stats['p95_ms']:.1f} ms")
+
+    old_rate = previous.get('trend', {}).get('rss_mb_per_hour')
+    rate = report['trend'].get('rss_mb_per_hour')
+    if old_rate is not None and rate is not None:
+        print(f"   RSS trend {old_rate:+.1f} -> {rate:+.1f} MB/hour")
+        if rate > max(old_rate, 0) + args.leak_rate:
+            findings.append(f"Memory grows faster than in the earlier run: {old_rate:+.1f} -> {rate:+.1f} MB/hour")
+    return findings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', default='1h', help='total run time, e.g. 90s, 30m, 4h')
+    parser.add_argument('--warmup', default='5m', help='time before the baseline is taken')
+    parser.add_argument('--interval', default='30s', help='time between samples')
+    parser.add_argument('--users', type=int, default=25, help='simulated concurrent users')
+    parser.add_argument('--think', type=float, default=2.0, help='mean seconds a user waits between requests')
+    parser.add_argument('--add-ratio', type=float, default=0.05, help='share of journeys that add a title')
+    parser.add_argument('--items', type=int, default=10000, help='stand-in library size')
+    parser.add_argument('--latency', type=float, default=20, help='milliseconds every stand-in response takes')
+    parser.add_argument('--jitter', type=float, default=10, help='extra random stand-in milliseconds, up to this many')
+    parser.add_argument('--workers', type=int, default=2, help='SERVER_WORKERS')
+    parser.add_argument('--threads', type=int, default=8, help='SERVER_THREADS')
+    parser.add_argument('--leak-rate', type=float, default=10, help='RSS MB/hour that counts as a leak')
+    parser.add_argument('--leak-mb', type=float, default=32, help='RSS growth in MB that counts as a leak')
+    parser.add_argument('--thread-growth', type=int, default=4, help='extra threads that count as piling up')
+    parser.add_argument('--file-growth', type=int, default=4, help='extra open files that count as piling up')
+    parser.add_argument('--drift', type=float, default=1.5, help='p95 ratio to the baseline that counts as drift')
+    parser.add_argument('--drift-floor', type=float, default=20, help='p95 increase in ms below which drift is ignored')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='failed request share that is flagged')
+    parser.add_argument('--output', help='report path (default: benchmarks/results/soak-<time>.json)')
+    parser.add_argument('--compare', help='earlier soak report to compare against')
+    args = parser.parse_args()
+    for name in ('duration', 'warmup', 'interval'):
+        setattr(args, name, parse_duration(getattr(args, name)))
+
+    previous = load_report(args.compare) if args.compare else None
+    output = args.output or os.path.join(RESULTS_DIR, f"soak-{datetime.now():%Y%m%d-%H%M%S}.json")
+    settings = {name: getattr(args, name) for name in (
+        'duration', 'warmup', 'interval', 'users', 'think', 'add_ratio', 'items',
+        'latency', 'jitter', 'workers', 'threads'
+    )}
+
+    print(f"📚 Generating {args.items} library items...")
+    recorder = Recorder()
+    stop_event = threading.Event()
+    samples = []
+
+    with StandIns(args.items, args.latency / 1000, args.jitter / 1000) as stand_ins, \
+            tempfile.TemporaryDirectory(prefix='addarr-soak-') as directory:
+        port = free_port()
+        sandbox = prepare_sandbox(directory, dict(
+            stand_ins.env(),
+            SERVER_PORT=port,
+            SERVER_WORKERS=args.workers,
+            SERVER_THREADS=args.threads,
+            # Recycled workers would hide a leak
+            SERVER_MAX_REQUESTS=0
+        ))
+
+        with AddarrServer(sandbox, port) as server:
+            add_ids = itertools.count(1)
+            users = [
+                SimulatedUser(n, server.url, stand_ins.library.counts, recorder, stop_event, args, add_ids)
+                for n in range(args.users)
+            ]
+            print(f"👥 {args.users} users for {args.duration / 60:.0f} min, sampling every {args.interval:.0f}s")
+            started = time.time()
+            for user in users:
+                user.start()
+
+            try:
+                while not stop_event.wait(args.interval):
+                    elapsed = time.time() - started
+                    processes = sample_processes(server)
+                    sample = {
+                        'elapsed': round(elapsed, 1),
+                        'rss_mb': round(sum(p['rss_mb'] for p in processes.values()), 2),
+                        'threads': sum(p['threads'] for p in processes.values()),
+                        'open_files': sum(p['open_files'] for p in processes.values()),
+                        'processes': processes,
+                        'latency': recorder.take(args.interval, keep=elapsed >= args.warmup)
+                    }
+                    samples.append(sample)
+                    p95 = max((stats['p95_ms'] for stats in sample['latency'].values()), default=0)
+                    print(f"   {elapsed / 60:6.1f} min  RSS {sample['rss_mb']:8.1f} MB  threads {sample['threads']:4}"
+                          f"  files {sample['open_files']:3}  worst p95 {p95:8.1f} ms"
+                          f"{'  (warm-up)' if elapsed < args.warmup else ''}")
+                    if elapsed >= args.duration:
+                        break
+            except KeyboardInterrupt:
+                print("⏹️ Stopped early")
+            finally:
+                stop_event.set()
+                for user in users:
+                    user.join(timeout=10)
+
+    analysis = analyse(samples, args)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': settings,
+        'steps': {step: summarize(latencies, recorder.total_errors.get(step, 0), max(args.duration - args.warmup, 1))
+                  for step, latencies in recorder.totals.items()},
+        'trend': analysis['trend'],
+        'findings': analysis['findings'],
+        'samples': samples
+    }
+    if previous:
+        print("📊 Against the earlier run:")
+        report['findings'] += compare_reports(report, previous, args)
+
+    write_report(output, report)
+    print(f"📄 Report written to {output}")
+    if report['findings']:
+        for finding in report['findings']:
+            print(f"❌ {finding}")
+        sys.exit(1)
+    print("✅ No leaks or latency drift found")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,432 @@
+"""Stand-in Radarr, Sonarr, TMDB and GitHub servers for benchmarks.
+
+Each service is a small threaded HTTP server answering the endpoints Addarr
+calls, over a generated library shaped like real /api/v3 payloads (70%
+movies, 30% series). Every response is held back by a configurable latency
+to model a remote server. Movies and series added through the stand-ins
+join the library and show up in /api/v3/history/since.
+
+    python benchmarks/stand_ins.py [--items 10000] [--latency 20]
+
+Run on its own it prints the .env settings that point Addarr at it. The
+GitHub stand-in can also replace the mock update server MOCK_UPDATE expects:
+
+    python benchmarks/stand_ins.py --github-port 5001 --release 9.9.9
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from library_memory import GENRES, ROOT_FOLDERS, fake_movie, fake_series
+
+# Synthetic TMDB/TVDB IDs are offset from the arr ID, as in library_memory
+MOVIE_TMDB_OFFSET = 100000
+SERIES_TVDB_OFFSET = 300000
+SERIES_TMDB_OFFSET = 50000
+
+LOOKUP_LIMIT = 20
+TRENDING_PAGE_SIZE = 20
+API_KEY = 'benchmark'
+
+class Library:
+    """Generated Radarr and Sonarr libraries.
+
+    Items are rebuilt on demand from their ID, so only the encoded full
+    listings are held in memory. Items beyond the library can still be
+    looked up, which makes them candidates for adding.
+    """
+
+    def __init__(self, items, seed=1):
+        self.seed = seed
+        self.counts = {'movie': int(items * 0.7), 'tv': items - int(items * 0.7)}
+        self.added = {'movie': {}, 'tv': {}}
+        self.history = {'movie': [], 'tv': []}
+        self._lock = threading.Lock()
+        self._listings = {
+            'movie': self._encode(self.item('movie', i) for i in range(1, self.counts['movie'] + 1)),
+            'tv': self._encode(self.item('tv', i) for i in range(1, self.counts['tv'] + 1))
+        }
+
+    @staticmethod
+    def _encode(items):
+        return ('[' + ','.join(json.dumps(item) for item in items) + ']').encode('utf-8')
+
+    def item(self, media_type, item_id):
+        rng = random.Random(self.seed * 1000003 + item_id)
+        if media_type == 'movie':
+            return fake_movie(item_id, rng)
+        return fake_series(item_id, rng)
+
+    def contains(self, media_type, item_id):
+        return 1 <= item_id <= self.counts[media_type] or item_id in self.added[media_type]
+
+    def get(self, media_type, item_id):
+        if not self.contains(media_type, item_id):
+            return None
+        return self.added[media_type].get(item_id) or self.item(media_type, item_id)
+
+    def candidate(self, media_type, item_id):
+        """Lookup result for an item: library items carry their arr ID, others do not"""
+        if self.contains(media_type, item_id):
+            return self.get(media_type, item_id)
+        item = self.item(media_type, item_id)
+        del item['id']
+        item.pop('path', None)
+        return item
+
+    def listing(self, media_type):
+        """Encoded full library, including anything added since start"""
+        with self._lock:
+            added = list(self.added[media_type].values())
+        body = self._listings[media_type]
+        if not added:
+            return body
+        extra = json.dumps(added).encode('utf-8')
+        if body == b'[]':
+            return extra
+        return body[:-1] + b',' + extra[1:]
+
+    def search(self, media_type, term):
+        """Library and non-library items whose title contains the term"""
+        prefix = 'Synthetic Movie' if media_type == 'movie' else 'Synthetic Show'
+        term = term.strip().lower()
+        digits = ''.join(c for c in term if c.isdigit())
+
+        # Titles are "<prefix> <id>", so a number in the term selects IDs by prefix
+        if digits:
+            base = int(digits)
+            ids = [base] + [base * 10 + n for n in range(10)] + [base * 100 + n for n in range(100)]
+        elif term and term in prefix.lower():
+            ids = list(range(1, LOOKUP_LIMIT + 1))
+        else:
+            ids = []
+        return [self.candidate(media_type, item_id) for item_id in ids[:LOOKUP_LIMIT] if item_id > 0]
+
+    def add(self, media_type, payload):
+        """Add an item from a POST body; None when it is already in the library"""
+        if media_type == 'movie':
+            item_id = int(payload.get('tmdbId') or 0) - MOVIE_TMDB_OFFSET
+        else:
+            item_id = int(payload.get('tvdbId') or 0) - SERIES_TVDB_OFFSET
+        if item_id <= 0 or self.contains(media_type, item_id):
+            return None
+
+        item = self.item(media_type, item_id)
+        item.update({
+            'monitored': payload.get('monitored', True),
+            'rootFolderPath': payload.get('rootFolderPath') or item['rootFolderPath'],
+            'qualityProfileId': payload.get('qualityProfileId') or item['qualityProfileId'],
+            'added': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        })
+        with self._lock:
+            self.added[media_type][item_id] = item
+            self.history[media_type].append((time.time(), item_id))
+        return item
+
+    def history_since(self, media_type, since):
+        key = 'movieId' if media_type == 'movie' else 'seriesId'
+        with self._lock:
+            events = [(at, item_id) for at, item_id in self.history[media_type] if at >= since]
+        return [
+            {key: item_id, 'eventType': 'grabbed',
+             'date': datetime.fromtimestamp(at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+            for at, item_id in events
+        ]
+
+# ============ SERVERS ============
+
+class StandInServer(ThreadingHTTPServer):
+    """One fake upstream: regex routes answered after the configured latency"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, name, routes, latency=0.0, jitter=0.0, host='127.0.0.1', port=0):
+        self.name = name
+        self.routes = [(method, re.compile(pattern), handler) for method, pattern, handler in routes]
+        self.latency = latency
+        self.jitter = jitter
+        self.hits = 0
+        self._hits_lock = threading.Lock()
+        self.thread = None
+        super().__init__((host, port), StandInHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def count(self):
+        with self._hits_lock:
+            self.hits += 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True, name=f"StandIn-{self.name}")
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        server = self.server
+        server.count()
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'null') if length else None
+
+        server.delay()
+        for route_method, pattern, handler in server.routes:
+            match = pattern.fullmatch(url.path)
+            if match and route_method == method:
+                status, payload = handler(match, query, body)
+                break
+        else:
+            status, payload = 404, {'message': 'NotFound'}
+
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def _parse_since(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+def _found(item):
+    return (200, item) if item is not None else (404, {'message': 'NotFound'})
+
+def arr_routes(library, media_type):
+    """Radarr (movie) or Sonarr (tv) /api/v3 endpoints"""
+    resource = 'movie' if media_type == 'movie' else 'series'
+    external_key, external_offset = (
+        ('tmdbId', MOVIE_TMDB_OFFSET) if media_type == 'movie' else ('tvdbId', SERIES_TVDB_OFFSET)
+    )
+
+    def lookup(match, query, body):
+        term = query.get('term', '')
+        if term.startswith('tvdb:'):
+            item_id = int(term[5:] or 0) - SERIES_TVDB_OFFSET
+            return 200, [library.candidate(media_type, item_id)] if item_id > 0 else []
+        return 200, library.search(media_type, term)
+
+    def lookup_external(match, query, body):
+        item_id = int(query.get(external_key) or 0) - external_offset
+        return _found(library.candidate(media_type, item_id) if item_id > 0 else None)
+
+    def add(match, query, body):
+        item = library.add(media_type, body or {})
+        if item is None:
+            return 400, [{'errorMessage': 'This item has already been added'}]
+        return 201, item
+
+    routes = [
+        ('GET', rf'/api/v3/{resource}', lambda m, q, b: (200, library.listing(media_type))),
+        ('GET', rf'/api/v3/{resource}/lookup', lookup),
+        ('GET', rf'/api/v3/{resource}/(\d+)', lambda m, q, b: _found(library.get(media_type, int(m.group(1))))),
+        ('POST', rf'/api/v3/{resource}', add),
+        ('GET', r'/api/v3/history/since',
+         lambda m, q, b: (200, library.history_since(media_type, _parse_since(q.get('date'))))),
+        ('GET', r'/api/v3/rootfolder', lambda m, q, b: (200, [
+            {'id': n + 1, 'path': path, 'accessible': True, 'freeSpace': 4 * 1024 ** 4}
+            for n, path in enumerate(ROOT_FOLDERS)
+        ])),
+        ('GET', r'/api/v3/qualityprofile', lambda m, q, b: (200, [
+            {'id': n, 'name': name} for n, name in enumerate(['Any', 'HD-720p', 'HD-1080p', 'Ultra-HD'], 1)
+        ]))
+    ]
+    if media_type == 'movie':
+        routes.append(('GET', r'/api/v3/movie/lookup/tmdb', lookup_external))
+    else:
+        routes.append(('GET', r'/api/v3/languageprofile', lambda m, q, b: (200, [{'id': 1, 'name': 'English'}])))
+    return routes
+
+def tmdb_routes(library):
+    """TMDB v3 trending, details and configuration endpoints"""
+    def trending(match, query, body):
+        media_type = 'movie' if match.group(1) == 'movie' else 'tv'
+        page = max(int(query.get('page') or 1), 1)
+        start = (page - 1) * TRENDING_PAGE_SIZE
+        # Every other entry is in the library, the rest can be added
+        results = [
+            _tmdb_summary(media_type, library.item(media_type, 2 * (start + n) + 1))
+            for n in range(TRENDING_PAGE_SIZE)
+        ]
+        return 200, {'page': page, 'results': results, 'total_pages': 500, 'total_results': 10000}
+
+    def details(match, query, body):
+        media_type = 'movie' if match.group(1) == 'movie' else 'tv'
+        offset = MOVIE_TMDB_OFFSET if media_type == 'movie' else SERIES_TMDB_OFFSET
+        item_id = int(match.group(2)) - offset
+        if item_id <= 0:
+            return 404, {'status_code': 34, 'status_message': 'The resource you requested could not be found.'}
+        summary = _tmdb_summary(media_type, library.item(media_type, item_id))
+        summary.update({
+            'genres': [{'id': GENRES.index(name), 'name': name} for name in summary.pop('genre_names')],
+            'status': 'Released' if media_type == 'movie' else 'Returning Series',
+            'last_air_date': summary.get('first_air_date'),
+            'videos': {'results': [{'site': 'YouTube', 'type': 'Trailer', 'official': True,
+                                    'key': f"trailer{item_id}", 'name': 'Official Trailer'}]},
+            'images': {'posters': [{'file_path': summary['poster_path'], 'width': 2000, 'height': 3000}]}
+        })
+        return 200, summary
+
+    return [
+        ('GET', r'/3/trending/(movie|tv)/week', trending),
+        ('GET', r'/3/(movie|tv)/(\d+)', details),
+        ('GET', r'/3/configuration', lambda m, q, b: (200, {'images': {
+            'base_url': 'http://image.tmdb.org/t/p/',
+            'secure_base_url': 'https://image.tmdb.org/t/p/',
+            'poster_sizes': ['w92', 'w154', 'w185', 'w342', 'w500', 'w780', 'original'],
+            'backdrop_sizes': ['w300', 'w780', 'w1280', 'original']
+        }}))
+    ]
+
+def _tmdb_summary(media_type, item):
+    summary = {
+        'id': item['tmdbId'],
+        'overview': item['overview'],
+        'poster_path': f"/p{item['tmdbId']}.jpg",
+        'backdrop_path': f"/b{item['tmdbId']}.jpg",
+        'vote_average': round(5 + (item['id'] % 50) / 10, 1),
+        'genre_names': item['genres'],
+        'media_type': media_type
+    }
+    if media_type == 'movie':
+        summary.update({'title': item['title'], 'release_date': f"{item['year']}-01-01"})
+    else:
+        summary.update({'name': item['title'], 'first_air_date': f"{item['year']}-01-01"})
+    return summary
+
+def github_routes(release):
+    """Latest release and dev branch of any repository"""
+    published = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def latest(match, query, body):
+        repo = match.group(1)
+        return 200, {
+            'tag_name': f"v{release}",
+            'name': f"v{release}",
+            'body': f"Stand-in release {release}",
+            'html_url': f"https://github.com/{repo}/releases/tag/v{release}",
+            'zipball_url': f"https://api.github.com/repos/{repo}/zipball/v{release}",
+            'published_at': published,
+            'assets': []
+        }
+
+    def branch(match, query, body):
+        return 200, {'name': match.group(2), 'commit': {
+            'sha': '0' * 40,
+            'commit': {'message': 'Stand-in commit', 'author': {'name': 'stand-in', 'date': published}}
+        }}
+
+    return [
+        ('GET', r'/repos/([^/]+/[^/]+)/releases/latest', latest),
+        ('GET', r'/repos/([^/]+/[^/]+)/branches/([^/]+)', branch)
+    ]
+
+class StandIns:
+    """Radarr, Sonarr, TMDB and GitHub stand-ins sharing one generated library"""
+
+    def __init__(self, items=1000, latency=0.0, jitter=0.0, release='0.0.0', host='127.0.0.1', ports=None):
+        ports = ports or {}
+        self.library = Library(items)
+        self.servers = {
+            'radarr': StandInServer('radarr', arr_routes(self.library, 'movie'), latency, jitter, host, ports.get('radarr', 0)),
+            'sonarr': StandInServer('sonarr', arr_routes(self.library, 'tv'), latency, jitter, host, ports.get('sonarr', 0)),
+            'tmdb': StandInServer('tmdb', tmdb_routes(self.library), latency, jitter, host, ports.get('tmdb', 0)),
+            'github': StandInServer('github', github_routes(release), latency, jitter, host, ports.get('github', 0))
+        }
+
+    def start(self):
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def hits(self):
+        return {name: server.hits for name, server in self.servers.items()}
+
+    def env(self):
+        """Addarr settings that point every upstream at these stand-ins"""
+        return {
+            'RADARR_URL': self.servers['radarr'].url,
+            'RADARR_API_KEY': API_KEY,
+            'RADARR_ROOT_FOLDER': ROOT_FOLDERS[0],
+            'RADARR_QUALITY_PROFILE': '1',
+            'SONARR_URL': self.servers['sonarr'].url,
+            'SONARR_API_KEY': API_KEY,
+            'SONARR_ROOT_FOLDER': ROOT_FOLDERS[2],
+            'SONARR_QUALITY_PROFILE': '1',
+            'SONARR_LANGUAGE_PROFILE': '1',
+            'TMDB_KEY': API_KEY,
+            'TMDB_API_URL': f"{self.servers['tmdb'].url}/3",
+            'GITHUB_API_URL': self.servers['github'].url
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000, help='library size (movies + series)')
+    parser.add_argument('--latency', type=float, default=20, help='milliseconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0, help='extra random milliseconds, up to this many')
+    parser.add_argument('--release', default='0.0.0', help='version the GitHub stand-in reports as latest')
+    for name in ('radarr', 'sonarr', 'tmdb', 'github'):
+        parser.add_argument(f"--{name}-port", type=int, default=0)
+    args = parser.parse_args()
+
+    ports = {name: getattr(args, f"{name}_port") for name in ('radarr', 'sonarr', 'tmdb', 'github')}
+    print(f"Generating {args.items} library items...")
+    stand_ins = StandIns(args.items, args.latency / 1000, args.jitter / 1000, args.release, ports=ports).start()
+    for key, value in stand_ins.env().items():
+        print(f"{key}={value}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stand_ins.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+import threading
+import time
+import logging
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from abc import ABC, abstractmethod
+
+class CacheStore(ABC):
+    """Key/value store behind the caches, with leases to elect a single refresher.
+
+    Values must be JSON-serializable. Namespaces keep unrelated caches apart.
+    """
+
+    def __init__(self):
+        self._leases = {}  # name -> expires_at
+        self._lease_lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, namespace, key):
+        pass
+
+    @abstractmethod
+    def set(self, namespace, key, value):
+        pass
+
+    @abstractmethod
+    def delete(self, namespace, key):
+        pass
+
+    @abstractmethod
+    def prune(self, namespace, max_entries):
+        """Drop the oldest entries of a namespace beyond max_entries"""
+
+    @abstractmethod
+    def items_since(self, namespace, since):
+        """(value, position) pairs of a namespace written after position `since`, oldest first.
+
+        Positions only grow; pass the last one seen to read only newer writes.
+        """
+
+    @abstractmethod
+    def latest_position(self, namespace):
+        """Position of the newest write to a namespace, to read only later ones"""
+
+    def acquire_lease(self, name, ttl):
+        """Claim the right to refresh `name` for ttl seconds; False if someone else holds it.
+
+        The base implementation only coordinates threads of this process.
+        """
+        now = time.time()
+        with self._lease_lock:
+            if self._leases.get(name, 0) > now:
+                return False
+            self._leases[name] = now + ttl
+            return True
+
+    def release_lease(self, name):
+        with self._lease_lock:
+            self._leases.pop(name, None)
+
+    def stats(self):
+        return {}
+
+class FileStore(CacheStore):
+    """One JSON file per entry under a directory, e.g. the TMDB disk tier"""
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+
+    def _path(self, namespace, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, namespace, f"{digest}.json")
+
+    def get(self, namespace, key):
+        path = self._path(namespace, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cache file {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def set(self, namespace, key, value):
+        path = self._path(namespace, key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, namespace, key):
+        try:
+            os.remove(self._path(namespace, key))
+        except OSError:
+            pass
+
+    def prune(self, namespace, max_entries):
+        """Keep a namespace within its entry cap, oldest files first"""
+        directory = os.path.join(self.directory, namespace)
+        try:
+            files = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')]
+            excess = len(files) - max_entries
+            if excess <= 0:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:excess]:
+                os.remove(path)
+        except Exception as e:
+            logging.warning(f"Error pruning cache directory {directory}: {e}")
+
+    def items_since(self, namespace, since):
+        """Files modified after `since`; modification times are the positions"""
+        directory = os.path.join(self.directory, namespace)
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith('.json')]
+        except OSError:
+            return []
+        items = []
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stored_at = os.path.getmtime(path)
+                if stored_at > since:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        items.append((json.load(f), stored_at))
+            except (OSError, ValueError):
+                continue
+        items.sort(key=lambda item: item[1])
+        return items
+
+    def latest_position(self, namespace):
+        return time.time()
+
+class SQLiteStore(CacheStore):
+    """Store in one SQLite database shared by every worker process on the host.
+
+    WAL mode lets readers proceed while another process writes. Leases live
+    in the database too, so exactly one process refreshes a given item.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        """One connection per thread, reopened after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(entries)')]
+        if columns and 'seq' not in columns:
+            # Written before entries had a sequence; the contents are only a cache
+            conn.execute('DROP TABLE IF EXISTS entries')
+        # seq orders writes across processes; AUTOINCREMENT never reuses one, even after a delete
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, stored_at REAL NOT NULL, '
+            'UNIQUE (namespace, key))'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            'name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _owner():
+        return str(os.getpid())
+
+    def get(self, namespace, key):
+        row = self._connection().execute(
+            'SELECT value FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError as e:
+            logging.warning(f"Discarding unreadable shared cache entry {namespace}/{key}: {e}")
+            self.delete(namespace, key)
+            return None
+
+    def set(self, namespace, key, value):
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        self._connection().execute(
+            'INSERT OR REPLACE INTO entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)',
+            (namespace, key, data, time.time())
+        )
+
+    def delete(self, namespace, key):
+        self._connection().execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key))
+
+    def prune(self, namespace, max_entries):
+        self._connection().execute(
+            'DELETE FROM entries WHERE namespace = ? AND key NOT IN ('
+            'SELECT key FROM entries WHERE namespace = ? ORDER BY stored_at DESC LIMIT ?)',
+            (namespace, namespace, max_entries)
+        )
+
+    def items_since(self, namespace, since):
+        """Entries by write sequence; a rewritten entry moves to a new, higher position"""
+        rows = self._connection().execute(
+            'SELECT value, seq FROM entries WHERE namespace = ? AND seq > ? ORDER BY seq',
+            (namespace, since)
+        ).fetchall()
+        return [(json.loads(value), seq) for value, seq in rows]
+
+    def latest_position(self, namespace):
+        row = self._connection().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'entries'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def acquire_lease(self, name, ttl):
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+            'WHERE leases.expires_at < ? OR leases.owner = excluded.owner',
+            (name, self._owner(), now + ttl, now)
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, name):
+        self._connection().execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, self._owner()))
+
+    def stats(self):
+        rows = self._connection().execute(
+            'SELECT namespace, COUNT(*), SUM(LENGTH(value)) FROM entries GROUP BY namespace'
+        ).fetchall()
+        return {namespace: {'entries': count, 'bytes': size} for namespace, count, size in rows}
+
+def create_store(config, processes=1):
+    """Shared store for the configured backend, or None to keep caches process-local"""
+    backend = config.cache_store.backend
+    if backend == 'sqlite' or (backend == 'auto' and processes > 1):
+        logging.info(f"Using shared cache store at {config.cache_store.path}")
+        return SQLiteStore(config.cache_store.path)
+    return None
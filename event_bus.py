@@ -0,0 +1,217 @@
+import threading
+import itertools
+import logging
+import queue
+import json
+import time
+import os
+
+class Subscription:
+    """One connected client's queue of pending events"""
+
+    # Events a slow client may fall behind by before the oldest are dropped
+    MAX_PENDING = 100
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=self.MAX_PENDING)
+
+    def deliver(self, event, data):
+        try:
+            self.queue.put_nowait((event, data))
+        except queue.Full:
+            # The client will resync from the snapshot when it reconnects
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait((event, data))
+            except (queue.Empty, queue.Full):
+                pass
+
+    def close(self):
+        self.deliver(None, None)
+
+class EventBus:
+    """Server-side event fan-out behind the /api/events Server-Sent Events stream.
+
+    Components publish named events (update, update_progress, tunnel,
+    library) once; every connected client receives them from its own
+    subscription instead of polling. State providers describe the current
+    state sent to a client when it connects.
+
+    With a shared CacheStore attached, events also reach clients connected
+    to other worker processes: each process relays events published
+    elsewhere by polling the store while it has subscribers.
+    """
+
+    # Seconds between checks of the shared store for events from other processes
+    RELAY_INTERVAL = 1.0
+    # Relayed events kept in the shared store
+    RELAY_MAX_ENTRIES = 200
+
+    def __init__(self, config):
+        self.config = config
+        self.store = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._providers = {}  # event -> callable returning its current state
+        self._sequence = itertools.count(1)
+        self._relayed_since = 0  # store position of the last relayed event
+        self.server_threads = None  # set by servers with a fixed thread pool
+        self.relay_thread = None
+        self.running = False
+        self._stop_event = threading.Event()
+
+    def attach_store(self, store):
+        """Relay events between processes through a shared CacheStore"""
+        self.store = store
+
+    def provide(self, event, provider):
+        """Register the callable that reports an event's current state for new clients"""
+        self._providers[event] = provider
+
+    # ============ PUBLISHING ============
+
+    def publish(self, event, data):
+        """Send an event to every subscriber in every process"""
+        self._deliver(event, data)
+        if self.store is None:
+            return
+        try:
+            self.store.set('events', f"{os.getpid()}-{next(self._sequence)}", {
+                'event': event,
+                'data': data,
+                'origin': os.getpid()
+            })
+            self.store.prune('events', self.RELAY_MAX_ENTRIES)
+        except Exception as e:
+            logging.warning(f"Error relaying {event} event: {str(e)}")
+
+    def _deliver(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(event, data)
+
+    # ============ SUBSCRIBING ============
+
+    def subscribe(self):
+        """Register a client; None when this process already serves its maximum"""
+        # Under a fixed thread pool each open stream holds a thread; leave one for ordinary requests
+        limit = self.config.events.max_streams
+        if not limit and self.server_threads:
+            limit = max(1, self.server_threads - 1)
+        with self._lock:
+            if limit and len(self._subscribers) >= limit:
+                return None
+            subscription = Subscription()
+            self._subscribers.add(subscription)
+
+        if self.store is not None:
+            self._start_relay()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def snapshot(self):
+        """Current state of every provided event, as (event, data) pairs"""
+        state = []
+        for event, provider in self._providers.items():
+            try:
+                state.append((event, provider()))
+            except Exception as e:
+                logging.warning(f"Error reading {event} state: {str(e)}")
+        return state
+
+    def stream(self, subscription):
+        """Yield the SSE wire format for one subscription until it ends.
+
+        Sends the snapshot first, then events as they arrive with periodic
+        comments so proxies keep the connection open. Streams end after
+        events.stream_seconds; the browser reconnects on its own.
+        """
+        heartbeat = self.config.events.heartbeat
+        ends_at = time.time() + self.config.events.stream_seconds
+        try:
+            yield f"retry: {self.config.events.retry_ms}\n\n"
+            for event, data in self.snapshot():
+                yield self.format(event, data)
+
+            while not self._stop_event.is_set():
+                remaining = ends_at - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event, data = subscription.queue.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield self.format(event, data)
+        finally:
+            self.unsubscribe(subscription)
+
+    @staticmethod
+    def format(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+    # ============ RELAY ============
+
+    def _start_relay(self):
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            self._stop_event.clear()
+            # Only events published from now on are relayed
+            self._relayed_since = self.store.latest_position('events')
+            self.relay_thread = threading.Thread(
+                target=self._relay,
+                daemon=True,
+                name="EventRelay"
+            )
+            self.relay_thread.start()
+
+    def _relay(self):
+        """Forward events published by other processes to our subscribers"""
+        pid = os.getpid()
+        while self.running and not self._stop_event.is_set():
+            if self._subscribers:
+                try:
+                    for value, position in self.store.items_since('events', self._relayed_since):
+                        self._relayed_since = max(self._relayed_since, position)
+                        if value.get('origin') != pid:
+                            self._deliver(value['event'], value['data'])
+                except Exception as e:
+                    logging.warning(f"Error relaying events: {str(e)}")
+            else:
+                # Nobody is listening; skip what was published meanwhile
+                try:
+                    self._relayed_since = self.store.latest_position('events')
+                except Exception as e:
+                    logging.warning(f"Error reading event position: {str(e)}")
+
+            if self._stop_event.wait(timeout=self.RELAY_INTERVAL):
+                break
+
+    def stop(self):
+        """End open streams and the relay thread"""
+        self.running = False
+        self._stop_event.set()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
+
+        if self.relay_thread and self.relay_thread.is_alive():
+            try:
+                self.relay_thread.join(timeout=2.0)
+            except Exception as e:
+                logging.warning(f"Error stopping event relay thread: {e}")
+
+    def stats(self):
+        return {
+            'subscribers': len(self._subscribers),
+            'relaying': self.running
+        }
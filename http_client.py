@@ -0,0 +1,131 @@
+import threading
+import logging
+import time
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import tracing
+
+class HttpClient:
+    """Pooled keep-alive HTTP sessions, one per upstream backend (and per retry policy)"""
+
+    BACKENDS = ('radarr', 'sonarr', 'tmdb', 'github', 'images')
+
+    # Only idempotent requests are retried automatically
+    RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+    RETRY_STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, config, metrics=None):
+        self.config = config
+        self.metrics = metrics
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self, backend, retry=True):
+        """Build a session whose connection pool is reused across requests"""
+        max_retries = self.config.http.max_retries if retry else 0
+        retries = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=0.3,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.RETRY_METHODS,
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.config.http.pool_size,
+            max_retries=retries
+        )
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'User-Agent': f"Addarr/{self.config.app.version}"})
+
+        if self.config.app.debug:
+            logging.debug(f"Created HTTP session for {backend}")
+        return session
+
+    def session(self, backend, retry=True):
+        """Return the shared session for a backend, creating it on first use.
+
+        retry=False gives a separate pool that never retries, for calls that
+        must finish within a deadline.
+        """
+        key = (backend, retry)
+        session = self._sessions.get(key)
+        if session is None:
+            if backend not in self.BACKENDS:
+                raise ValueError(f"Unknown HTTP backend: {backend}")
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._create_session(backend, retry)
+                    self._sessions[key] = session
+        return session
+
+    def request(self, backend, method, url, retry=True, **kwargs):
+        """Send a request through the backend pool with default timeouts"""
+        kwargs.setdefault('timeout', (self.config.http.connect_timeout, self.config.http.read_timeout))
+        # The path only; query strings carry API keys
+        with tracing.span(f"{backend} {method}", backend=backend, method=method, endpoint=urlsplit(url).path) as call:
+            start = time.perf_counter()
+            status = 'error'
+            try:
+                response = self.session(backend, retry).request(method, url, **kwargs)
+                status = response.status_code
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe_upstream(backend, method, status, time.perf_counter() - start)
+
+            if call is not None:
+                call.attributes['status'] = status
+                call.attributes['bytes'] = self._body_size(response, kwargs.get('stream'))
+            return response
+
+    @staticmethod
+    def _body_size(response, streamed):
+        """Response size without consuming a streamed body"""
+        if not streamed:
+            return len(response.content)
+        length = response.headers.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+
+    def get(self, backend, url, **kwargs):
+        return self.request(backend, 'GET', url, **kwargs)
+
+    def post(self, backend, url, **kwargs):
+        return self.request(backend, 'POST', url, **kwargs)
+
+    def put(self, backend, url, **kwargs):
+        return self.request(backend, 'PUT', url, **kwargs)
+
+    def delete(self, backend, url, **kwargs):
+        return self.request(backend, 'DELETE', url, **kwargs)
+
+    def reset_after_fork(self):
+        """Forget the sessions inherited from a parent process.
+
+        Their pooled sockets are shared with the parent and every sibling, so
+        they are dropped without being closed and each process opens its own.
+        """
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logging.warning(f"Error closing HTTP session: {e}")
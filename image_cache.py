@@ -0,0 +1,259 @@
+import threading
+import logging
+import hashlib
+import os
+import io
+import tempfile
+from urllib.parse import urljoin, urlparse
+from single_flight import SingleFlight
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+class ImageCache:
+    """On-disk cache of resized poster thumbnails for remote artwork.
+
+    Each remote image is downloaded once and every configured width is
+    rendered from it. Variants are stored under the SHA-256 of the original
+    image, so their URLs never change meaning and can be cached forever.
+    A small ref file maps each remote URL to that content hash. The cache
+    directory is kept under its size cap by evicting least recently served
+    files first.
+    """
+
+    # Largest remote image accepted; posters at TMDB "original" are a few MB
+    MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+    MAX_REDIRECTS = 3
+    CONTENT_TYPES = {'.jpg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp'}
+
+    def __init__(self, config, http_client):
+        self.config = config
+        self.http = http_client
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Computed lazily from the directory on first write
+
+        if not PIL_AVAILABLE:
+            logging.warning("Pillow not available - poster proxy will cache images without resizing")
+
+    # ============ NAMING ============
+
+    def _directory(self, *parts):
+        return os.path.join(self.config.images.cache_dir, *parts)
+
+    @staticmethod
+    def _url_key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def snap_width(self, width):
+        """Smallest configured width that covers the requested one"""
+        widths = self.config.images.widths
+        for candidate in widths:
+            if width <= candidate:
+                return candidate
+        return widths[-1]
+
+    def is_allowed(self, url):
+        """Only proxy artwork hosts, never arbitrary URLs"""
+        parsed = urlparse(url or '')
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            return False
+        host = parsed.hostname.lower()
+        return any(host == allowed or host.endswith(f".{allowed}") for allowed in self.config.images.allowed_hosts)
+
+    def variant_path(self, name):
+        """Absolute path of a stored variant, or None for names we never produce"""
+        if os.path.basename(name) != name or not name.startswith(('w', 'o')):
+            return None
+        path = self._directory('thumbs', name)
+        return path if os.path.exists(path) else None
+
+    def content_type(self, name):
+        return self.CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream')
+
+    # ============ LOOKUP ============
+
+    def _read_ref(self, url):
+        try:
+            with open(self._directory('refs', self._url_key(url)), 'r', encoding='ascii') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _existing_variant(self, content_hash, width):
+        for name in (f"w{width}_{content_hash}.jpg", *(f"o_{content_hash}{ext}" for ext in self.CONTENT_TYPES)):
+            if os.path.exists(self._directory('thumbs', name)):
+                return name
+        return None
+
+    def thumbnail(self, url, width):
+        """Name of a cached variant for a remote image, fetching it on first use"""
+        width = self.snap_width(width)
+        content_hash = self._read_ref(url)
+        if content_hash:
+            name = self._existing_variant(content_hash, width)
+            if name:
+                return name
+
+        # Concurrent requests for the same poster share one download
+        self._flight.do(url, self._fetch, url)
+        return self._existing_variant(self._read_ref(url), width)
+
+    def touch(self, name):
+        """Mark a variant as recently served for LRU eviction"""
+        try:
+            os.utime(self._directory('thumbs', name))
+        except OSError:
+            pass
+
+    # ============ FETCHING ============
+
+    def _download(self, url):
+        """Streamed response for an image, following only redirects to allowed hosts"""
+        for _ in range(self.MAX_REDIRECTS + 1):
+            response = self.http.get('images', url, stream=True, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            location = urljoin(url, response.headers.get('Location', ''))
+            response.close()
+            if not self.is_allowed(location):
+                raise ValueError(f"Remote image redirected to a host that is not allowed: {location}")
+            url = location
+        raise ValueError(f"Too many redirects fetching remote image: {url}")
+
+    def _fetch(self, url):
+        with self._download(url) as response:
+            response.raise_for_status()
+            body = io.BytesIO()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body.write(chunk)
+                if body.tell() > self.MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"Remote image too large: {url}")
+            content_type = response.headers.get('Content-Type', '')
+
+        data = body.getvalue()
+        content_hash = hashlib.sha256(data).hexdigest()
+
+        if PIL_AVAILABLE:
+            for width in self.config.images.widths:
+                self._write(f"w{width}_{content_hash}.jpg", self._resize(data, width))
+        else:
+            ext = next((e for e, t in self.CONTENT_TYPES.items() if t == content_type.split(';')[0]), '.jpg')
+            self._write(f"o_{content_hash}{ext}", data)
+
+        self._write_ref(url, content_hash)
+        if self.config.app.debug:
+            logging.debug(f"Cached poster {url} ({len(data)} bytes) as {content_hash[:12]}")
+
+    def _resize(self, data, width):
+        """Downscale to the given width as a progressive JPEG"""
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert('RGB')
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, 'JPEG', quality=self.config.images.quality, optimize=True, progressive=True)
+            return out.getvalue()
+
+    def _write_ref(self, url, content_hash):
+        self._atomic_write(self._directory('refs'), self._url_key(url), content_hash.encode('ascii'))
+
+    def _write(self, name, data):
+        self._atomic_write(self._directory('thumbs'), name, data)
+        self._account(len(data))
+
+    @staticmethod
+    def _atomic_write(directory, name, data):
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(directory, name))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    # ============ EVICTION ============
+
+    def _scan(self):
+        thumbs = self._directory('thumbs')
+        if not os.path.isdir(thumbs):
+            return []
+        entries = []
+        for name in os.listdir(thumbs):
+            if name.endswith('.tmp'):
+                continue
+            try:
+                stat = os.stat(os.path.join(thumbs, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _account(self, added_bytes):
+        max_bytes = self.config.images.cache_max_mb * 1024 * 1024
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._total_bytes += added_bytes
+            if self._total_bytes <= max_bytes:
+                return
+            self._evict(int(max_bytes * 0.9))
+
+    def _evict(self, target_bytes):
+        """Delete least recently served variants until under target; caller holds the lock"""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in entries:
+            if total <= target_bytes:
+                break
+            try:
+                os.remove(self._directory('thumbs', name))
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        self._total_bytes = total
+        self._drop_orphaned_refs()
+        logging.info(f"Image cache evicted {removed} files, {total / (1024 * 1024):.1f} MB in use")
+
+    @staticmethod
+    def _content_hash(name):
+        """Content hash a variant name was stored under"""
+        return os.path.splitext(name.split('_', 1)[-1])[0]
+
+    def _drop_orphaned_refs(self):
+        """Remove URL refs whose variants were all evicted; caller holds the lock"""
+        refs = self._directory('refs')
+        if not os.path.isdir(refs):
+            return
+        remaining = {self._content_hash(name) for _, _, name in self._scan()}
+        for name in os.listdir(refs):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(refs, name)
+            try:
+                with open(path, 'r', encoding='ascii') as f:
+                    content_hash = f.read().strip()
+                if content_hash not in remaining:
+                    os.remove(path)
+            except (OSError, ValueError):
+                continue
+
+    def stats(self):
+        entries = self._scan()
+        return {
+            'files': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'resizing': PIL_AVAILABLE
+        }
@@ -0,0 +1,89 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+_ELEMENT_TERMINATORS = _WHITESPACE + ',]'
+
+# Consumed text is only cut off the buffer once this much has piled up
+_TRIM_THRESHOLD = 64 * 1024
+
+def iter_json_array(chunks, description='response'):
+    """Yield the elements of a top-level JSON array as they arrive.
+
+    `chunks` is any iterable of bytes, e.g. ``response.iter_content(...)`` on a
+    streamed request. Only the element being decoded and the unread part of the
+    current chunk are held in memory, never the whole document.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    exhausted = False
+
+    def read_more():
+        nonlocal buffer, pos, exhausted
+        if exhausted:
+            return False
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if pos >= _TRIM_THRESHOLD:
+                buffer = buffer[pos:]
+                pos = 0
+            buffer += text_decoder.decode(chunk)
+            return True
+        buffer += text_decoder.decode(b'', final=True)
+        exhausted = True
+        return False
+
+    def next_token():
+        """Skip whitespace and return the next character, or None at end of input"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read_more():
+                return None
+
+    if next_token() != '[':
+        raise ValueError(f"Expected a JSON array in {description}")
+    pos += 1
+
+    expect_element = True
+    seen_element = False
+    while True:
+        token = next_token()
+        if token is None:
+            raise ValueError(f"Truncated JSON array in {description}")
+        if token == ']':
+            if expect_element and seen_element:
+                raise ValueError(f"Trailing comma in {description}")
+            return
+        if not expect_element:
+            if token != ',':
+                raise ValueError(f"Expected ',' or ']' in {description}")
+            pos += 1
+            expect_element = True
+            continue
+
+        # Decode one element, pulling more input while it is incomplete. A number
+        # cut off by a chunk boundary still decodes, so an element only counts once
+        # the character after it is one that may legally follow it.
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not read_more():
+                    raise ValueError(f"Malformed JSON array in {description}")
+                continue
+            if (end >= len(buffer) or buffer[end] not in _ELEMENT_TERMINATORS) and read_more():
+                continue
+            break
+
+        pos = end
+        expect_element = False
+        seen_element = True
+        yield value
@@ -1,41 +1,130 @@
 # Memory-optimized configuration management
 import threading
+import logging
 import time
 import os
-from dotenv import load_dotenv
+from types import MappingProxyType
+from collections import namedtuple
+from dotenv import load_dotenv, find_dotenv
 
 class ConfigSection:
-    """Wrapper to allow attribute access to config sections"""
-    def __init__(self, data):
-        self._data = data
-    
-    def __getattr__(self, name):
-        if name in self._data:
-            return self._data[name]
-        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
-    
+    """Read-only attribute access to one config section.
+
+    Sections are namedtuples (see _section) so attribute reads run at C speed
+    and a snapshot can be shared by every thread without copying.
+    """
+    __slots__ = ()
+
     def get(self, key, default=None):
-        return self._data.get(key, default)
+        return getattr(self, key, default)
+
+_section_types = {}
+
+def _section(name, data):
+    fields = tuple(data)
+    section_type = _section_types.get((name, fields))
+    if section_type is None:
+        base = namedtuple(f"{name}_fields", fields)
+        section_type = type(f"{name.title()}Section", (base, ConfigSection), {'__slots__': ()})
+        _section_types[(name, fields)] = section_type
+    # Lists become tuples so nothing inside a snapshot can change
+    return section_type(*(tuple(value) if isinstance(value, list) else value for value in data.values()))
 
 class LazyConfig:
-    """Lazy-loading configuration to reduce memory footprint"""
+    """Configuration held as an immutable snapshot that is swapped as a whole.
+
+    Reads never lock: they dereference the current snapshot, which is never
+    modified after it is built. A watcher thread rebuilds the snapshot when
+    the .env file changes; reload() does the same right after a write.
+    """
+
+    # Seconds between checks of the .env modification time
+    WATCH_INTERVAL = 2
+
     def __init__(self):
         self._config = None
         self._last_reload = 0
-        self._reload_interval = 300  # Reload every 5 minutes
-        self._lock = threading.Lock()
-    
-    def _ensure_loaded(self):
-        """Load configuration if needed"""
+        self._lock = threading.Lock()  # Serialises reloads only
+        self._env_stamp = None
+        self._fork_hook = False
+        self.watch_thread = None
+        self.running = False
+        self._stop_event = threading.Event()
+        self.reload()
+
+    # ============ RELOADING ============
+
+    def reload(self):
+        """Rebuild the snapshot from the environment and .env, then swap it in"""
         with self._lock:
-            current_time = time.time()
-            if (self._config is None or 
-                current_time - self._last_reload > self._reload_interval):
-                self._reload_config()
-    
+            self._env_stamp = self._stat_env()
+            self._reload_config()
+
+    def _env_path(self):
+        # Same lookup load_dotenv() does: the nearest .env above this module
+        return find_dotenv() or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+    def _stat_env(self):
+        try:
+            stat = os.stat(self._env_path())
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def start(self):
+        """Watch .env for changes; restarted automatically in forked worker processes"""
+        if self.running:
+            return
+
+        self.running = True
+        self._stop_event.clear()
+        self.watch_thread = threading.Thread(
+            target=self._watch,
+            daemon=True,
+            name="ConfigWatcher"
+        )
+        self.watch_thread.start()
+
+        if not self._fork_hook and hasattr(os, 'register_at_fork'):
+            # Threads do not survive fork; gunicorn workers need their own watcher
+            os.register_at_fork(after_in_child=self._restart_after_fork)
+            self._fork_hook = True
+
+    def _restart_after_fork(self):
+        if self.running:
+            self.running = False
+            self._lock = threading.Lock()
+            self._stop_event = threading.Event()
+            self.start()
+
+    def stop(self):
+        """Stop the watcher thread"""
+        if not self.running:
+            return
+
+        self.running = False
+        self._stop_event.set()
+
+        if self.watch_thread and self.watch_thread.is_alive():
+            try:
+                self.watch_thread.join(timeout=2.0)
+            except Exception as e:
+                logging.warning(f"Error stopping config watcher: {e}")
+
+    def _watch(self):
+        while self.running and not self._stop_event.is_set():
+            if self._stop_event.wait(timeout=self.WATCH_INTERVAL):
+                break
+            try:
+                if self._stat_env() != self._env_stamp:
+                    self.reload()
+                    logging.info("Configuration reloaded after .env change")
+            except Exception as e:
+                logging.error(f"Error reloading configuration: {str(e)}")
+
     def _reload_config(self):
-        """Load only essential configuration"""
-        load_dotenv(override=True)
+        """Build a new snapshot; callers hold the reload lock (see reload)"""
+        load_dotenv(self._env_path(), override=True)
         
         config_data = {
             'radarr': {
@@ -53,7 +142,33 @@ class LazyConfig:
             },
             'tmdb': {
                 'key': os.getenv('TMDB_KEY', ''),
-                'token': os.getenv('TMDB_TOKEN', '')
+                'token': os.getenv('TMDB_TOKEN', ''),
+                'api_url': os.getenv('TMDB_API_URL', 'https://api.themoviedb.org/3').rstrip('/')
+            },
+            'tmdb_cache': {
+                'ttl': int(os.getenv('TMDB_CACHE_TTL', '3600')),
+                'stale_ttl': int(os.getenv('TMDB_CACHE_STALE_TTL', '86400')),
+                'max_entries': int(os.getenv('TMDB_CACHE_MAX_ENTRIES', '500')),
+                'cache_dir': os.getenv('TMDB_CACHE_DIR', ''),
+                'disk_max_entries': int(os.getenv('TMDB_CACHE_DISK_MAX_ENTRIES', '5000'))
+            },
+            'trending': {
+                'refresh_interval': int(os.getenv('TRENDING_REFRESH_INTERVAL', '1800')),
+                'prefetch_pages': int(os.getenv('TRENDING_PREFETCH_PAGES', '2'))
+            },
+            'cache_store': {
+                'backend': os.getenv('CACHE_STORE', 'auto').lower(),
+                'path': os.getenv('CACHE_STORE_PATH', 'cache/addarr.db')
+            },
+            'images': {
+                'proxy_enabled': os.getenv('IMAGE_PROXY_ENABLED', 'true').lower() == 'true',
+                'cache_dir': os.getenv('IMAGE_CACHE_DIR', 'cache/images'),
+                'cache_max_mb': int(os.getenv('IMAGE_CACHE_MAX_MB', '200')),
+                'widths': sorted(int(w) for w in os.getenv('IMAGE_WIDTHS', '154,300,500').split(',') if w.strip()),
+                'quality': int(os.getenv('IMAGE_QUALITY', '80')),
+                'allowed_hosts': [h.strip().lower() for h in os.getenv(
+                    'IMAGE_PROXY_HOSTS', 'image.tmdb.org,artworks.thetvdb.com,assets.fanart.tv'
+                ).split(',') if h.strip()]
             },
             'app': {
                 'debug': os.getenv('FLASK_DEBUG', 'false').lower() == 'true',
@@ -61,6 +176,33 @@ class LazyConfig:
                 'port': int(os.getenv('SERVER_PORT', '5000')),
                 'log_level': os.getenv('LOG_LEVEL', 'INFO')
             },
+            'server': {
+                'workers': int(os.getenv('SERVER_WORKERS', '2')),
+                'threads': int(os.getenv('SERVER_THREADS', '4')),
+                'timeout': int(os.getenv('SERVER_TIMEOUT', '120')),
+                'graceful_timeout': int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30')),
+                'max_requests': int(os.getenv('SERVER_MAX_REQUESTS', '0'))
+            },
+            'metrics': {
+                'enabled': os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+            },
+            'memory': {
+                'budget_mb': int(os.getenv('MEMORY_BUDGET_MB', '0')),
+                'soft_limit': float(os.getenv('MEMORY_SOFT_LIMIT', '0.8')),
+                'check_interval': int(os.getenv('MEMORY_CHECK_INTERVAL', '30')),
+                'tracemalloc': os.getenv('MEMORY_TRACEMALLOC', 'false').lower() == 'true'
+            },
+            'tracing': {
+                'enabled': os.getenv('TRACE_ENABLED', 'true').lower() == 'true',
+                'slow_ms': int(os.getenv('TRACE_SLOW_MS', '2000')),
+                'slow_log_size': int(os.getenv('TRACE_SLOW_LOG_SIZE', '50'))
+            },
+            'events': {
+                'heartbeat': int(os.getenv('EVENTS_HEARTBEAT', '15')),
+                'stream_seconds': int(os.getenv('EVENTS_STREAM_SECONDS', '300')),
+                'retry_ms': int(os.getenv('EVENTS_RETRY_MS', '5000')),
+                'max_streams': int(os.getenv('EVENTS_MAX_STREAMS', '0'))
+            },
             'duckdns': {
                 'domain': os.getenv('DUCKDNS_DOMAIN', ''),
                 'token': os.getenv('DUCKDNS_TOKEN', ''),
@@ -68,6 +210,7 @@ class LazyConfig:
             },
             'update': {
                 'github_repo': os.getenv('GITHUB_REPO', 'revvin76/addarr'),
+                'github_api_url': os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/'),
                 'check_interval': int(os.getenv('CHECK_INTERVAL', '3600')),
                 'last_checked': float(os.getenv('LAST_CHECKED', '0')),
                 'enabled': os.getenv('ENABLE_AUTO_UPDATE', 'false').lower() == 'true',
@@ -83,6 +226,28 @@ class LazyConfig:
                 'username': os.getenv('AUTH_USERNAME', ''),
                 'password': os.getenv('AUTH_PASSWORD', '')
             },
+            'http': {
+                'connect_timeout': float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05')),
+                'read_timeout': float(os.getenv('HTTP_READ_TIMEOUT', '30')),
+                'max_retries': int(os.getenv('HTTP_MAX_RETRIES', '2')),
+                'pool_size': int(os.getenv('HTTP_POOL_SIZE', '10'))
+            },
+            'search': {
+                'timeout': float(os.getenv('SEARCH_TIMEOUT', '10')),
+                'streaming': os.getenv('SEARCH_STREAMING', 'true').lower() == 'true',
+                'cache_ttl': int(os.getenv('SEARCH_CACHE_TTL', '300')),
+                'cache_max_entries': int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '200'))
+            },
+            'webhooks': {
+                'token': os.getenv('WEBHOOK_TOKEN', ''),
+                'resync_interval': int(os.getenv('WEBHOOK_RESYNC_INTERVAL', '86400'))
+            },
+            'library': {
+                'refresh_interval': int(os.getenv('LIBRARY_REFRESH_INTERVAL', '300')),
+                'page_size': int(os.getenv('LIBRARY_PAGE_SIZE', '60')),
+                'sync_mode': os.getenv('LIBRARY_SYNC_MODE', 'full').lower(),
+                'full_resync_interval': int(os.getenv('LIBRARY_FULL_RESYNC_INTERVAL', '86400'))
+            },
             'tunnel': {
                 'enabled': os.getenv('TUNNEL_ENABLED', 'false').lower() == 'true',
                 'auth_token': os.getenv('PINGGY_AUTH_TOKEN', ''),
@@ -90,23 +255,25 @@ class LazyConfig:
             }
         }
         
-        # Wrap each section with ConfigSection for attribute access
-        self._config = {}
-        for key, value in config_data.items():
-            self._config[key] = ConfigSection(value)
-        
+        # Build the whole snapshot first; readers switch to it in one reference assignment
+        self._config = MappingProxyType({key: _section(key, value) for key, value in config_data.items()})
         self._last_reload = time.time()
+        self._expose_sections()
+
+    def _expose_sections(self):
+        """Give each section a class property so CONFIG.x skips the slow __getattr__ fallback"""
+        for name in self._config:
+            if name not in LazyConfig.__dict__:
+                setattr(LazyConfig, name, property(lambda self, name=name: self._config[name]))
     
     def __getattr__(self, name):
-        self._ensure_loaded()
-        if name in self._config:
-            return self._config[name]
+        config = self._config
+        if config is not None and name in config:
+            return config[name]
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
     
     def __getitem__(self, key):
-        self._ensure_loaded()
         return self._config[key]
     
     def get(self, key, default=None):
-        self._ensure_loaded()
-        return self._config.get(key, default)
\ No newline at end of file
+        return self._config.get(key, default)
@@ -0,0 +1,540 @@
+import threading
+import time
+import os
+import logging
+import itertools
+from library_records import RECORD_TYPES
+from memory_manager import SIZE_SAMPLE, approximate_size
+
+class LibraryIndex:
+    """In-memory index of the Radarr/Sonarr libraries keyed by external ID.
+
+    With a shared CacheStore attached, one process downloads each library and
+    publishes it; the other processes adopt the published copy instead of
+    downloading their own. Single-item patches are shared as change entries
+    that every process merges into its copy, with a full copy published
+    again every FULL_PUBLISH_EVERY patches.
+
+    Once Radarr/Sonarr webhooks are arriving for a library, single-item
+    patches keep it current and the full download only runs every
+    webhooks.resync_interval as a safety net. Where webhooks cannot reach
+    us, library.sync_mode 'delta' does the same by polling the arr history
+    for titles changed since the last sync, with a full download every
+    library.full_resync_interval.
+    """
+
+    # Seconds a process may hold the right to download a library
+    LEASE_TTL = 120
+    # Seconds between checks of the shared store for a newer copy
+    SYNC_INTERVAL = 5
+    # Patches shared as change entries before a process publishes the whole library again
+    FULL_PUBLISH_EVERY = 200
+    # Change entries kept in the shared store, across libraries and processes
+    CHANGE_LOG_SIZE = 5000
+    # Delta syncs re-read this many seconds before the watermark, covering clock skew with the arr
+    DELTA_OVERLAP = 60
+    # Seconds after a failed download before requests may trigger another one
+    FAILURE_BACKOFF = 30
+
+    def __init__(self, config, loaders, store=None, events=None, change_loaders=None):
+        self.config = config
+        self._loaders = loaders  # media_type -> callable returning the library as LibraryRecords
+        # media_type -> callable(since) returning {arr id: record, or None if deleted}
+        self._change_loaders = change_loaders or {}
+        self.store = store
+        self.events = events
+        self._indexes = {}  # media_type -> {external_id: record}
+        self._loaded_at = {}
+        self._failed_at = {}  # media_type -> time of the last failed download
+        self._synced_at = {}  # media_type -> publish time of the shared copy we hold
+        self._next_sync_check = {}
+        self._pushed_at = {}  # media_type -> time of the last webhook delivery
+        self._watermarks = {}  # media_type -> time up to which arr changes are merged
+        self._change_positions = {}  # media_type -> store position of the last change entry merged
+        self._patches_since_publish = {}
+        self.version = 0  # Bumped on every change so derived views know to rebuild
+        # Serialises downloads, adoption and patches of one library; re-entrant as sync_changes patches under it
+        self._load_locks = {media_type: threading.RLock() for media_type in loaders}
+        self._pending_lock = threading.Lock()
+        self._pending = set()
+        self.refresh_thread = None
+        self.running = False
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self._stop_event.clear()
+        self.refresh_thread = threading.Thread(
+            target=self._periodic_refresh,
+            daemon=True,
+            name="LibraryIndexRefresh"
+        )
+        self.refresh_thread.start()
+        logging.info("Library index started")
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        if not self.running:
+            return
+
+        self.running = False
+        self._stop_event.set()
+
+        if self.refresh_thread and self.refresh_thread.is_alive():
+            try:
+                self.refresh_thread.join(timeout=2.0)
+                if self.refresh_thread.is_alive():
+                    logging.warning("Library index thread did not stop gracefully")
+            except Exception as e:
+                logging.warning(f"Error stopping library index thread: {e}")
+
+        logging.info("Library index stopped")
+
+    def _periodic_refresh(self):
+        """Reload each library once it is older than its refresh interval"""
+        while self.running and not self._stop_event.is_set():
+            for media_type in self._loaders:
+                if self._stop_event.is_set():
+                    break
+                self._sync_pushed_at(media_type)
+                if media_type not in self._indexes or self._is_stale(media_type):
+                    self.refresh(media_type)
+                elif self._delta_sync_enabled(media_type):
+                    self.sync_changes(media_type)
+
+            if self._stop_event.wait(timeout=self.config.library.refresh_interval):
+                break
+
+    def attach_store(self, store):
+        """Share libraries with other processes through a CacheStore"""
+        self.store = store
+
+    def refresh(self, media_type):
+        """Download one library and atomically swap in a freshly built index"""
+        with self._load_locks[media_type]:
+            return self._load(media_type)
+
+    def _load(self, media_type):
+        """Bring one index up to date; caller holds its load lock"""
+        if self.store is None:
+            return self._download(media_type)
+
+        lease = f"library:{media_type}"
+        deadline = time.time() + self.LEASE_TTL
+        # Webhooks may be arriving at another process, keeping the shared copy current
+        self._sync_pushed_at(media_type)
+        while True:
+            # Another process may already have published a fresh copy
+            self._adopt_shared(media_type)
+            if media_type in self._indexes and not self._is_stale(media_type):
+                self._merge_shared_changes(media_type)
+                return True
+
+            if self.store.acquire_lease(lease, self.LEASE_TTL):
+                try:
+                    return self._download(media_type)
+                finally:
+                    self.store.release_lease(lease)
+
+            # Someone else is downloading; keep serving our copy if we have one
+            if media_type in self._indexes or time.time() > deadline:
+                return False
+            time.sleep(0.5)
+
+    def _download(self, media_type):
+        try:
+            start_time = time.time()
+            # Change entries written from here on may not be in the download, so peers re-apply them
+            position = self._latest_change_position()
+            items = self._loaders[media_type]()
+            if not isinstance(items, list):
+                raise ValueError(f"Unexpected {media_type} library payload")
+
+            index = {}
+            for item in items:
+                external_id = item.external_id
+                if external_id is not None:
+                    index[str(external_id)] = item
+
+            previous = self._indexes.get(media_type)
+            self._swap(media_type, index, time.time())
+            self._change_positions[media_type] = position
+            self._failed_at.pop(media_type, None)
+            self._publish(media_type)
+            # Everything the arr knew when the download started is now merged
+            self._set_watermark(media_type, start_time)
+            # Periodic reloads are only news when titles were added or removed
+            if previous is not None and previous.keys() != index.keys():
+                self._announce(media_type, 'reload')
+
+            if self.config.app.debug:
+                logging.debug(f"Indexed {len(index)} {media_type} items in {time.time() - start_time:.3f}s")
+            return True
+
+        except Exception as e:
+            self._failed_at[media_type] = time.time()
+            logging.error(f"Error refreshing {media_type} library index: {str(e)}")
+            return False
+
+    def _swap(self, media_type, index, loaded_at):
+        self._indexes[media_type] = index
+        self._loaded_at[media_type] = loaded_at
+        self.version += 1
+
+    def _backing_off(self, media_type):
+        return time.time() - self._failed_at.get(media_type, 0) < self.FAILURE_BACKOFF
+
+    def _is_stale(self, media_type):
+        return time.time() - self._loaded_at.get(media_type, 0) > self._refresh_interval(media_type)
+
+    def _refresh_interval(self, media_type):
+        """Full-download interval: long while webhooks or delta syncs keep the index current"""
+        if self._is_pushed(media_type):
+            return self.config.webhooks.resync_interval
+        if self._delta_sync_enabled(media_type):
+            return self.config.library.full_resync_interval
+        return self.config.library.refresh_interval
+
+    def _is_pushed(self, media_type):
+        return time.time() - self._pushed_at.get(media_type, 0) < self.config.webhooks.resync_interval
+
+    # ============ DELTA SYNC ============
+
+    def _delta_sync_enabled(self, media_type):
+        # Webhooks already deliver every change, so history polling would only repeat them
+        return (self.config.library.sync_mode == 'delta' and media_type in self._change_loaders
+                and not self._is_pushed(media_type))
+
+    def sync_changes(self, media_type):
+        """Merge the titles the arr changed since the last sync; cost follows churn, not library size"""
+        with self._load_locks[media_type]:
+            if media_type not in self._indexes:
+                return False
+            started = time.time()
+            since = self._watermark(media_type) - self.DELTA_OVERLAP
+            try:
+                changes = self._change_loaders[media_type](since)
+            except Exception as e:
+                logging.error(f"Error syncing {media_type} library changes: {str(e)}")
+                return False
+
+            if changes and self._patch(media_type, changes):
+                self._announce(media_type, 'sync')
+
+            self._set_watermark(media_type, started)
+            if self.config.app.debug:
+                logging.debug(f"Merged {len(changes)} changed {media_type} items in {time.time() - started:.3f}s")
+            return True
+
+    @staticmethod
+    def _merge_changes(index, changes):
+        """Apply {arr id: record or None} to an index copy in one pass; True if it changed anything"""
+        changed = False
+        deleted = {arr_id for arr_id, record in changes.items() if record is None and arr_id is not None}
+        if deleted:
+            # Deletions only carry the arr's own ID
+            for external_id in [key for key, record in index.items() if record.id in deleted]:
+                del index[external_id]
+                changed = True
+        for record in changes.values():
+            if record is not None and record.external_id is not None:
+                index[str(record.external_id)] = record
+                changed = True
+        return changed
+
+    def _watermark(self, media_type):
+        watermark = self._watermarks.get(media_type, 0)
+        if self.store is not None:
+            try:
+                # A new leader process picks up where the previous one stopped
+                watermark = max(watermark, self.store.get('library_watermark', media_type) or 0)
+            except Exception:
+                pass
+        return watermark or self._loaded_at.get(media_type, time.time())
+
+    def _set_watermark(self, media_type, watermark):
+        self._watermarks[media_type] = watermark
+        if self.store is not None:
+            try:
+                self.store.set('library_watermark', media_type, watermark)
+            except Exception as e:
+                logging.warning(f"Error sharing {media_type} sync watermark: {str(e)}")
+
+    # ============ WEBHOOKS ============
+
+    def mark_pushed(self, media_type):
+        """Record that the arr pushes changes for this library"""
+        if media_type not in self._loaders:
+            return
+        now = time.time()
+        self._pushed_at[media_type] = now
+        if self.store is not None:
+            try:
+                # The process running the periodic refresh may not be the one receiving webhooks
+                self.store.set('library_push', media_type, now)
+            except Exception as e:
+                logging.warning(f"Error sharing {media_type} webhook state: {str(e)}")
+
+    def _sync_pushed_at(self, media_type):
+        if self.store is None:
+            return
+        try:
+            pushed_at = self.store.get('library_push', media_type)
+        except Exception:
+            return
+        if pushed_at:
+            self._pushed_at[media_type] = max(pushed_at, self._pushed_at.get(media_type, 0))
+
+    # ============ SHARED STORE ============
+
+    def _publish(self, media_type):
+        """Write the current index to the shared store for other processes"""
+        if self.store is None or media_type not in self._indexes:
+            return
+        try:
+            published_at = time.time()
+            self.store.set('library', media_type, {
+                'loaded_at': self._loaded_at[media_type],
+                # Change entries after this position are not in the copy; adopters merge them on top
+                'changes_position': self._change_positions.get(media_type, 0),
+                'records': [record.to_state() for record in self._indexes[media_type].values()]
+            })
+            # Kept separately so the freshness check never reads the whole library
+            self.store.set('library_meta', media_type, published_at)
+            self._synced_at[media_type] = published_at
+            self._patches_since_publish[media_type] = 0
+            self.store.prune('library_changes', self.CHANGE_LOG_SIZE)
+        except Exception as e:
+            logging.warning(f"Error publishing {media_type} library index: {str(e)}")
+
+    def _publish_changes(self, media_type, changes):
+        """Share one patch as a change entry, or the whole index once enough patches have piled up"""
+        if self.store is None:
+            return
+        patches = self._patches_since_publish.get(media_type, 0) + 1
+        if patches >= self.FULL_PUBLISH_EVERY:
+            self._publish(media_type)
+            return
+        self._patches_since_publish[media_type] = patches
+        try:
+            self.store.set('library_changes', f"{media_type}-{os.getpid()}-{time.time_ns()}", {
+                'media_type': media_type,
+                'changes': [[arr_id, record.to_state() if record is not None else None]
+                            for arr_id, record in changes.items()]
+            })
+        except Exception as e:
+            logging.warning(f"Error sharing {media_type} library change: {str(e)}")
+
+    def _latest_change_position(self):
+        if self.store is None:
+            return 0
+        try:
+            return self.store.latest_position('library_changes')
+        except Exception:
+            return 0
+
+    def _merge_shared_changes(self, media_type):
+        """Merge change entries written since our copy, in write order; caller holds the load lock.
+
+        Our own entries come back too; merging them again keeps every process
+        applying the same patches in the same order.
+        """
+        if self.store is None or media_type not in self._indexes:
+            return False
+        try:
+            entries = self.store.items_since('library_changes', self._change_positions.get(media_type, 0))
+        except Exception as e:
+            logging.warning(f"Error reading shared {media_type} library changes: {str(e)}")
+            return False
+        if not entries:
+            return False
+
+        record_type = RECORD_TYPES[media_type]
+        index = dict(self._indexes[media_type])
+        changed = False
+        for value, position in entries:
+            if value.get('media_type') != media_type:
+                continue
+            changes = {
+                arr_id: record_type.from_state(state) if state is not None else None
+                for arr_id, state in value['changes']
+            }
+            changed = self._merge_changes(index, changes) or changed
+        self._change_positions[media_type] = entries[-1][1]
+        if changed:
+            self._indexes[media_type] = index
+            self.version += 1
+        return changed
+
+    def _announce(self, media_type, action, external_id=None):
+        """Tell connected clients the library changed; adopting a shared copy is not announced again"""
+        if self.events is not None:
+            self.events.publish('library', {
+                'media_type': media_type,
+                'action': action,
+                'id': external_id,
+                'items': len(self._indexes.get(media_type, {}))
+            })
+
+    def _adopt_shared(self, media_type):
+        """Swap in the shared copy if it is newer than ours; True if we adopted it"""
+        try:
+            published_at = self.store.get('library_meta', media_type)
+            if not published_at or published_at <= self._synced_at.get(media_type, 0):
+                return False
+            payload = self.store.get('library', media_type)
+            if not payload:
+                return False
+
+            record_type = RECORD_TYPES[media_type]
+            index = {}
+            for state in payload['records']:
+                record = record_type.from_state(state)
+                index[str(record.external_id)] = record
+
+            self._swap(media_type, index, payload['loaded_at'])
+            self._change_positions[media_type] = payload.get('changes_position', 0)
+            self._synced_at[media_type] = published_at
+            return True
+        except Exception as e:
+            logging.warning(f"Error reading shared {media_type} library index: {str(e)}")
+            return False
+
+    def _shared_copy_is_newer(self, media_type):
+        """Cheap, rate-limited check for a copy published by another process.
+
+        Without one, change entries from other processes are merged inline,
+        unless a download holds the library.
+        """
+        now = time.time()
+        if now < self._next_sync_check.get(media_type, 0):
+            return False
+        self._next_sync_check[media_type] = now + self.SYNC_INTERVAL
+        try:
+            published_at = self.store.get('library_meta', media_type)
+        except Exception:
+            return False
+        if published_at and published_at > self._synced_at.get(media_type, 0):
+            return True
+
+        lock = self._load_locks[media_type]
+        if lock.acquire(blocking=False):
+            try:
+                self._merge_shared_changes(media_type)
+            finally:
+                lock.release()
+        return False
+
+    def _refresh_in_background(self, media_type):
+        """Start a one-off refresh unless one is already pending"""
+        with self._pending_lock:
+            if media_type in self._pending:
+                return
+            self._pending.add(media_type)
+
+        def worker():
+            try:
+                self.refresh(media_type)
+            finally:
+                with self._pending_lock:
+                    self._pending.discard(media_type)
+
+        threading.Thread(target=worker, daemon=True, name=f"LibraryRefresh-{media_type}").start()
+
+    def _get_index(self, media_type):
+        """Return the index for a media type, loading it on first use"""
+        index = self._indexes.get(media_type)
+        if index is None and media_type in self._failed_at:
+            # The arr was unreachable; answer without the library and retry off the request path
+            if not self._backing_off(media_type):
+                self._refresh_in_background(media_type)
+            return {}
+        if index is None:
+            # First use blocks once; concurrent callers wait on the same load
+            with self._load_locks[media_type]:
+                if media_type not in self._indexes and media_type not in self._failed_at:
+                    self._load(media_type)
+            index = self._indexes.get(media_type, {})
+        elif ((self._is_stale(media_type) and not self._backing_off(media_type))
+              or (self.store is not None and self._shared_copy_is_newer(media_type))):
+            # Serve the current copy and refresh (or adopt the shared one) behind it
+            self._refresh_in_background(media_type)
+        return index
+
+    def get(self, media_type, external_id):
+        """O(1) lookup of a library record by TMDB (movie) or TVDB (tv) ID"""
+        if media_type not in self._loaders or external_id is None:
+            return None
+        return self._get_index(media_type).get(str(external_id))
+
+    def items(self, media_type):
+        """All records for a media type (shared, read only)"""
+        if media_type not in self._loaders:
+            return []
+        return list(self._get_index(media_type).values())
+
+    def contains(self, media_type, external_id):
+        return self.get(media_type, external_id) is not None
+
+    def upsert(self, media_type, record):
+        """Insert or replace a single record, e.g. after adding it through the API"""
+        external_id = record.external_id
+        if external_id is None:
+            return
+
+        if self._patch(media_type, {record.id: record}):
+            self._announce(media_type, 'upsert', external_id)
+
+    def remove(self, media_type, external_id):
+        """Drop a single record, e.g. when the arr no longer knows about it"""
+        record = self.get(media_type, external_id)
+        if record is None or record.id is None:
+            return
+
+        if self._patch(media_type, {record.id: None}):
+            self._announce(media_type, 'remove', external_id)
+
+    def _patch(self, media_type, changes):
+        """Merge {arr id: record or None} into a copy of the index and swap it in; True if it changed anything"""
+        if media_type not in self._loaders:
+            return False
+        # Patching an index we never loaded would be lost (or clobber the shared copy)
+        self._get_index(media_type)
+        if media_type not in self._indexes:
+            return False
+
+        # A download swapping in a fresh index mid-patch would otherwise be overwritten by the patched old copy
+        with self._load_locks[media_type]:
+            if self.store is not None:
+                # Catch up with other processes first, so a full publish carries their patches too
+                self._adopt_shared(media_type)
+                self._merge_shared_changes(media_type)
+            # Copy-on-write so lock-free readers never see a dict being mutated
+            index = dict(self._indexes[media_type])
+            if not self._merge_changes(index, changes):
+                return False
+            self._indexes[media_type] = index
+            self.version += 1
+            self._publish_changes(media_type, changes)
+            return True
+
+    def memory_usage(self):
+        """Records held across media types; the index is never shed, as lookups depend on it"""
+        indexes = list(self._indexes.values())
+        count = sum(len(index) for index in indexes)
+        sample = [record for index in indexes for record in itertools.islice(index.values(), SIZE_SAMPLE)]
+        return {'entries': count, 'approx_bytes': approximate_size(sample, count)}
+
+    def stats(self):
+        return {
+            media_type: {
+                'items': len(self._indexes.get(media_type, {})),
+                'loaded_at': self._loaded_at.get(media_type),
+                'pushed_at': self._pushed_at.get(media_type),
+                'synced_to': self._watermarks.get(media_type)
+            }
+            for media_type in self._loaders
+        }
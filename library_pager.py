@@ -0,0 +1,157 @@
+import sys
+import threading
+import base64
+import json
+from collections import OrderedDict
+from memory_manager import approximate_size, shed_oldest
+
+class LibraryPager:
+    """Sorted, filtered, cursor-paginated views over the library index"""
+
+    # Sort key name -> function extracting the primary sort value from a record
+    SORT_KEYS = {
+        'title': lambda record: record.sort_key,
+        'added': lambda record: record.added or '',
+        'size': lambda record: record.size_on_disk
+    }
+    MEDIA_TYPES = ('movie', 'tv')
+    MAX_VIEWS = 16
+
+    def __init__(self, library_index):
+        self.library_index = library_index
+        self._views = OrderedDict()  # (media_type, sort, order, query) -> (version, view)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encode_cursor(position_key):
+        raw = json.dumps(position_key, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii'))))
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+    def _position_key(self, sort, media_type, record):
+        """Total order for a record: sort value, then title, type and internal ID as tie-breakers"""
+        return (self.SORT_KEYS[sort](record), record.sort_key, media_type, record.id or 0)
+
+    def _build_view(self, media_type, sort, order, query):
+        media_types = self.MEDIA_TYPES if media_type == 'all' else (media_type,)
+        rows = []
+        for current_type in media_types:
+            for record in self.library_index.items(current_type):
+                if query and query not in (record.title or '').lower():
+                    continue
+                rows.append((self._position_key(sort, current_type, record), current_type, record))
+
+        rows.sort(key=lambda row: row[0], reverse=(order == 'desc'))
+        # Keyed like the cursor's last two fields, so id-less records still hit the fast path
+        positions = {(row[0][2], row[0][3]): i for i, row in enumerate(rows)}
+        return rows, positions
+
+    def _get_view(self, media_type, sort, order, query):
+        """Reuse a sorted view until the library index changes"""
+        key = (media_type, sort, order, query)
+        version = self.library_index.version
+        with self._lock:
+            cached = self._views.get(key)
+            if cached is not None and cached[0] == version:
+                self._views.move_to_end(key)
+                return cached[1]
+
+        view = self._build_view(media_type, sort, order, query)
+        # Loading the index on first use bumps its version, so record the one now current
+        with self._lock:
+            self._views[key] = (self.library_index.version, view)
+            self._views.move_to_end(key)
+            while len(self._views) > self.MAX_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    def shed(self, fraction):
+        """Drop the least recently used fraction of the sorted views; they are rebuilt from the index"""
+        with self._lock:
+            return shed_oldest(self._views, fraction)
+
+    def memory_usage(self):
+        """Views share their records with the library index; only the rows and positions are counted"""
+        with self._lock:
+            views = [view for _, view in self._views.values()]
+        rows = sum(len(view[0]) for view in views)
+        sample = [row for view in views for row in view[0][:4]]
+        # Each row is a tuple holding its position key, plus an entry in the positions dict
+        keys = approximate_size([row[0] for row in sample], rows)
+        overhead = rows * (sys.getsizeof(sample[0]) + 100) if sample else 0
+        return {'entries': len(views), 'approx_bytes': keys + overhead}
+
+    def _start_position(self, view, cursor, order):
+        """Index of the first row after the cursor"""
+        if not cursor:
+            return 0
+        rows, positions = view
+        position_key = self.decode_cursor(cursor)
+        if len(position_key) != 4:
+            raise ValueError('Invalid cursor')
+
+        # Fast path: the cursor row still exists. Id-less records share an ID of 0, so check the whole key
+        index = positions.get((position_key[2], position_key[3]))
+        if index is not None and list(rows[index][0]) == list(position_key):
+            return index + 1
+
+        # The row was removed since the cursor was issued; resume at the next key
+        for i, row in enumerate(rows):
+            try:
+                past = row[0] < position_key if order == 'desc' else row[0] > position_key
+            except TypeError:
+                raise ValueError('Invalid cursor')
+            if past:
+                return i
+        return len(rows)
+
+    @staticmethod
+    def project(record):
+        """The handful of fields the manage page renders"""
+        return {
+            'media_type': record.media_type,
+            'id': record.id,
+            'external_id': record.external_id,
+            'title': record.title,
+            'year': record.year,
+            'status': record.status,
+            'monitored': record.monitored,
+            'certification': record.certification,
+            'runtime': record.runtime,
+            'season_count': getattr(record, 'season_count', None),
+            'overview': record.overview,
+            'poster': record.poster,
+            'added': record.added,
+            'size_on_disk': record.size_on_disk
+        }
+
+    def page(self, media_type='all', sort='title', order='asc', cursor=None, limit=50, query=''):
+        """One page of projected library items plus the cursor for the next page"""
+        if media_type != 'all' and media_type not in self.MEDIA_TYPES:
+            raise ValueError(f"Unknown media type: {media_type}")
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Unknown sort order: {order}")
+
+        query = (query or '').strip().lower()
+        view = self._get_view(media_type, sort, order, query)
+        rows = view[0]
+        start = self._start_position(view, cursor, order)
+        page_rows = rows[start:start + limit]
+
+        next_cursor = None
+        if start + limit < len(rows) and page_rows:
+            next_cursor = self.encode_cursor(page_rows[-1][0])
+
+        return {
+            'items': [self.project(row[2]) for row in page_rows],
+            'next_cursor': next_cursor,
+            'total': len(rows)
+        }
@@ -0,0 +1,159 @@
+import sys
+import threading
+from abc import ABC, abstractmethod
+
+# Overviews are only shown as a two-line teaser in library listings
+OVERVIEW_LENGTH = 200
+
+_shared_tuples = {}
+_shared_lock = threading.Lock()
+
+def _intern(value):
+    """Intern short strings that repeat across thousands of records"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _intern_tuple(values):
+    """Share one tuple instance per distinct combination, e.g. a genre list"""
+    key = tuple(_intern(value) for value in values or ())
+    if not key:
+        return ()
+    shared = _shared_tuples.get(key)
+    if shared is None:
+        with _shared_lock:
+            shared = _shared_tuples.setdefault(key, key)
+    return shared
+
+def _poster_url(data):
+    for image in data.get('images') or []:
+        if image.get('coverType') == 'poster' and image.get('remoteUrl'):
+            return image['remoteUrl']
+    return data.get('remotePoster')
+
+def _overview(data):
+    overview = data.get('overview') or ''
+    return overview[:OVERVIEW_LENGTH] if len(overview) > OVERVIEW_LENGTH else overview
+
+class LibraryRecord(ABC):
+    """Compact, read-only view of one Radarr/Sonarr library item.
+
+    Only the fields the library index, status checks and manage page use are
+    kept. Full details are still fetched from the arr on demand.
+    """
+    __slots__ = ()
+    media_type = None
+    # Repeating string fields, interned again when a record is restored
+    INTERNED = ()
+
+    @property
+    @abstractmethod
+    def external_id(self):
+        """ID the index is keyed by: TMDB for movies, TVDB for series"""
+
+    def to_state(self):
+        """Field values in slot order, for sharing through a JSON cache store"""
+        return [getattr(self, slot) for slot in self.__slots__]
+
+    @classmethod
+    def from_state(cls, state):
+        record = cls()
+        for slot, value in zip(cls.__slots__, state):
+            setattr(record, slot, value)
+        for slot in cls.INTERNED:
+            setattr(record, slot, _intern(getattr(record, slot)))
+        record.genres = _intern_tuple(record.genres)
+        return record
+
+    @property
+    def sort_key(self):
+        return (self.sort_title or self.title or '').lower()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.id} {self.title!r}>"
+
+class MovieRecord(LibraryRecord):
+    __slots__ = (
+        'id', 'tmdb_id', 'imdb_id', 'title', 'sort_title', 'year', 'status', 'monitored',
+        'has_file', 'certification', 'runtime', 'genres', 'root_folder_path',
+        'quality_profile_id', 'added', 'size_on_disk', 'poster', 'overview'
+    )
+    media_type = 'movie'
+    INTERNED = ('status', 'certification', 'root_folder_path')
+
+    @classmethod
+    def from_json(cls, data):
+        """Project a Radarr /api/v3/movie item"""
+        record = cls()
+        record.id = data.get('id')
+        record.tmdb_id = data.get('tmdbId')
+        record.imdb_id = data.get('imdbId')
+        record.title = data.get('title')
+        record.sort_title = data.get('sortTitle')
+        record.year = data.get('year')
+        record.status = _intern(data.get('status'))
+        record.monitored = bool(data.get('monitored', False))
+        record.has_file = bool(data.get('hasFile', False))
+        record.certification = _intern(data.get('certification'))
+        record.runtime = data.get('runtime')
+        record.genres = _intern_tuple(data.get('genres'))
+        record.root_folder_path = _intern(data.get('rootFolderPath'))
+        record.quality_profile_id = data.get('qualityProfileId')
+        record.added = data.get('added')
+        # Radarr v5 moved the size under statistics
+        record.size_on_disk = data.get('sizeOnDisk') or (data.get('statistics') or {}).get('sizeOnDisk') or 0
+        record.poster = _poster_url(data)
+        record.overview = _overview(data)
+        return record
+
+    @property
+    def external_id(self):
+        return self.tmdb_id
+
+class SeriesRecord(LibraryRecord):
+    __slots__ = (
+        'id', 'tvdb_id', 'tmdb_id', 'imdb_id', 'title', 'sort_title', 'year', 'status',
+        'monitored', 'certification', 'runtime', 'network', 'genres', 'root_folder_path',
+        'quality_profile_id', 'added', 'size_on_disk', 'season_count', 'episode_count',
+        'episode_file_count', 'percent_of_episodes', 'poster', 'overview'
+    )
+    media_type = 'tv'
+    INTERNED = ('status', 'certification', 'network', 'root_folder_path')
+
+    @classmethod
+    def from_json(cls, data):
+        """Project a Sonarr /api/v3/series item"""
+        statistics = data.get('statistics') or {}
+        record = cls()
+        record.id = data.get('id')
+        record.tvdb_id = data.get('tvdbId')
+        record.tmdb_id = data.get('tmdbId')
+        record.imdb_id = data.get('imdbId')
+        record.title = data.get('title')
+        record.sort_title = data.get('sortTitle')
+        record.year = data.get('year')
+        record.status = _intern(data.get('status'))
+        record.monitored = bool(data.get('monitored', False))
+        record.certification = _intern(data.get('certification'))
+        record.runtime = data.get('runtime')
+        record.network = _intern(data.get('network'))
+        record.genres = _intern_tuple(data.get('genres'))
+        record.root_folder_path = _intern(data.get('rootFolderPath'))
+        record.quality_profile_id = data.get('qualityProfileId')
+        record.added = data.get('added')
+        record.size_on_disk = statistics.get('sizeOnDisk') or 0
+        record.season_count = statistics.get('seasonCount', 0)
+        record.episode_count = statistics.get('episodeCount', 0)
+        record.episode_file_count = statistics.get('episodeFileCount', 0)
+        record.percent_of_episodes = statistics.get('percentOfEpisodes', 0)
+        record.poster = _poster_url(data)
+        record.overview = _overview(data)
+        return record
+
+    @property
+    def external_id(self):
+        return self.tvdb_id
+
+RECORD_TYPES = {'movie': MovieRecord, 'tv': SeriesRecord}
+
+def project(media_type, data):
+    """Convert one arr JSON item into its compact record"""
+    return RECORD_TYPES[media_type].from_json(data)
@@ -2,38 +2,154 @@ import threading
 import time
 import logging
 import gc
+import sys
+import math
+import tracemalloc
 import psutil
 
+try:
+    import ctypes
+    _libc = ctypes.CDLL('libc.so.6')
+    _malloc_trim = _libc.malloc_trim
+except (ImportError, OSError, AttributeError):
+    _malloc_trim = None  # Not glibc; freed memory is returned when the allocator decides
+
+# Entries measured per cache when estimating its size
+SIZE_SAMPLE = 16
+
+def process_memory(process=None):
+    """Memory, thread and open file figures for one process (this one by default).
+
+    Reported by /api/debug/memory and sampled per worker by the soak test.
+    """
+    process = process or psutil.Process()
+    memory_info = process.memory_info()
+    return {
+        'rss_mb': memory_info.rss / 1024 / 1024,
+        'vms_mb': memory_info.vms / 1024 / 1024,
+        'percent': process.memory_percent(),
+        'open_files': len(process.open_files()),
+        'threads': process.num_threads(),
+    }
+
+def _deep_size(value, seen, depth=0):
+    """Bytes held by an object and everything it references, shared objects counted once"""
+    if id(value) in seen or depth > 12:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _deep_size(key, seen, depth + 1) + _deep_size(item, seen, depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _deep_size(item, seen, depth + 1)
+    else:
+        for cls in type(value).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                size += _deep_size(getattr(value, name, None), seen, depth + 1)
+        if hasattr(value, '__dict__'):
+            size += _deep_size(vars(value), seen, depth + 1)
+    return size
+
+def approximate_size(values, count=None):
+    """Estimated bytes of a cache's values, measuring at most SIZE_SAMPLE of them.
+
+    `values` is a list; `count` is the number of entries it stands for when
+    it is already a sample.
+    """
+    count = len(values) if count is None else count
+    if not values:
+        return 0
+    step = max(1, len(values) // SIZE_SAMPLE)
+    sample = values[::step][:SIZE_SAMPLE]
+    measured = sum(_deep_size(value, set()) for value in sample)
+    return int(measured / len(sample) * count)
+
+def shed_oldest(entries, fraction):
+    """Drop the least recently used fraction of an OrderedDict; returns how many went"""
+    count = min(len(entries), math.ceil(len(entries) * fraction))
+    for _ in range(count):
+        entries.popitem(last=False)
+    return count
+
 class MemoryManager:
-    """Manage memory usage and perform cleanup"""
+    """Keep the process under its memory budget by asking caches to shrink.
+
+    Caches register with a priority; lower priorities are shed first. A
+    cache provides memory_usage(), returning its entry count and approximate
+    bytes, and shed(fraction), dropping that fraction of its entries and
+    returning how many it dropped. Caches without shed() are only reported.
+
+    Past memory.soft_limit of the budget, half of each cache goes, in
+    priority order, until the process is back under the soft limit. Over
+    the budget itself, caches are emptied. Evicted entries are refetched
+    (or read back from the shared store) on next use.
+    """
     def __init__(self, config):
         self.config = config
         self.cleanup_thread = None
         self.running = False
         self._stop_event = threading.Event()  # Add stop event for cleaner shutdown
-    
-    def start(self):
+        self._caches = {}  # name -> (priority, cache)
+        self._lock = threading.Lock()
+        self._govern_lock = threading.Lock()
+        self.evictions = {}  # name -> entries shed since start
+        self.last_check = None
+        self.last_pressure = None
+        self.last_shed = None
+        self.processes = 1  # serving processes sharing the machine's memory
+
+    def register(self, name, cache, priority):
+        """Let the governor report on and shrink a cache"""
+        with self._lock:
+            self._caches[name] = (priority, cache)
+            self.evictions.setdefault(name, 0)
+
+    def _registered(self):
+        with self._lock:
+            return sorted(self._caches.items(), key=lambda item: item[1][0])
+
+    @property
+    def budget_mb(self):
+        """RSS budget; without MEMORY_BUDGET_MB, an equal share of 80% of system memory per process"""
+        budget = self.config.memory.budget_mb
+        if budget > 0:
+            return budget
+        return psutil.virtual_memory().total / 1024 / 1024 * 0.8 / self.processes
+
+    @property
+    def soft_limit_mb(self):
+        return self.budget_mb * self.config.memory.soft_limit
+
+    def start(self, processes=1):
+        """Govern this process; `processes` is how many serving processes split the default budget"""
         if self.running:
             return
-            
+
+        self.processes = max(1, processes)
+
+        if self.config.memory.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
         self.running = True
         self._stop_event.clear()
         self.cleanup_thread = threading.Thread(
             target=self._periodic_cleanup,
             daemon=True,
-            name="MemoryCleanup"
+            name="MemoryGovernor"
         )
         self.cleanup_thread.start()
-        logging.info("Memory manager started")
-    
+        logging.info(f"Memory manager started (budget {self.budget_mb:.0f} MB)")
+
     def stop(self):
         """Stop the memory manager"""
         if not self.running:
             return
-            
+
         self.running = False
         self._stop_event.set()  # Signal thread to stop
-        
+
         if self.cleanup_thread and self.cleanup_thread.is_alive():
             try:
                 self.cleanup_thread.join(timeout=2.0)  # Reduced timeout
@@ -41,31 +157,147 @@ class MemoryManager:
                     logging.warning("Memory cleanup thread did not stop gracefully")
             except Exception as e:
                 logging.warning(f"Error stopping memory thread: {e}")
-        
+
         logging.info("Memory manager stopped")
-    
+
     def _periodic_cleanup(self):
-        """Perform periodic memory cleanup"""
+        """Check memory pressure on the configured interval"""
         while self.running and not self._stop_event.is_set():
             try:
                 # Use wait with timeout instead of sleep for quicker shutdown
-                if self._stop_event.wait(timeout=300):  # 5 minutes
+                if self._stop_event.wait(timeout=self.config.memory.check_interval):
                     break  # Exit if stop event is set
-                
-                # Force garbage collection
-                collected = gc.collect()
-                if collected > 0 and self.config.app.debug:
-                    logging.debug(f"Garbage collector collected {collected} objects")
-                
-                # Check memory usage
-                process = psutil.Process()
-                memory_percent = process.memory_percent()
-                
-                if memory_percent > 80:
-                    logging.warning(f"High memory usage: {memory_percent:.1f}%")
-                    # Additional aggressive cleanup
-                    gc.collect(generation=2)
-                    
+                self.govern()
             except Exception as e:
                 logging.error(f"Memory cleanup error: {str(e)}")
-                # Continue running despite errors
\ No newline at end of file
+                # Continue running despite errors
+
+    # ============ GOVERNING ============
+
+    @staticmethod
+    def _rss_mb():
+        return psutil.Process().memory_info().rss / 1024 / 1024
+
+    @staticmethod
+    def _release():
+        """Collect cycles and hand freed heap pages back to the OS"""
+        collected = gc.collect()
+        if _malloc_trim is not None:
+            try:
+                _malloc_trim(0)
+            except Exception:
+                pass
+        return collected
+
+    def pressure(self, rss_mb=None):
+        """'ok' under the soft limit, 'high' between it and the budget, 'critical' over the budget"""
+        rss_mb = self._rss_mb() if rss_mb is None else rss_mb
+        if rss_mb >= self.budget_mb:
+            return 'critical'
+        if rss_mb >= self.soft_limit_mb:
+            return 'high'
+        return 'ok'
+
+    def govern(self):
+        """Shed caches in priority order until RSS is back under the soft limit.
+
+        Returns {cache name: entries shed} for this pass.
+        """
+        with self._govern_lock:
+            rss_mb = self._rss_mb()
+            pressure = self.pressure(rss_mb)
+            self.last_check = time.time()
+            self.last_pressure = pressure
+            if pressure == 'ok':
+                return {}
+
+            fraction = 1.0 if pressure == 'critical' else 0.5
+            logging.warning(
+                f"Memory pressure {pressure}: RSS {rss_mb:.0f} MB of a {self.budget_mb:.0f} MB budget, "
+                f"shedding {fraction:.0%} of each cache"
+            )
+            shed = {}
+            for name, (priority, cache) in self._registered():
+                if not hasattr(cache, 'shed'):
+                    continue
+                try:
+                    count = cache.shed(fraction)
+                except Exception as e:
+                    logging.warning(f"Error shedding {name} cache: {str(e)}")
+                    continue
+                if not count:
+                    continue
+                shed[name] = count
+                with self._lock:
+                    self.evictions[name] = self.evictions.get(name, 0) + count
+                self._release()
+                rss_mb = self._rss_mb()
+                if rss_mb < self.soft_limit_mb:
+                    break
+
+            if not shed:
+                self._release()
+                rss_mb = self._rss_mb()
+            self.last_shed = {'at': self.last_check, 'pressure': pressure, 'entries': shed}
+            logging.info(f"Shed cache entries {shed}; RSS now {rss_mb:.0f} MB")
+            if rss_mb >= self.budget_mb:
+                logging.warning(f"Still over the memory budget after shedding caches: RSS {rss_mb:.0f} MB")
+            return shed
+
+    # ============ REPORTING ============
+
+    def cache_usage(self):
+        """Entries and approximate size of every registered cache"""
+        caches = {}
+        for name, (priority, cache) in self._registered():
+            try:
+                usage = cache.memory_usage()
+            except Exception as e:
+                usage = {'error': str(e)}
+            caches[name] = {
+                'priority': priority,
+                'sheddable': hasattr(cache, 'shed'),
+                'entries': usage.get('entries'),
+                'approx_mb': round(usage.get('approx_bytes', 0) / 1024 / 1024, 2),
+                'evicted': self.evictions.get(name, 0)
+            }
+            if 'error' in usage:
+                caches[name]['error'] = usage['error']
+        return caches
+
+    def status(self):
+        rss_mb = self._rss_mb()
+        return {
+            'budget_mb': round(self.budget_mb, 1),
+            'soft_limit_mb': round(self.soft_limit_mb, 1),
+            'rss_mb': round(rss_mb, 1),
+            'pressure': self.pressure(rss_mb),
+            'check_interval': self.config.memory.check_interval,
+            'last_check': self.last_check,
+            'last_shed': self.last_shed,
+            'caches': self.cache_usage()
+        }
+
+    @staticmethod
+    def top_allocators(limit=10):
+        """Source lines holding the most traced memory, when tracemalloc is on"""
+        if not tracemalloc.is_tracing():
+            return {'tracing': False, 'hint': 'Set MEMORY_TRACEMALLOC=true to record allocations'}
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        return {
+            'tracing': True,
+            'traced_mb': round(current / 1024 / 1024, 2),
+            'peak_mb': round(peak / 1024 / 1024, 2),
+            'top': [
+                {
+                    'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size_kb': round(stat.size / 1024, 1),
+                    'count': stat.count
+                }
+                for stat in snapshot.statistics('lineno')[:limit]
+            ]
+        }
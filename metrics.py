@@ -0,0 +1,325 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+from werkzeug.wsgi import ClosingIterator
+
+# Prometheus' default buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# WSGI environ key the matched route is kept under until the response closes
+ROUTE_KEY = 'addarr.metrics.route'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """One metric family: a value per combination of label values.
+
+    State is a dict of JSON-encoded label values to numbers (or lists of
+    numbers), so it can be shared through a CacheStore and summed across
+    worker processes.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def state(self):
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def merge(states):
+        merged = {}
+        for state in states:
+            for key, value in state.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self, state):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key in sorted(state):
+            lines.append(f"{self.name}{_label_text(self.labels, json.loads(key))} {_format_number(state[key])}")
+        return lines
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        key = json.dumps(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+class Histogram(Metric):
+    """Bucketed observations; each value is [count per bucket..., +Inf count, sum]"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        key = json.dumps(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    @staticmethod
+    def merge(states):
+        merged = {}
+        for state in states:
+            for key, value in state.items():
+                if key in merged and len(merged[key]) == len(value):
+                    merged[key] = [a + b for a, b in zip(merged[key], value)]
+                else:
+                    merged[key] = list(value)
+        return merged
+
+    def render(self, state):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key in sorted(state):
+            values = json.loads(key)
+            counts, total = state[key][:-1], state[key][-1]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, values)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, values)} {cumulative}")
+        return lines
+
+class Metrics:
+    """Always-on request and upstream call metrics behind /metrics.
+
+    Every request is timed by WSGI middleware until its response body has
+    been sent. Streamed responses (SSE, streamed search results) stay open
+    for as long as the client reads, so they are timed to their headers
+    instead; they are still in flight until they close. HttpClient reports each
+    upstream call. Recording is a dict update under a lock; rendering in the
+    Prometheus text format only happens when /metrics is scraped.
+
+    With a shared CacheStore attached, each worker process publishes its
+    totals every few seconds and /metrics reports the sum over all live
+    workers, whichever of them answers the scrape.
+    """
+
+    # Seconds between publishing this process's totals to the shared store
+    PUBLISH_INTERVAL = 5.0
+
+    def __init__(self, config):
+        self.config = config
+        self.store = None
+        self.requests = Histogram(
+            'addarr_http_request_duration_seconds',
+            'Time to serve a request, until its response body was sent',
+            ('method', 'route', 'status')
+        )
+        self.in_flight = Gauge(
+            'addarr_http_requests_in_flight',
+            'Requests currently being served',
+            ('route',)
+        )
+        self.upstream = Histogram(
+            'addarr_upstream_request_duration_seconds',
+            'Time until Radarr, Sonarr, TMDB, GitHub or an image host answered, retries included',
+            ('backend', 'method', 'status')
+        )
+        self._families = (self.requests, self.in_flight, self.upstream)
+        self._dirty = False
+        self._publisher_pid = None
+        self._publish_lock = threading.Lock()
+        self.publish_thread = None
+        self.running = False
+        self._stop_event = threading.Event()
+
+    def attach_store(self, store):
+        """Report the totals of every worker process sharing the store"""
+        self.store = store
+
+    @property
+    def enabled(self):
+        return self.config.metrics.enabled
+
+    # ============ RECORDING ============
+
+    def instrument(self, app):
+        """Time every request the Flask app serves"""
+        if not self.enabled:
+            return
+
+        wsgi_app = app.wsgi_app
+
+        def timed_app(environ, start_response):
+            start = time.perf_counter()
+            status = ['500']
+            streamed = [False]
+
+            def capture_status(status_line, headers, exc_info=None):
+                status[0] = status_line.split(' ', 1)[0]
+                streamed[0] = not any(name.lower() == 'content-length' for name, _ in headers)
+                return start_response(status_line, headers, exc_info)
+
+            try:
+                body = wsgi_app(environ, capture_status)
+            except Exception:
+                self._finish(environ, start, '500')
+                raise
+            # A stream's first chunk follows its headers at once
+            ended = time.perf_counter() if streamed[0] else None
+            return ClosingIterator(body, lambda: self._finish(environ, start, status[0], ended))
+
+        app.wsgi_app = timed_app
+        app.before_request(self._route_started)
+
+    def _route_started(self):
+        from flask import request
+        # The URL rule, not the path, so IDs in URLs don't create new series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request.environ[ROUTE_KEY] = route
+        self.in_flight.inc((route,))
+
+    def _finish(self, environ, start, status, ended=None):
+        route = environ.get(ROUTE_KEY)
+        if route is not None:
+            self.in_flight.dec((route,))
+        self.requests.observe((environ.get('REQUEST_METHOD', ''), route or 'unmatched', status),
+                              (ended or time.perf_counter()) - start)
+        self._changed()
+
+    def observe_upstream(self, backend, method, status, seconds):
+        self.upstream.observe((backend, method, str(status)), seconds)
+        self._changed()
+
+    def _changed(self):
+        self._dirty = True
+        if self.store is not None and self._publisher_pid != os.getpid():
+            self._start_publisher()
+
+    # ============ SHARING ============
+
+    def _start_publisher(self):
+        with self._publish_lock:
+            if self._publisher_pid == os.getpid():
+                return
+            # A forked worker starts its own; the parent's thread did not survive the fork
+            self._publisher_pid = os.getpid()
+            self.running = True
+            self._stop_event.clear()
+            self.publish_thread = threading.Thread(
+                target=self._publish_periodically,
+                daemon=True,
+                name="MetricsPublisher"
+            )
+            self.publish_thread.start()
+
+    def _publish_periodically(self):
+        while self.running and not self._stop_event.is_set():
+            if self._stop_event.wait(timeout=self.PUBLISH_INTERVAL):
+                break
+            self.publish()
+
+    def publish(self):
+        """Write this process's totals to the shared store if they changed"""
+        if self.store is None or not self._dirty:
+            return
+        self._dirty = False
+        try:
+            self.store.set('metrics', str(os.getpid()), {
+                'pid': os.getpid(),
+                'metrics': self.snapshot()
+            })
+        except Exception as e:
+            self._dirty = True
+            logging.warning(f"Error publishing metrics: {str(e)}")
+
+    def snapshot(self):
+        return {family.name: family.state() for family in self._families}
+
+    def _worker_snapshots(self):
+        """Own live totals plus the last published totals of other live workers"""
+        snapshots = [self.snapshot()]
+        if self.store is None:
+            return snapshots
+
+        try:
+            published = self.store.items_since('metrics', 0)
+        except Exception as e:
+            logging.warning(f"Error reading shared metrics: {str(e)}")
+            return snapshots
+
+        for value, _ in published:
+            pid = value.get('pid')
+            if pid == os.getpid():
+                continue
+            if not _pid_alive(pid):
+                # A recycled or crashed worker; its counts leave the totals
+                self.store.delete('metrics', str(pid))
+                continue
+            snapshots.append(value.get('metrics') or {})
+        return snapshots
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        snapshots = self._worker_snapshots()
+        lines = []
+        for family in self._families:
+            state = family.merge(snapshot.get(family.name, {}) for snapshot in snapshots)
+            lines.extend(family.render(state))
+        lines.extend([
+            '# HELP addarr_metrics_workers Worker processes included in these totals',
+            '# TYPE addarr_metrics_workers gauge',
+            f"addarr_metrics_workers {len(snapshots)}"
+        ])
+        return '\n'.join(lines) + '\n'
+
+    def stop(self):
+        """Stop the publisher thread"""
+        self.running = False
+        self._stop_event.set()
+        if self.publish_thread and self.publish_thread.is_alive():
+            try:
+                self.publish_thread.join(timeout=2.0)
+            except Exception as e:
+                logging.warning(f"Error stopping metrics publisher: {e}")
+
+def _pid_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,249 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from cache_store import FileStore
+from memory_manager import approximate_size, shed_oldest
+
+class CacheEntry:
+    """A cached JSON response plus the validators needed to revalidate it"""
+    __slots__ = ('data', 'etag', 'last_modified', 'fetched_at')
+
+    def __init__(self, data, etag=None, last_modified=None, fetched_at=None):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+    def to_dict(self):
+        return {
+            'data': self.data,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'fetched_at': self.fetched_at
+        }
+
+class ResponseCache:
+    """TTL + ETag cache for upstream JSON GETs with stale-while-revalidate.
+
+    Entries live in a bounded in-memory LRU backed by an optional CacheStore:
+    an on-disk tier when a cache directory is configured, or the store shared
+    by all worker processes. Cached payloads are shared between callers and
+    must be treated as read-only.
+    """
+
+    # Query parameters that carry credentials and must not end up in cache keys
+    SECRET_PARAMS = ('api_key', 'apikey')
+
+    # Seconds one process may hold the right to revalidate an entry
+    REVALIDATE_LEASE = 60
+
+    def __init__(self, config, http_client, backend, executor, section, store=None):
+        self.config = config
+        self.http = http_client
+        self.backend = backend
+        self._executor = executor
+        self._section = section  # config section holding ttl/stale_ttl/max_entries/cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._store_writes = 0
+        self.store = store if store is not None else self._default_store()
+
+    def _settings(self):
+        return getattr(self.config, self._section)
+
+    def _default_store(self):
+        cache_dir = self._settings().cache_dir
+        return FileStore(cache_dir) if cache_dir else None
+
+    def attach_store(self, store):
+        """Use a store shared with other processes instead of the local tier"""
+        self.store = store
+
+    def _make_key(self, url, params):
+        """Cache key from the endpoint and its non-secret parameters"""
+        params = params or {}
+        parts = [f"{k}={params[k]}" for k in sorted(params) if k not in self.SECRET_PARAMS]
+        return f"{url}?{'&'.join(parts)}"
+
+    # ============ MEMORY TIER ============
+
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key, entry):
+        max_entries = self._settings().max_entries
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    # ============ STORE TIER ============
+
+    def _store_get(self, key):
+        if self.store is None:
+            return None
+        try:
+            stored = self.store.get(self.backend, key)
+            return CacheEntry(**stored) if stored else None
+        except Exception as e:
+            logging.warning(f"Error reading {self.backend} cache store: {e}")
+            return None
+
+    def _store_put(self, key, entry):
+        if self.store is None:
+            return
+        try:
+            self.store.set(self.backend, key, entry.to_dict())
+            self._store_writes += 1
+            if self._store_writes % 50 == 0:
+                self.store.prune(self.backend, self._settings().disk_max_entries)
+        except Exception as e:
+            logging.warning(f"Error writing {self.backend} cache store: {e}")
+
+    # ============ FETCHING ============
+
+    def _lookup(self, key, ttl):
+        """Memory first; the store is consulted on a miss or once the memory copy ages out,
+        since another process may have refreshed it in the meantime"""
+        entry = self._memory_get(key)
+        if entry is None or time.time() - entry.fetched_at >= ttl:
+            stored = self._store_get(key)
+            if stored is not None and (entry is None or stored.fetched_at > entry.fetched_at):
+                self._memory_put(key, stored)
+                entry = stored
+        return entry
+
+    def _save(self, key, entry):
+        self._memory_put(key, entry)
+        self._store_put(key, entry)
+
+    def _fetch(self, key, url, params, timeout, entry):
+        """Fetch from upstream, revalidating the existing entry when possible"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        kwargs = {'params': params, 'headers': headers}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+
+        with self.http.get(self.backend, url, **kwargs) as response:
+            if response.status_code == 304 and entry is not None:
+                refreshed = CacheEntry(entry.data, entry.etag, entry.last_modified)
+                self._save(key, refreshed)
+                return refreshed
+
+            response.raise_for_status()
+            fresh = CacheEntry(
+                response.json(),
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+            self._save(key, fresh)
+            return fresh
+
+    def _revalidate_in_background(self, key, url, params, timeout, entry):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def worker():
+            lease = f"{self.backend}:{key}"
+            try:
+                # With a shared store, only one process revalidates; the rest pick up its result
+                if self.store is not None and not self.store.acquire_lease(lease, self.REVALIDATE_LEASE):
+                    return
+                try:
+                    self._fetch(key, url, params, timeout, entry)
+                finally:
+                    if self.store is not None:
+                        self.store.release_lease(lease)
+            except Exception as e:
+                logging.warning(f"Background {self.backend} revalidation failed for {url}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            self._executor.submit(worker)
+        except RuntimeError:
+            # Executor already shut down during exit
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_json(self, url, params=None, timeout=None, ttl=None):
+        """Return the JSON body for a GET, served from cache when possible.
+
+        Fresh entries are returned directly. Entries past their TTL but within
+        the stale window are returned immediately while a conditional refresh
+        runs in the background. Anything older is revalidated inline, falling
+        back to the stale copy if upstream is unreachable.
+        """
+        settings = self._settings()
+        ttl = settings.ttl if ttl is None else ttl
+        key = self._make_key(url, params)
+        entry = self._lookup(key, ttl)
+
+        if entry is not None:
+            age = time.time() - entry.fetched_at
+            if age < ttl:
+                return entry.data
+            if age < ttl + settings.stale_ttl:
+                self._revalidate_in_background(key, url, params, timeout, entry)
+                return entry.data
+
+        try:
+            return self._fetch(key, url, params, timeout, entry).data
+        except Exception as e:
+            if entry is not None:
+                logging.warning(f"Serving stale {self.backend} response for {url}: {e}")
+                return entry.data
+            raise
+
+    def refresh_json(self, url, params=None, timeout=None):
+        """Revalidate an entry now regardless of age, e.g. from a prefetcher.
+
+        Falls back to the cached copy if upstream is unreachable.
+        """
+        key = self._make_key(url, params)
+        entry = self._lookup(key, self._settings().ttl)
+        try:
+            return self._fetch(key, url, params, timeout, entry).data
+        except Exception as e:
+            if entry is not None:
+                logging.warning(f"Keeping cached {self.backend} response for {url}: {e}")
+                return entry.data
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shed(self, fraction):
+        """Drop the least recently used fraction of the memory tier; the store tier keeps them"""
+        with self._lock:
+            return shed_oldest(self._entries, fraction)
+
+    def memory_usage(self):
+        with self._lock:
+            values = list(self._entries.values())
+        return {'entries': len(values), 'approx_bytes': approximate_size(values)}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'refreshing': len(self._refreshing),
+                'store': type(self.store).__name__ if self.store is not None else None
+            }
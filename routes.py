@@ -1,16 +1,23 @@
 # routes.py
-from flask import render_template, request, jsonify, Response, session, redirect, url_for, send_from_directory
+from flask import render_template, stream_template, request, jsonify, Response, session, redirect, url_for, send_from_directory
 from functools import wraps
 import logging
 import time
 import os
 from collections import deque
-import requests
 import re
+import hmac
 from datetime import datetime
+from utils import SEARCH_BACKENDS
+
+# Upper bound on items accepted by the batch library status endpoint
+MAX_STATUS_BATCH = 500
+
+# Upper bound on items returned by one library page
+MAX_LIBRARY_PAGE = 200
 
 # Import shared utilities (will be passed from app.py)
-def init_routes(app, config_manager, update_manager, auth_decorator, debug_decorator, shared_utils, network_info_func=None):
+def init_routes(app, config_manager, update_manager, auth_decorator, debug_decorator, shared_utils, network_info_func=None, memory_manager=None):
     """
     Initialize all routes with shared dependencies
     """
@@ -40,12 +47,15 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
     def trending_media():
         try:
             media_type = request.args.get('type', 'all')
-            trending_data = utils.fetch_trending_optimized(media_type)
+            # TMDB serves at most 500 trending pages
+            page = min(max(request.args.get('page', 1, type=int), 1), 500)
+            trending_data = utils.fetch_trending_optimized(media_type, page)
             
             return render_template(
                 'trending.html',
                 trending_data=trending_data,
                 media_type=media_type,
+                page=page,
                 config=CONFIG._config
             )
         except Exception as e:
@@ -77,23 +87,19 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
     @app.route('/api/debug/memory')
     @requires_auth
     def memory_status():
-        """Memory monitoring endpoint"""
+        """Memory, per-cache sizes and, with MEMORY_TRACEMALLOC=true, the top allocating lines (?top=N)"""
         try:
             import psutil
             import gc
+            from memory_manager import MemoryManager, process_memory
             
-            process = psutil.Process()
-            memory_info = process.memory_info()
             system_memory = psutil.virtual_memory()
+            top = max(1, min(request.args.get('top', 10, type=int), 100))
             
             return jsonify({
-                'process_memory': {
-                    'rss_mb': memory_info.rss / 1024 / 1024,
-                    'vms_mb': memory_info.vms / 1024 / 1024,
-                    'percent': process.memory_percent(),
-                    'open_files': len(process.open_files()),
-                    'threads': process.num_threads(),
-                },
+                'governor': memory_manager.status() if memory_manager is not None else None,
+                'tracemalloc': MemoryManager.top_allocators(top),
+                'process_memory': process_memory(),
                 'system_memory': {
                     'total_mb': system_memory.total / 1024 / 1024,
                     'available_mb': system_memory.available / 1024 / 1024,
@@ -108,6 +114,25 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/debug/slow-requests')
+    @requires_auth
+    def slow_requests():
+        """Recent requests over TRACE_SLOW_MS, with the upstream calls each one made"""
+        if utils.tracer is None or not utils.tracer.enabled:
+            return jsonify({'error': 'Tracing is disabled'}), 404
+        return jsonify({
+            'threshold_ms': CONFIG.tracing.slow_ms,
+            'requests': utils.tracer.slow_requests()
+        })
+
+    @app.route('/metrics')
+    @requires_auth
+    def prometheus_metrics():
+        """Request latency, in-flight and upstream call metrics for Prometheus"""
+        if utils.metrics is None or not utils.metrics.enabled:
+            return jsonify({'error': 'Metrics are disabled'}), 404
+        return Response(utils.metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
     @app.route('/api/debug/cleanup', methods=['POST'])
     @requires_auth
     def force_cleanup():
@@ -130,18 +155,16 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         query = request.form['query']
         logging.info(f"Searching for: {query}")
         
+        # Streaming is on by default; stream=0 forces the buffered, interleaved render
+        if CONFIG.search.streaming and request.values.get('stream') != '0':
+            return stream_search_results(query)
+        
         try:
-            movie_results = utils.search_radarr(query)
-            tv_results = utils.search_sonarr(query)
-            
-            movie_results = movie_results if isinstance(movie_results, list) else []
-            tv_results = tv_results if isinstance(tv_results, list) else []
+            # Radarr and Sonarr are queried in parallel; a slow or failed side is reported, not fatal
+            search_results = utils.search_all(query)
+            movie_results = search_results['movie']
+            tv_results = search_results['tv']
             
-            for movie in movie_results:
-                movie['media_type'] = 'movie'
-            for tv_show in tv_results:
-                tv_show['media_type'] = 'tv'
-                
             combined_results = []
             max_length = max(len(movie_results), len(tv_results))
             
@@ -160,6 +183,8 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
                 movies=len(movie_results),
                 tv_shows=len(tv_results),
                 all_results=len(combined_results),
+                unavailable=search_results['unavailable'],
+                failed=search_results['failed'],
                 query=query,
                 config=CONFIG._config
             )
@@ -168,6 +193,35 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
             logging.error(f"Search error: {str(e)}")
             return render_template('error.html', error=str(e))
 
+    def stream_search_results(query):
+        """Stream results.html so each backend's cards reach the browser as soon as it answers"""
+        summary = {'movies': 0, 'tv_shows': 0, 'unavailable': [], 'failed': []}
+        
+        def generate_results():
+            for media_type, data, problem in utils.search_as_completed(query):
+                if problem is not None:
+                    summary['unavailable' if problem == 'timed_out' else 'failed'].append(SEARCH_BACKENDS[media_type])
+                    continue
+                
+                summary['movies' if media_type == 'movie' else 'tv_shows'] = len(data)
+                # Items come tagged with their media_type from the search lookup
+                yield from data
+            
+            logging.info(f"Found {summary['movies']} movies and {summary['tv_shows']} TV shows")
+        
+        response = Response(stream_template(
+            'results.html',
+            results=generate_results(),
+            streaming=True,
+            summary=summary,
+            media_type='combined',
+            query=query,
+            config=CONFIG._config
+        ), mimetype='text/html')
+        # Ask reverse proxies and tunnels not to buffer the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
     @app.route('/add', methods=['POST'])
     @conditional_debug_log
     @requires_auth  
@@ -188,30 +242,43 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
     @requires_auth  
     def manage_media():
         try:
-            movies = utils.get_radarr_movies()
-            series = utils.get_sonarr_series()
-            
-            combined_media = []
-            
-            for movie in movies:
-                movie['media_type'] = 'movie'
-                combined_media.append(movie)
-            
-            for show in series:
-                show['media_type'] = 'tv'
-                combined_media.append(show)
-            
-            combined_media.sort(key=lambda x: x.get('title', '').lower())
+            # Only the first page is rendered; the rest is fetched from /api/library on scroll
+            page = utils.library_pager.page(limit=CONFIG.library.page_size)
             
             return render_template(
                 'manage.html',
-                media=combined_media,
+                media=page['items'],
+                next_cursor=page['next_cursor'],
+                total=page['total'],
+                page_size=CONFIG.library.page_size,
                 config=CONFIG._config
             )
         except Exception as e:
             logging.error(f"Error fetching media: {str(e)}")
             return render_template('error.html', error="Failed to load media library")
 
+    @app.route('/api/library')
+    @conditional_debug_log
+    @requires_auth
+    def get_library_page():
+        """Sorted, filtered library listing with cursor pagination"""
+        limit = request.args.get('limit', CONFIG.library.page_size, type=int)
+        try:
+            page = utils.library_pager.page(
+                media_type=request.args.get('type', 'all'),
+                sort=request.args.get('sort', 'title'),
+                order=request.args.get('order', 'asc'),
+                cursor=request.args.get('cursor'),
+                limit=min(max(limit, 1), MAX_LIBRARY_PAGE),
+                query=request.args.get('q', '')
+            )
+            return jsonify(page)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logging.error(f"Error fetching library page: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/get_media_details')
     @conditional_debug_log
     @requires_auth
@@ -262,7 +329,7 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         """Get Radarr root folders"""
         try:
             url = f"{CONFIG.radarr.url}/api/v3/rootfolder"
-            response = requests.get(url, params={'apikey': CONFIG.radarr.api_key})
+            response = utils.http.get('radarr', url, params={'apikey': CONFIG.radarr.api_key})
             return jsonify(response.json())
         except Exception as e:
             logging.error(f"Error fetching Radarr root folders: {str(e)}")
@@ -275,7 +342,7 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         """Get Radarr quality profiles"""
         try:
             url = f"{CONFIG.radarr.url}/api/v3/qualityprofile"
-            response = requests.get(url, params={'apikey': CONFIG.radarr.api_key})
+            response = utils.http.get('radarr', url, params={'apikey': CONFIG.radarr.api_key})
             return jsonify(response.json())
         except Exception as e:
             logging.error(f"Error fetching Radarr quality profiles: {str(e)}")
@@ -288,7 +355,7 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         """Get Sonarr root folders"""
         try:
             url = f"{CONFIG.sonarr.url}/api/v3/rootfolder"
-            response = requests.get(url, params={'apikey': CONFIG.sonarr.api_key})
+            response = utils.http.get('sonarr', url, params={'apikey': CONFIG.sonarr.api_key})
             return jsonify(response.json())
         except Exception as e:
             logging.error(f"Error fetching Sonarr root folders: {str(e)}")
@@ -301,7 +368,7 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         """Get Sonarr quality profiles"""
         try:
             url = f"{CONFIG.sonarr.url}/api/v3/qualityprofile"
-            response = requests.get(url, params={'apikey': CONFIG.sonarr.api_key})
+            response = utils.http.get('sonarr', url, params={'apikey': CONFIG.sonarr.api_key})
             return jsonify(response.json())
         except Exception as e:
             logging.error(f"Error fetching Sonarr quality profiles: {str(e)}")
@@ -314,12 +381,33 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         """Get Sonarr language profiles"""
         try:
             url = f"{CONFIG.sonarr.url}/api/v3/languageprofile"
-            response = requests.get(url, params={'apikey': CONFIG.sonarr.api_key})
+            response = utils.http.get('sonarr', url, params={'apikey': CONFIG.sonarr.api_key})
             return jsonify(response.json())
         except Exception as e:
             logging.error(f"Error fetching Sonarr language profiles: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/webhooks/<backend>', methods=['POST'])
+    @conditional_debug_log
+    def arr_webhook(backend):
+        """Radarr/Sonarr Connect > Webhook target; patches the library index for one item"""
+        token = CONFIG.webhooks.token
+        if backend not in ('radarr', 'sonarr') or not token:
+            return jsonify({'error': 'Not found'}), 404
+
+        # Radarr/Sonarr can send the token as a query parameter or as the webhook's password
+        supplied = request.args.get('token') or (request.authorization.password if request.authorization else '')
+        if not hmac.compare_digest(str(supplied or ''), token):
+            return jsonify({'error': 'Invalid token'}), 401
+
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict) or not payload.get('eventType'):
+            return jsonify({'error': 'Expected a Radarr/Sonarr webhook payload'}), 400
+
+        # Answer straight away; the arr times out slow webhook targets
+        utils.queue_arr_webhook(backend, payload)
+        return jsonify({'accepted': True, 'event': payload['eventType']}), 202
+
     @app.route('/check_library_status')
     @conditional_debug_log
     @requires_auth  
@@ -327,23 +415,34 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         media_type = request.args.get('type')
         media_id = request.args.get('id')
         
-        if media_type == 'movie':
-            # Check Radarr
-            existing = requests.get(
-                f"{CONFIG.radarr.url}/api/v3/movie",
-                params={'apikey': CONFIG.radarr.api_key}
-            ).json()
-            in_library = any(str(m.get('tmdbId')) == str(media_id) for m in existing)
-        else:
-            # Check Sonarr
-            existing = requests.get(
-                f"{CONFIG.sonarr.url}/api/v3/series",
-                params={'apikey': CONFIG.sonarr.api_key}
-            ).json()
-            in_library = any(str(s.get('tvdbId')) == str(media_id) for s in existing)
+        # Radarr is keyed by TMDB ID, Sonarr by TVDB ID
+        in_library = utils.library_index.contains('movie' if media_type == 'movie' else 'tv', media_id)
         
         return jsonify({'in_library': in_library})
 
+    @app.route('/api/library/status', methods=['POST'])
+    @conditional_debug_log
+    @requires_auth
+    def check_library_status_batch():
+        """Library status and internal IDs for many (type, id) pairs in one request"""
+        data = request.get_json(silent=True) or {}
+        items = data.get('items')
+        
+        if not isinstance(items, list):
+            return jsonify({'error': 'Missing items list'}), 400
+        if len(items) > MAX_STATUS_BATCH:
+            return jsonify({'error': f'Too many items (max {MAX_STATUS_BATCH})'}), 400
+        
+        results = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            media_type = 'movie' if item.get('type') == 'movie' else 'tv'
+            status = utils.get_library_status(media_type, item.get('id'))
+            status.update({'type': media_type, 'id': item.get('id')})
+            results.append(status)
+        
+        return jsonify({'results': results})
+
     @app.route('/api/update/dismiss', methods=['POST'])
     @conditional_debug_log
     def dismiss_update_notification():
@@ -535,16 +634,42 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         result = utils.download_update()
         return jsonify(result)
 
-    @app.route('/api/update/status')
-    @conditional_debug_log
-    def update_status():
-        return jsonify({
+    def current_update_status():
+        return {
             'update_notification': os.getenv('UPDATE_NOTIFICATION', 'false') == 'true',
             'latest_version': os.getenv('LATEST_VERSION', ''),
             'current_version': CONFIG.app.version,
             'channel': CONFIG.update.channel,
             'current_commit': os.getenv('APP_COMMIT', '')
-        })
+        }
+
+    @app.route('/api/update/status')
+    @conditional_debug_log
+    def update_status():
+        return jsonify(current_update_status())
+
+    # Live events: clients get the current state on connect, then changes as they happen
+    if utils.events is not None:
+        utils.events.provide('update', current_update_status)
+        if network_info_func:
+            utils.events.provide('tunnel', network_info_func)
+
+    @app.route('/api/events')
+    @requires_auth
+    def event_stream():
+        """Server-Sent Events stream of update, tunnel and library changes"""
+        subscription = utils.events.subscribe() if utils.events is not None else None
+        if subscription is None:
+            # Every stream holds a server thread; the client falls back to one-off requests
+            return jsonify({'error': 'Too many open event streams'}), 503, {'Retry-After': '60'}
+
+        response = Response(utils.events.stream(subscription), mimetype='text/event-stream')
+        # Also covers clients that disconnect before the stream starts
+        response.call_on_close(lambda: utils.events.unsubscribe(subscription))
+        response.headers['Cache-Control'] = 'no-cache'
+        # Ask reverse proxies and tunnels not to buffer the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
 
     @app.route('/api/update/channel', methods=['POST'])
     @conditional_debug_log
@@ -556,11 +681,8 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
         if new_channel not in ['prod', 'dev']:
             return jsonify({'success': False, 'error': 'Invalid channel'})
         
-        # Update environment
+        # Update environment (set_env reloads the config snapshot)
         update_manager.set_env('UPDATE_CHANNEL', new_channel)
-        
-        # Reload config
-        CONFIG._reload_config()
         update_manager.current_channel = new_channel
         
         return jsonify({'success': True, 'channel': new_channel})
@@ -617,6 +739,51 @@ def init_routes(app, config_manager, update_manager, auth_decorator, debug_decor
     def serve_image(filename):
         return send_from_directory('static/images', filename)
 
+    @app.route('/images/remote')
+    @conditional_debug_log
+    @requires_auth
+    def proxy_image():
+        """Redirect a remote poster URL to its cached, content-addressed thumbnail"""
+        url = request.args.get('url', '')
+        width = request.args.get('w', 300, type=int)
+        
+        if not utils.images.is_allowed(url):
+            return jsonify({'error': 'Image host not allowed'}), 403
+        if not CONFIG.images.proxy_enabled:
+            return redirect(url)
+        
+        try:
+            name = utils.images.thumbnail(url, width)
+        except Exception as e:
+            logging.warning(f"Poster proxy falling back to remote image {url}: {str(e)}")
+            name = None
+        
+        response = redirect(url_for('serve_thumbnail', name=name) if name else url)
+        # The mapping may change if the poster is re-fetched; the thumbnail itself never does
+        response.headers['Cache-Control'] = 'private, max-age=86400'
+        return response
+
+    @app.route('/images/thumbs/<name>')
+    @conditional_debug_log
+    @requires_auth
+    def serve_thumbnail(name):
+        path = utils.images.variant_path(name)
+        if not path:
+            return jsonify({'error': 'Not found'}), 404
+        
+        utils.images.touch(name)
+        response = send_from_directory(os.path.dirname(path), name, mimetype=utils.images.content_type(name))
+        # Names are content hashes, so a thumbnail never changes
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
+    @app.template_filter('thumbnail')
+    def thumbnail_filter(url, width=300):
+        """Route remote artwork through the poster cache"""
+        if not url or not CONFIG.images.proxy_enabled or not utils.images.is_allowed(url):
+            return url
+        return url_for('proxy_image', url=url, w=width)
+
     @app.route('/offline.html')
     @conditional_debug_log
     def offline():
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from single_flight import SingleFlight
+from memory_manager import approximate_size, shed_oldest
+
+class SearchCache:
+    """TTL + LRU cache of arr lookup results keyed by backend and normalized query.
+
+    Concurrent identical lookups share one upstream call. Cached result lists
+    are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._entries = OrderedDict()  # (backend, query) -> (stored_at, results)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def normalize(query):
+        """Case- and whitespace-insensitive form of a search query"""
+        return ' '.join((query or '').lower().split())
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if time.time() - stored_at > self.config.search.cache_ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def _put(self, key, results):
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.config.search.cache_max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key, fetch):
+        results = fetch()
+        # Only successful list payloads are cached; errors are retried next time
+        if isinstance(results, list) and self.config.search.cache_ttl > 0:
+            self._put(key, results)
+        return results
+
+    def get_or_fetch(self, backend, query, fetch):
+        """Return cached results, or run fetch once for all concurrent callers"""
+        key = (backend, self.normalize(query))
+        if self.config.search.cache_ttl > 0:
+            results = self._get(key)
+            if results is not None:
+                return results
+        return self._flight.do(key, self._load, key, fetch)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shed(self, fraction):
+        """Drop the least recently used fraction of the entries"""
+        with self._lock:
+            return shed_oldest(self._entries, fraction)
+
+    def memory_usage(self):
+        with self._lock:
+            values = list(self._entries.values())
+        return {'entries': len(values), 'approx_bytes': approximate_size(values)}
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            'entries': entries,
+            'in_flight': self._flight.in_flight(),
+            'shared_calls': self._flight.shared
+        }
@@ -173,12 +173,31 @@ function populateManageModalDetails(data, mediaType, internalId) {
     }
 }
 
+// Rendered width of the details poster: full width on phones, capped by .poster's max-height above
+const POSTER_SIZES = '(max-width: 576px) 100vw, 400px';
+
+// srcset/sizes attributes for a TMDB image returned by the details API
+function srcsetAttributes(image, sizes) {
+    if (!image || !image.srcset) {
+        return '';
+    }
+    return `srcset="${image.srcset}" sizes="${sizes}"`;
+}
+
+// Remote artwork goes through the server's poster cache, which resizes it to the given width
+function thumbnailUrl(url, width) {
+    if (!url || !/^https?:\/\//.test(url)) {
+        return url;
+    }
+    return `/images/remote?url=${encodeURIComponent(url)}&w=${width}`;
+}
+
 function renderMovieDetails(mediaData, fullData, mediaType, internalId) {
     const detailsContent = document.getElementById('detailsContent');
     
     // Get poster image
     const posterImage = mediaData.images?.find(img => img.coverType === 'poster');
-    const posterUrl = posterImage?.remoteUrl || posterImage?.url || '/static/images/favicon.png';
+    const posterUrl = posterImage?.remoteUrl ? thumbnailUrl(posterImage.remoteUrl, 500) : (posterImage?.url || '/static/images/favicon.png');
     
     // Format runtime
     const runtime = mediaData.runtime ? `${Math.floor(mediaData.runtime / 60)}h ${mediaData.runtime % 60}m` : 'N/A';
@@ -362,7 +381,7 @@ function renderTVDetails(mediaData, fullData, mediaType, internalId) {
     
     // Get poster image
     const posterImage = mediaData.images?.find(img => img.coverType === 'poster');
-    const posterUrl = posterImage?.remoteUrl || posterImage?.url || '/static/images/favicon.png';
+    const posterUrl = posterImage?.remoteUrl ? thumbnailUrl(posterImage.remoteUrl, 500) : (posterImage?.url || '/static/images/favicon.png');
     
     // Format file size
     const fileSize = mediaData.sizeOnDisk ? formatFileSize(mediaData.sizeOnDisk) : 'N/A';
@@ -898,12 +917,13 @@ function showDetails(mediaType, mediaId, tmdb=false) {
                 const certification = 'NR'; // Default for TMDB-only
                 
                 // POSTER: TMDB only
-                let posterUrl = hasTmdbData && tmdbData.poster_path 
-                    ? `https://image.tmdb.org/t/p/original${tmdbData.poster_path}`
+                let posterUrl = hasTmdbData && tmdbData.poster 
+                    ? tmdbData.poster.src
                     : '/static/images/logo.png';
+                const posterSrcset = srcsetAttributes(hasTmdbData ? tmdbData.poster : null, POSTER_SIZES);
 
                 const posterHtml = `
-                    <img src="${posterUrl}" 
+                    <img src="${posterUrl}" ${posterSrcset}
                         class="img-fluid h-100 object-fit-cover" 
                         alt="${title} poster"
                         onerror="this.onerror=null; this.src='/static/images/logo.png'"
@@ -991,7 +1011,7 @@ function showDetails(mediaType, mediaId, tmdb=false) {
                         <div class="row details g-0 mb-4">
                             <!-- Column 1: Poster -->
                             <div class="px-2">
-                                <img src="${posterUrl}" 
+                                <img src="${posterUrl}" ${posterSrcset}
                                     class="poster img-fluid w-100 rounded" 
                                     alt="${title} poster"
                                     onerror="this.src='/static/images/placeholder.png'">
@@ -1063,17 +1083,19 @@ function showDetails(mediaType, mediaId, tmdb=false) {
                 
                 // POSTER: TMDB first, then internal
                 let posterUrl;
-                if (hasTmdbData && tmdbData.poster_path && tmdb!==false) {
-                    posterUrl = `https://image.tmdb.org/t/p/original${tmdbData.poster_path}`;
+                let posterSrcset = '';
+                if (hasTmdbData && tmdbData.poster && tmdb!==false) {
+                    posterUrl = tmdbData.poster.src;
+                    posterSrcset = srcsetAttributes(tmdbData.poster, POSTER_SIZES);
                 } else if (internalDataObj.images) {
                     const posterImage = internalDataObj.images.find(img => img.coverType === 'poster');
-                    posterUrl = posterImage?.remoteUrl || posterImage?.url;
+                    posterUrl = posterImage?.remoteUrl ? thumbnailUrl(posterImage.remoteUrl, 500) : posterImage?.url;
                 } else {
                     posterUrl = '/static/images/logo.png';
                 }
 
                 const posterHtml = `
-                    <img src="${posterUrl}" 
+                    <img src="${posterUrl}" ${posterSrcset}
                         class="img-fluid h-100 object-fit-cover" 
                         alt="${title} poster"
                         onerror="this.onerror=null; this.src='/static/images/logo.png'"
@@ -1185,7 +1207,7 @@ function showDetails(mediaType, mediaId, tmdb=false) {
                         <div class="row details g-0 mb-4">
                             <!-- Column 1: Poster -->
                             <div class="px-2">
-                                <img src="${posterUrl}" 
+                                <img src="${posterUrl}" ${posterSrcset}
                                     class="poster img-fluid w-100 rounded" 
                                     alt="${title} poster"
                                     onerror="this.src='/static/images/placeholder.png'">
@@ -1602,6 +1624,65 @@ function showUpdateDownloadedNotification(downloadResult) {
     });
 }
 
+// ============ SERVER EVENTS ============
+// One Server-Sent Events stream per page replaces polling for update, tunnel and
+// library state. Each event is re-dispatched on document as `addarr:<name>`.
+const SERVER_EVENTS = ['update', 'update_progress', 'tunnel', 'library'];
+const serverEvents = { source: null, opened: false, latest: {}, updateNotified: false, announcedVersion: null };
+
+function startServerEvents() {
+    if (serverEvents.source) return;
+    if (!window.EventSource) {
+        checkUpdateNotification();
+        return;
+    }
+
+    const source = new EventSource('/api/events');
+    serverEvents.source = source;
+    source.onopen = () => { serverEvents.opened = true; };
+    source.onerror = () => {
+        // The browser reconnects by itself unless the server refused the stream
+        if (source.readyState === EventSource.CLOSED) {
+            serverEvents.source = null;
+            if (!serverEvents.opened) {
+                checkUpdateNotification();
+            }
+            // Refused while other tabs hold every stream; try again once one may have closed
+            setTimeout(startServerEvents, 60000);
+        }
+    };
+
+    SERVER_EVENTS.forEach(name => {
+        source.addEventListener(name, event => {
+            const data = JSON.parse(event.data);
+            serverEvents.latest[name] = data;
+            document.dispatchEvent(new CustomEvent(`addarr:${name}`, { detail: data }));
+        });
+    });
+}
+
+document.addEventListener('addarr:update', event => {
+    const data = event.detail;
+    if (data.update_notification && !serverEvents.updateNotified) {
+        serverEvents.updateNotified = true;
+        showUpdateAppliedNotification(data);
+    } else if (data.update_available && serverEvents.announcedVersion !== data.latest_version) {
+        serverEvents.announcedVersion = data.latest_version;
+        const downloadBtn = document.getElementById('downloadUpdateBtn');
+        if (downloadBtn) downloadBtn.style.display = 'block';
+        if (typeof bootstrap !== 'undefined') showUpdateAvailableNotification(data);
+    }
+});
+
+document.addEventListener('addarr:update_progress', event => {
+    const progress = event.detail;
+    const btn = document.getElementById('downloadUpdateBtn');
+    // Results are reported by the request that started the download; this only fills in progress
+    if (progress.stage === 'downloading' && btn && btn.disabled) {
+        btn.innerHTML = `<span class="spinner-border spinner-border-sm" role="status"></span> Downloading... ${progress.percent || 0}%`;
+    }
+});
+
 // Check for update notification on page load
 function checkUpdateNotification() {
     fetch('/api/update/status')
@@ -1681,8 +1762,8 @@ function showUpdateAppliedNotification(updateData) {
 
 // Add event listeners when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
-    // Check for update notification
-    checkUpdateNotification();
+    // Update notifications and other server state arrive over the event stream
+    startServerEvents();
     
     // Add update button event listeners
     const checkUpdateBtn = document.getElementById('checkUpdateBtn');
@@ -1964,8 +2045,8 @@ function checkForUpdates() {
 
 // Add event listeners when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
-    // Check for update notification
-    checkUpdateNotification();
+    // Update notifications and other server state arrive over the event stream
+    startServerEvents();
     
     const backToTopBtn = document.getElementById('backToTop');
     
@@ -2555,11 +2636,10 @@ function handleMediaClick(mediaType, mediaId, internalId) {
 // Check library status for all items on page load
 function initializeMediaGrid() {
     const cards = document.querySelectorAll('.search-result-card');
+    const uncheckedCards = [];
     
     cards.forEach(card => {
-        const mediaType = card.dataset.mediaType;
-        const mediaId = card.dataset.mediaId;
-        const internalId = card.dataset.internalId;
+        const { mediaType, mediaId, internalId } = getCardMediaInfo(card);
         
         // If we already have an internal ID (from manage page), item is in library
         if (internalId && internalId !== 'null') {
@@ -2570,55 +2650,102 @@ function initializeMediaGrid() {
             statusBadge.className = 'status-badge text-xs badge bg-success';
             showManageControls(mediaType, mediaId, internalId, manageControls, true);
         } else {
-            // Check library status via API
-            checkLibraryStatus(mediaType, mediaId, card);
+            uncheckedCards.push(card);
         }
     });
+    
+    // Check everything else via a single batch request
+    checkLibraryStatusBatch(uncheckedCards);
 }
 
-// Fetch library status and update UI
+// Media attributes live on the card itself or on its .result-item wrapper
+function getCardMediaInfo(card) {
+    const wrapper = card.closest('.result-item');
+    const data = card.dataset.mediaType ? card.dataset : (wrapper ? wrapper.dataset : {});
+    return {
+        mediaType: data.mediaType,
+        mediaId: data.mediaId,
+        internalId: wrapper ? wrapper.dataset.internalId : undefined
+    };
+}
+
+// Fetch library status for a single card and update UI
 function checkLibraryStatus(mediaType, mediaId, card) {
-    fetch(`/check_library_status?type=${mediaType}&id=${mediaId}`)
+    checkLibraryStatusBatch([card]);
+}
+
+// Fetch library status for many cards in one round trip and update UI
+function checkLibraryStatusBatch(cards) {
+    if (!cards || cards.length === 0) return;
+    
+    const items = cards.map(card => {
+        const { mediaType, mediaId } = getCardMediaInfo(card);
+        return { type: mediaType, id: mediaId };
+    });
+    
+    fetch('/api/library/status', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ items })
+    })
         .then(response => response.json())
         .then(data => {
-            const statusSection = card.querySelector('.media-status-section');
-            const statusBadge = card.querySelector('.status-badge');
-            const manageControls = card.querySelector('.manage-controls');
-            
-            if (data.in_library) {
-                statusBadge.textContent = 'In Library';
-                statusBadge.className = 'status-badge text-xs badge bg-success';
-                
-                // Get internal ID and update the card
-                fetch(`/get_media_details?type=${mediaType}&id=${mediaId}`)
-                    .then(response => response.json())
-                    .then(details => {
-                        const itemData = details.data || details;
-                        const internalId = itemData.id;
-                        
-                        // Update card with internal ID
-                        card.closest('.result-item').dataset.internalId = internalId;
-                        
-                        // Show manage controls
-                        showManageControls(mediaType, mediaId, internalId, manageControls, false);
-                    })
-                    .catch(error => {
-                        console.error('Error fetching internal ID:', error);
-                    });
-            } else {
-                statusBadge.textContent = 'Not Added';
-                statusBadge.className = 'status-badge text-xs badge bg-secondary';
-                manageControls.style.display = 'none';
-            }
+            const results = data.results || [];
+            cards.forEach((card, index) => {
+                applyLibraryStatus(card, items[index], results[index] || {});
+            });
         })
         .catch(error => {
             console.error('Error checking library status:', error);
-            const statusBadge = card.querySelector('.status-badge');
-            statusBadge.textContent = 'Error';
-            statusBadge.className = 'status-badge text-xs badge bg-danger';
+            cards.forEach(card => {
+                const statusBadge = card.querySelector('.status-badge');
+                if (statusBadge) {
+                    statusBadge.textContent = 'Error';
+                    statusBadge.className = 'status-badge text-xs badge bg-danger';
+                }
+            });
         });
 }
 
+// Render one batch status entry onto its card
+function applyLibraryStatus(card, item, status) {
+    const statusBadge = card.querySelector('.status-badge');
+    const manageControls = card.querySelector('.manage-controls');
+    
+    if (status.in_library) {
+        if (statusBadge) {
+            statusBadge.textContent = 'In Library';
+            statusBadge.className = 'status-badge text-xs badge bg-success';
+        }
+        
+        // Update card with internal ID
+        const wrapper = card.closest('.result-item');
+        if (wrapper) {
+            wrapper.dataset.internalId = status.internal_id;
+        }
+        
+        // Show manage controls from the batch data, no extra details request
+        if (manageControls) {
+            updateManageControlsHTML(item.type, item.id, status.internal_id, manageControls, {
+                monitored: status.monitored,
+                hasFile: status.has_file,
+                statistics: {
+                    episodeFileCount: status.episode_file_count,
+                    episodeCount: status.episode_count
+                }
+            });
+        }
+    } else {
+        if (statusBadge) {
+            statusBadge.textContent = 'Not Added';
+            statusBadge.className = 'status-badge text-xs badge bg-secondary';
+        }
+        if (manageControls) {
+            manageControls.style.display = 'none';
+        }
+    }
+}
+
 // Show manage controls for items in library
 function showManageControls(mediaType, mediaId, internalId, manageControls, isManagePage = false) {
     // For manage page, we already have all the data in the initial render
@@ -2854,6 +2981,12 @@ function initializeClearSearchOLD() {
 }
 // Filter and search functionality
 function updateMediaDisplay() {
+    // The manage page is paged from the server, so filtering and sorting refetch from the top
+    if (typeof reloadLibrary === 'function') {
+        reloadLibrary();
+        return;
+    }
+    
     const searchInput = document.getElementById('searchInput');
     if (!searchInput) {
         console.error('Search input not found');
@@ -1,15 +1,21 @@
 const PREFERRED_BASE_KEY = 'addarr_base_url';
 
+// Tunnel and DuckDNS details come from the server event stream (see startServerEvents
+// in main.js); until the first `tunnel` event arrives they are read once from /api/info/network.
+document.addEventListener('addarr:tunnel', event => {
+  const base = publicBaseUrl(event.detail);
+  if (base) localStorage.setItem(PREFERRED_BASE_KEY, base);
+});
+
 async function fetchJsonWithFallback(path, options = {}, timeoutMs = 5000) {
   const base = await resolveBaseUrl();
   try {
     return await fetchWithTimeout(new URL(path, base).toString(), options, timeoutMs);
   } catch (err) {
-    // try duckdns as fallback by asking /api/tunnel/status (server returns duckdns_url)
+    // try duckdns as fallback
     try {
-      const s = await fetch('/api/tunnel/status', {cache: 'no-store'});
-      const info = await s.json();
-      const duck = info.duckdns_url || window.location.origin;
+      const info = await networkInfo();
+      const duck = duckdnsUrl(info) || window.location.origin;
       localStorage.setItem(PREFERRED_BASE_KEY, duck);
       return await fetchWithTimeout(new URL(path, duck).toString(), options, timeoutMs);
     } catch (err2) {
@@ -22,27 +28,38 @@ async function resolveBaseUrl() {
   const saved = localStorage.getItem(PREFERRED_BASE_KEY);
   if (saved) return saved;
 
-  // Ask server for tunnel status (includes duckdns_url)
   try {
-    const res = await fetchWithTimeout('/api/tunnel/status', {}, 4000);
-    const info = await res.json();
-    if (info.tunnel && info.tunnel.public_url) {
-      localStorage.setItem(PREFERRED_BASE_KEY, info.tunnel.public_url);
-      return info.tunnel.public_url;
-    }
-    if (info.duckdns_url) {
-      localStorage.setItem(PREFERRED_BASE_KEY, info.duckdns_url);
-      return info.duckdns_url;
+    const base = publicBaseUrl(await networkInfo());
+    if (base) {
+      localStorage.setItem(PREFERRED_BASE_KEY, base);
+      return base;
     }
   } catch (e) {
-    // network error -> try duckdns directly if server published it previously
+    // network error -> fall back to the current origin
   }
   return window.location.origin;
 }
 
+async function networkInfo() {
+  if (typeof serverEvents !== 'undefined' && serverEvents.latest.tunnel) {
+    return serverEvents.latest.tunnel;
+  }
+  const res = await fetchWithTimeout('/api/info/network', {cache: 'no-store'}, 4000);
+  return res.json();
+}
+
+function publicBaseUrl(info) {
+  if (info.tunnel_active && info.tunnel_url) return info.tunnel_url;
+  return duckdnsUrl(info);
+}
+
+function duckdnsUrl(info) {
+  return info.duckdns_enabled && info.duckdns_domain ? `http://${info.duckdns_domain}.duckdns.org:${info.port}` : null;
+}
+
 function fetchWithTimeout(resource, options = {}, timeout = 5000) {
   const controller = new AbortController();
   const id = setTimeout(() => controller.abort(), timeout);
   return fetch(resource, {...options, signal: controller.signal})
     .finally(() => clearTimeout(id));
-}
\ No newline at end of file
+}
@@ -0,0 +1,255 @@
+import contextvars
+import functools
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from werkzeug.wsgi import ClosingIterator
+
+# Span being recorded in this thread, None outside traced requests
+_current = contextvars.ContextVar('addarr_span', default=None)
+
+class Span:
+    """One timed operation inside a traced request, with the operations it started"""
+    __slots__ = ('name', 'attributes', 'start', 'duration', 'children', 'trace')
+
+    def __init__(self, name, trace, attributes=None):
+        self.name = name
+        self.trace = trace
+        self.attributes = attributes or {}
+        self.start = time.perf_counter()
+        self.duration = None
+        self.children = []
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.start
+
+    @property
+    def end(self):
+        return self.start + (self.duration if self.duration is not None else time.perf_counter() - self.start)
+
+    def to_dict(self, origin):
+        """JSON-ready tree with times in milliseconds from the start of the request"""
+        data = {
+            'name': self.name,
+            'offset_ms': round(1000 * (self.start - origin), 1),
+            'duration_ms': round(1000 * (self.end - self.start), 1)
+        }
+        data.update(self.attributes)
+        with self.trace.lock:
+            children = list(self.children)
+        if children:
+            data['children'] = [child.to_dict(origin) for child in children]
+        return data
+
+class Trace:
+    """Span tree of one inbound request; spans may be added from worker threads"""
+
+    # Spans kept per request; a request that makes more only counts the rest
+    MAX_SPANS = 200
+
+    def __init__(self, attributes):
+        self.lock = threading.Lock()
+        self.spans = 0
+        self.dropped = 0
+        self.root = Span('request', self, attributes)
+        self.upstream = []  # spans of outbound calls, for the per-backend totals
+
+    def add(self, parent, name, attributes):
+        with self.lock:
+            if self.spans >= self.MAX_SPANS:
+                self.dropped += 1
+                return None
+            self.spans += 1
+            span = Span(name, self, attributes)
+            parent.children.append(span)
+            if 'backend' in attributes:
+                self.upstream.append(span)
+            return span
+
+    def summary(self):
+        """Where the time went: wall time per backend and the rest spent in Addarr"""
+        root = self.root
+        with self.lock:
+            calls = list(self.upstream)
+
+        by_backend = {}
+        for backend in {span.attributes['backend'] for span in calls}:
+            by_backend[backend] = _covered([span for span in calls if span.attributes['backend'] == backend])
+        return {
+            'upstream_ms': {backend: round(1000 * seconds, 1) for backend, seconds in sorted(by_backend.items())},
+            # Concurrent calls overlap; only time no call was outstanding counts as our own
+            'own_ms': round(1000 * max(0.0, (root.end - root.start) - _covered(calls)), 1)
+        }
+
+def _covered(spans):
+    """Seconds during which at least one of the spans was running"""
+    total, reach = 0.0, None
+    for start, end in sorted((span.start, span.end) for span in spans):
+        if reach is None or start > reach:
+            total += end - start
+            reach = end
+        elif end > reach:
+            total += end - reach
+            reach = end
+    return total
+
+# ============ RECORDING ============
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block as a child of the current span; does nothing outside a traced request"""
+    parent = _current.get()
+    child = parent.trace.add(parent, name, attributes) if parent is not None else None
+    if child is None:
+        yield None
+        return
+
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        child.finish()
+        _current.reset(token)
+
+def traced(func):
+    """Record every call of a function as a span in the current trace"""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return func(*args, **kwargs)
+        with span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+def propagate(func):
+    """Bind func to the current span, so spans it records on another thread join this trace"""
+    parent = _current.get()
+    if parent is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
+
+class Tracer:
+    """Per-request span trees of outbound calls, and a log of the slow requests.
+
+    Every inbound request gets a trace. HttpClient adds a span for each
+    Radarr, Sonarr, TMDB, GitHub or image call, nested under the SharedUtils
+    operation that made it. Requests slower than tracing.slow_ms are kept
+    in a bounded slow log, and the rest are dropped when they finish.
+
+    With a shared CacheStore attached, the slow log is kept in the store,
+    so any worker process can show the slow requests of all of them.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.store = None
+        self._slow = deque(maxlen=config.tracing.slow_log_size)
+        self._sequence = itertools.count(1)
+
+    def attach_store(self, store):
+        self.store = store
+
+    @property
+    def enabled(self):
+        return self.config.tracing.enabled
+
+    def instrument(self, app):
+        """Trace every request the Flask app serves"""
+        wsgi_app = app.wsgi_app
+
+        def traced_app(environ, start_response):
+            if not self.enabled:
+                return wsgi_app(environ, start_response)
+
+            # The path without its query string, which can carry tokens
+            trace = Trace({'method': environ.get('REQUEST_METHOD', ''), 'path': environ.get('PATH_INFO', '')})
+            _current.set(trace.root)
+            status = ['500']
+            streamed = [False]
+
+            def capture_status(status_line, headers, exc_info=None):
+                status[0] = status_line.split(' ', 1)[0]
+                # No length up front: SSE and streamed search results, open for as long as the client reads
+                streamed[0] = not any(name.lower() == 'content-length' for name, _ in headers)
+                return start_response(status_line, headers, exc_info)
+
+            try:
+                body = wsgi_app(environ, capture_status)
+            except Exception:
+                self._finish(trace, '500')
+                raise
+            return ClosingIterator(body, lambda: self._finish(trace, status[0], streamed[0]))
+
+        app.wsgi_app = traced_app
+        app.before_request(self._route_started)
+
+    def _route_started(self):
+        from flask import request
+        root = _current.get()
+        if root is not None:
+            root.attributes['route'] = request.url_rule.rule if request.url_rule else 'unmatched'
+
+    def _finish(self, trace, status, streamed=False):
+        # Server threads are reused; the next request must not inherit this trace
+        _current.set(None)
+        root = trace.root
+        root.finish()
+        root.attributes['status'] = status
+        # A stream's duration is how long the client kept it open, not how slow we were
+        if not streamed and root.duration * 1000 >= self.config.tracing.slow_ms:
+            self._record_slow(trace)
+
+    # ============ SLOW LOG ============
+
+    def _record_slow(self, trace):
+        root = trace.root
+        entry = root.to_dict(root.start)
+        entry.update(trace.summary())
+        entry['started_at'] = time.time() - root.duration
+        entry['pid'] = os.getpid()
+        if trace.dropped:
+            entry['dropped_spans'] = trace.dropped
+        logging.info(
+            f"Slow request: {entry['method']} {entry['path']} took {entry['duration_ms']:.0f} ms "
+            f"(upstream {entry['upstream_ms']}, own {entry['own_ms']:.0f} ms)"
+        )
+
+        if self.store is None:
+            self._slow.append(entry)
+            return
+        try:
+            self.store.set('slow_requests', f"{os.getpid()}-{next(self._sequence)}", entry)
+            self.store.prune('slow_requests', self.config.tracing.slow_log_size)
+        except Exception as e:
+            logging.warning(f"Error recording slow request: {str(e)}")
+            self._slow.append(entry)
+
+    def slow_requests(self):
+        """Slow requests, newest first"""
+        entries = list(self._slow)
+        if self.store is not None:
+            try:
+                entries += [value for value, _ in self.store.items_since('slow_requests', 0)]
+            except Exception as e:
+                logging.warning(f"Error reading slow requests: {str(e)}")
+        entries.sort(key=lambda entry: entry.get('started_at', 0), reverse=True)
+        return entries[:self.config.tracing.slow_log_size]
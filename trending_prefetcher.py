@@ -0,0 +1,126 @@
+import threading
+import time
+import logging
+import math
+from concurrent.futures import as_completed
+from memory_manager import approximate_size
+
+class TrendingPrefetcher:
+    """Keep TMDB trending lists warm in memory so /trending never waits on TMDB"""
+
+    # Trending list name -> TMDB media type
+    LISTS = {'movies': 'movie', 'tv_shows': 'tv'}
+
+    def __init__(self, config, tmdb_cache, executor):
+        self.config = config
+        self.tmdb_cache = tmdb_cache
+        self._executor = executor
+        self._pages = {}  # (list_name, page) -> results
+        self._lock = threading.Lock()
+        self.last_refresh = 0
+        self.refresh_thread = None
+        self.running = False
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self._stop_event.clear()
+        self.refresh_thread = threading.Thread(
+            target=self._periodic_refresh,
+            daemon=True,
+            name="TrendingPrefetch"
+        )
+        self.refresh_thread.start()
+        logging.info("Trending prefetcher started")
+
+    def stop(self):
+        """Stop the trending prefetcher"""
+        if not self.running:
+            return
+
+        self.running = False
+        self._stop_event.set()
+
+        if self.refresh_thread and self.refresh_thread.is_alive():
+            try:
+                self.refresh_thread.join(timeout=2.0)
+                if self.refresh_thread.is_alive():
+                    logging.warning("Trending prefetch thread did not stop gracefully")
+            except Exception as e:
+                logging.warning(f"Error stopping trending prefetch thread: {e}")
+
+        logging.info("Trending prefetcher stopped")
+
+    def _periodic_refresh(self):
+        """Refresh every prefetched page on the configured interval"""
+        while self.running and not self._stop_event.is_set():
+            self.refresh()
+            if self._stop_event.wait(timeout=self.config.trending.refresh_interval):
+                break
+
+    def _fetch_page(self, list_name, page, force=False):
+        url = f"{self.config.tmdb.api_url}/trending/{self.LISTS[list_name]}/week"
+        params = {'api_key': self.config.tmdb.key, 'language': 'en-GB', 'page': page}
+        if force:
+            data = self.tmdb_cache.refresh_json(url, params=params, timeout=5)
+        else:
+            data = self.tmdb_cache.get_json(url, params=params, timeout=5)
+        return data.get('results', [])
+
+    def refresh(self):
+        """Fetch both trending lists and their later pages in parallel"""
+        if not self.config.tmdb.key:
+            return False
+
+        start_time = time.time()
+        pages = self.config.trending.prefetch_pages
+        futures = {
+            self._executor.submit(self._fetch_page, list_name, page, True): (list_name, page)
+            for list_name in self.LISTS
+            for page in range(1, pages + 1)
+        }
+
+        refreshed = 0
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                results = future.result()
+                with self._lock:
+                    self._pages[key] = results
+                refreshed += 1
+            except Exception as e:
+                logging.error(f"Error prefetching trending {key[0]} page {key[1]}: {str(e)}")
+
+        self.last_refresh = time.time()
+        if self.config.app.debug:
+            logging.debug(f"Prefetched {refreshed}/{len(futures)} trending pages in {self.last_refresh - start_time:.3f}s")
+        return refreshed == len(futures)
+
+    def shed(self, fraction):
+        """Drop the fraction of prefetched pages furthest from page 1; the next refresh restores them"""
+        with self._lock:
+            keys = sorted(self._pages, key=lambda key: key[1], reverse=True)
+            count = min(len(keys), math.ceil(len(keys) * fraction))
+            for key in keys[:count]:
+                del self._pages[key]
+        return count
+
+    def memory_usage(self):
+        with self._lock:
+            values = list(self._pages.values())
+        return {'entries': len(values), 'approx_bytes': approximate_size(values)}
+
+    def get(self, list_name, page=1):
+        """Trending results for one list page, from memory when prefetched"""
+        with self._lock:
+            results = self._pages.get((list_name, page))
+        if results is None:
+            results = self._fetch_page(list_name, page)
+            # Only pages refresh() keeps current are held; later ones are left to the TMDB cache's TTL
+            if page <= self.config.trending.prefetch_pages:
+                with self._lock:
+                    self._pages[(list_name, page)] = results
+        return results
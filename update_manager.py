@@ -2,7 +2,6 @@ import threading
 import time
 import logging
 import gc
-import requests
 from packaging import version
 import os
 import shutil
@@ -11,11 +10,14 @@ import tempfile
 import subprocess
 from datetime import datetime
 import sys
+from http_client import HttpClient
 
 class UpdateManager:
     """Memory-efficient update management"""
-    def __init__(self, config):
+    def __init__(self, config, http_client=None, events=None):
         self.config = config
+        self.http = http_client or HttpClient(config)
+        self.events = events
         self.update_thread = None
         self.running = False
         self._lock = threading.Lock()
@@ -35,7 +37,7 @@ class UpdateManager:
         try:
             # Use local mock server
             mock_url = "http://localhost:5001/repos/revvin76/addarr/releases/latest"
-            response = requests.get(mock_url, timeout=5)
+            response = self.http.get('github', mock_url, timeout=5)
             
             if response.status_code == 200:
                 mock_release = response.json()
@@ -147,14 +149,26 @@ class UpdateManager:
         try:
             # Use releases for PROD, latest commit for DEV
             if self.current_channel == 'prod':
-                return self._check_prod_updates()
+                update_info = self._check_prod_updates()
             else:
-                return self._check_dev_updates()
+                update_info = self._check_dev_updates()
+            
+            if update_info.get('update_available'):
+                self._announce('update', update_info)
+            return update_info
                 
         except Exception as e:
             logging.error(f"Error checking for updates: {str(e)}")
             return {'update_available': False, 'error': str(e)}
         
+    def _announce(self, event, data):
+        """Push update state to connected browsers"""
+        if self.events is not None:
+            self.events.publish(event, data)
+
+    def _progress(self, stage, version, **details):
+        self._announce('update_progress', {'stage': stage, 'version': version, **details})
+
     def _handle_available_update(self, update_info):
             """Handle available update with memory considerations"""
             # Prevent concurrent updates
@@ -203,7 +217,7 @@ class UpdateManager:
 
     def _check_prod_updates(self):
             """Check for PROD updates using releases"""
-            url = f"https://api.github.com/repos/{self.config.update.github_repo}/releases/latest"
+            url = f"{self.config.update.github_api_url}/repos/{self.config.update.github_repo}/releases/latest"
             
             logging.info(f"Checking PROD releases: {url}")
             headers = {
@@ -215,7 +229,7 @@ class UpdateManager:
             if github_token:
                 headers['Authorization'] = f'token {github_token}'
             
-            with requests.get(url, timeout=10, headers=headers) as response:
+            with self.http.get('github', url, timeout=10, headers=headers) as response:
                 if response.status_code == 200:
                     latest_release = response.json()
                     current_version = self.config.app.version
@@ -244,7 +258,7 @@ class UpdateManager:
         """Check for DEV updates using latest commit on dev branch"""
         try:
             # Get latest commit from dev branch
-            url = f"https://api.github.com/repos/{self.config.update.github_repo}/branches/dev"
+            url = f"{self.config.update.github_api_url}/repos/{self.config.update.github_repo}/branches/dev"
             
             headers = {
                 'User-Agent': 'Addarr-Update-Checker',
@@ -255,7 +269,7 @@ class UpdateManager:
             if github_token:
                 headers['Authorization'] = f'token {github_token}'
             
-            with requests.get(url, timeout=10, headers=headers) as response:
+            with self.http.get('github', url, timeout=10, headers=headers) as response:
                 if response.status_code == 200:
                     branch_info = response.json()
                     latest_commit_sha = branch_info['commit']['sha'][:7]  # Short SHA
@@ -297,10 +311,12 @@ class UpdateManager:
         """Download update with improved DEV branch support"""
         try:
             logging.info(f"📥 Downloading {self.current_channel} update: {version}")
+            self._progress('downloading', version, percent=0)
             
             if self.mock_mode:
                 logging.info(f"🔧 MOCK MODE: Would download {self.current_channel} update {version}")
                 time.sleep(2)
+                self._progress('downloaded', version, percent=100)
                 return {'success': True, 'version': version, 'channel': self.current_channel}
             
             updates_folder = self.ensure_updates_folder()
@@ -321,7 +337,7 @@ class UpdateManager:
             logging.info(f"📁 Target filename: {filename}")
             
             # Download the file
-            response = requests.get(download_url, stream=True, timeout=30)
+            response = self.http.get('github', download_url, stream=True, timeout=30)
             response.raise_for_status()
             
             file_path = os.path.join(updates_folder, filename)
@@ -329,6 +345,7 @@ class UpdateManager:
             # Stream download to file
             total_size = int(response.headers.get('content-length', 0))
             downloaded_size = 0
+            reported_percent = 0
             
             with open(file_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
@@ -339,6 +356,12 @@ class UpdateManager:
                         if total_size > 0 and downloaded_size % (1024 * 1024) == 0:
                             progress = (downloaded_size / total_size) * 100
                             logging.info(f"Download progress: {progress:.1f}%")
+                        
+                        # Browsers get a progress event every 5%
+                        percent = downloaded_size * 100 // total_size if total_size > 0 else 0
+                        if percent >= reported_percent + 5:
+                            reported_percent = percent
+                            self._progress('downloading', version, percent=percent)
             
             # Verify the file was created
             if os.path.exists(file_path):
@@ -352,6 +375,7 @@ class UpdateManager:
                 
                 # Clean up old updates
                 self.cleanup_old_updates()
+                self._progress('downloaded', version, percent=100)
                 
                 return {
                     'success': True, 
@@ -371,16 +395,19 @@ class UpdateManager:
                     logging.info(f"🗑️ Cleaned up partial download: {file_path}")
                 except Exception as cleanup_error:
                     logging.error(f"❌ Cleanup error: {cleanup_error}")
+            self._progress('failed', version, error=str(e))
             return {'success': False, 'error': str(e), 'channel': self.current_channel}
     
     def _apply_update(self, version):
         """Apply update with improved version matching"""
         try:
             logging.info(f"🔄 Applying update: {version}")
+            self._progress('applying', version)
             
             if self.mock_mode:
                 logging.info(f"🔧 MOCK MODE: Would apply update {version}")
                 self._simulate_update_application(version)
+                self._progress('applied', version)
                 return {'success': True, 'version': version}
             
             # Find the downloaded update
@@ -446,12 +473,14 @@ class UpdateManager:
                 # Force garbage collection
                 gc.collect()
                 
+                self._progress('applied', version)
                 return {'success': True, 'version': version}
             else:
                 raise Exception("Update extraction failed")
                 
         except Exception as e:
             logging.error(f"❌ Apply error: {str(e)}")
+            self._progress('failed', version, error=str(e))
             return {'success': False, 'error': str(e)}
         
     def _extract_and_replace(self, zip_path):
@@ -609,6 +638,9 @@ class UpdateManager:
             
             # Update current environment
             os.environ[key] = value
+            
+            # Readers see the new value now rather than at the next .env check
+            self.config.reload()
             if self.config.app.debug:  
                 logging.info(f"Set {key}={value}")
             return True
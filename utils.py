@@ -1,17 +1,81 @@
 # utils.py
-import requests
 import os
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+import requests
 from packaging import version
+from library_index import LibraryIndex
+from library_pager import LibraryPager
+from library_records import MovieRecord, SeriesRecord
+from json_stream import iter_json_array
+from http_client import HttpClient
+from response_cache import ResponseCache
+from trending_prefetcher import TrendingPrefetcher
+from search_cache import SearchCache
+from single_flight import SingleFlight
+from image_cache import ImageCache
+from cache_store import create_store
+from tracing import traced, propagate
+
+# Backend display names for the search fan-out, keyed by media type
+SEARCH_BACKENDS = {'movie': 'Radarr', 'tv': 'Sonarr'}
+
+# Read size when streaming full library listings
+LIBRARY_CHUNK_SIZE = 64 * 1024
+
+# TMDB image settings change rarely; TMDB suggests refreshing them every few days
+TMDB_CONFIGURATION_TTL = 3 * 24 * 3600
+
+# Used until TMDB's /configuration has been fetched, and whenever it cannot be
+DEFAULT_TMDB_IMAGE_CONFIG = {
+    'secure_base_url': 'https://image.tmdb.org/t/p/',
+    'poster_sizes': ['w92', 'w154', 'w185', 'w342', 'w500', 'w780', 'original'],
+    'backdrop_sizes': ['w300', 'w780', 'w1280', 'original']
+}
+
+# Candidate used as the plain src for browsers without srcset support
+TMDB_DEFAULT_WIDTHS = {'poster': 342, 'backdrop': 780}
+
+# Radarr/Sonarr webhook events, by how they change the library index
+WEBHOOK_REFRESH_EVENTS = {
+    'radarr': {'MovieAdded', 'Download', 'Rename', 'MovieFileDelete'},
+    'sonarr': {'SeriesAdd', 'Download', 'Rename', 'EpisodeFileDelete'}
+}
+WEBHOOK_DELETE_EVENTS = {'radarr': {'MovieDelete'}, 'sonarr': {'SeriesDelete'}}
 
 class SharedUtils:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, http_client=None, events=None, metrics=None, tracer=None):
         self.config = config_manager
+        self.http = http_client or HttpClient(config_manager, metrics)
+        self.events = events
+        self.metrics = metrics
+        self.tracer = tracer
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="Upstream")
+        # Searches get their own pool, one Radarr and one Sonarr call per serving thread, so
+        # webhook patches, TMDB revalidation and trending prefetch never queue ahead of them
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=2 * max(1, config_manager.server.threads), thread_name_prefix="Search"
+        )
+        # None keeps every cache process-local; see attach_store for multi-worker serving
+        self.store = create_store(config_manager)
+        self.tmdb_cache = ResponseCache(config_manager, self.http, 'tmdb', self._executor, 'tmdb_cache', self.store)
+        self.trending = TrendingPrefetcher(config_manager, self.tmdb_cache, self._executor)
+        self.search_cache = SearchCache(config_manager)
+        self.images = ImageCache(config_manager, self.http)
+        self._library_flight = SingleFlight()
+        self.library_index = LibraryIndex(config_manager, {
+            'movie': self.get_radarr_movies,
+            'tv': self.get_sonarr_series
+        }, self.store, events, {
+            'movie': self.get_radarr_changes,
+            'tv': self.get_sonarr_changes
+        })
+        self.library_pager = LibraryPager(self.library_index)
     
-    def fetch_trending_optimized(self, media_type='all'):
-        """Memory-optimized trending data fetch"""
+    def fetch_trending_optimized(self, media_type='all', page=1):
+        """Memory-optimized trending data fetch, served from the prefetcher"""
         try:
             # Use attribute access instead of dict access
             api_key = self.config.tmdb.key
@@ -22,22 +86,10 @@ class SharedUtils:
             limit = 10
             
             if media_type in ['all', 'movie']:
-                with requests.get(
-                    "https://api.themoviedb.org/3/trending/movie/week",
-                    params={'api_key': api_key, 'language': 'en-GB'},
-                    timeout=5
-                ) as response:
-                    if response.status_code == 200:
-                        trending_data['movies'] = response.json().get('results', [])[:limit]
+                trending_data['movies'] = self.trending.get('movies', page)[:limit]
             
             if media_type in ['all', 'tv']:
-                with requests.get(
-                    "https://api.themoviedb.org/3/trending/tv/week", 
-                    params={'api_key': api_key, 'language': 'en-GB'},
-                    timeout=5
-                ) as response:
-                    if response.status_code == 200:
-                        trending_data['tv_shows'] = response.json().get('results', [])[:limit]
+                trending_data['tv_shows'] = self.trending.get('tv_shows', page)[:limit]
             
             return trending_data
             
@@ -45,18 +97,94 @@ class SharedUtils:
             logging.error(f"Error fetching trending data: {str(e)}")
             return {'movies': [], 'tv_shows': []}
     
-    def search_radarr(self, query):
-        url = f"{self.config.radarr.url}/api/v3/movie/lookup"
-        params = {'term': query, 'apikey': self.config.radarr.api_key}
-        response = requests.get(url, params=params)
-        return response.json()
+    def _lookup_options(self, deadline):
+        """Request options for a search lookup; under a deadline it is tried once and cannot outlive it"""
+        if not deadline:
+            return {'timeout': (self.config.http.connect_timeout, self.config.http.read_timeout)}
+        return {'timeout': (min(self.config.http.connect_timeout, deadline), deadline), 'retry': False}
+    
+    @traced
+    def search_radarr(self, query, timeout=None):
+        def lookup():
+            url = f"{self.config.radarr.url}/api/v3/movie/lookup"
+            params = {'term': query, 'apikey': self.config.radarr.api_key}
+            response = self.http.get('radarr', url, params=params, **self._lookup_options(timeout))
+            results = response.json()
+            # Tagged before caching; cached results are shared and not modified afterwards
+            for item in results if isinstance(results, list) else ():
+                item['media_type'] = 'movie'
+            return results
+        
+        return self.search_cache.get_or_fetch('radarr', query, lookup)
+    
+    @traced
+    def search_sonarr(self, query, timeout=None):
+        def lookup():
+            url = f"{self.config.sonarr.url}/api/v3/series/lookup"
+            params = {'term': query, 'apikey': self.config.sonarr.api_key}
+            response = self.http.get('sonarr', url, params=params, **self._lookup_options(timeout))
+            results = response.json()
+            # Tagged before caching; cached results are shared and not modified afterwards
+            for item in results if isinstance(results, list) else ():
+                item['media_type'] = 'tv'
+            return results
+        
+        return self.search_cache.get_or_fetch('sonarr', query, lookup)
+    
+    def search_as_completed(self, query):
+        """Search Radarr and Sonarr concurrently, yielding each side as it answers.
+        
+        Yields (media_type, results, problem) in completion order. problem is
+        None on success; a backend that failed ('failed') or missed the search
+        deadline ('timed_out') is yielded with results of None.
+        """
+        deadline = self.config.search.timeout
+        futures = {
+            self._search_executor.submit(propagate(self.search_radarr), query, deadline): 'movie',
+            self._search_executor.submit(propagate(self.search_sonarr), query, deadline): 'tv'
+        }
+        
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                pending.discard(future)
+                media_type = futures[future]
+                try:
+                    data = future.result()
+                except requests.exceptions.Timeout as e:
+                    logging.warning(f"{SEARCH_BACKENDS[media_type]} search timed out: {str(e)}")
+                    yield media_type, None, 'timed_out'
+                    continue
+                except Exception as e:
+                    logging.error(f"{SEARCH_BACKENDS[media_type]} search failed: {str(e)}")
+                    yield media_type, None, 'failed'
+                    continue
+                yield media_type, data if isinstance(data, list) else [], None
+        except FuturesTimeoutError:
+            for future in pending:
+                future.cancel()
+                logging.warning(f"{SEARCH_BACKENDS[futures[future]]} search timed out after {deadline}s")
+                yield futures[future], None, 'timed_out'
     
-    def search_sonarr(self, query):
-        url = f"{self.config.sonarr.url}/api/v3/series/lookup"
-        params = {'term': query, 'apikey': self.config.sonarr.api_key}
-        response = requests.get(url, params=params)
-        return response.json()
+    def search_all(self, query):
+        """Search Radarr and Sonarr concurrently, each under the search deadline.
+        
+        Returns the results per media type plus the names of backends that
+        missed the deadline ('unavailable') or answered with an error
+        ('failed'), so callers can render partial results.
+        """
+        results = {'movie': [], 'tv': [], 'unavailable': [], 'failed': []}
+        for media_type, data, problem in self.search_as_completed(query):
+            if problem == 'timed_out':
+                results['unavailable'].append(SEARCH_BACKENDS[media_type])
+            elif problem == 'failed':
+                results['failed'].append(SEARCH_BACKENDS[media_type])
+            else:
+                results[media_type] = data
+        
+        return results
     
+    @traced
     def add_to_radarr(self, tmdb_id):
         url = f"{self.config.radarr.url}/api/v3/movie"
         headers = {'Content-Type': 'application/json'}
@@ -67,19 +195,24 @@ class SharedUtils:
             'qualityProfileId': self.config.radarr.quality_profile_id,
             'addOptions': {'searchForMovie': True}
         }
-        response = requests.post(
+        response = self.http.post(
+            'radarr',
             url, 
             json=payload, 
             headers=headers,
             params={'apikey': self.config.radarr.api_key}
         )
-        return response.status_code in [200, 201]
+        if response.status_code in [200, 201]:
+            self.library_index.upsert('movie', MovieRecord.from_json(response.json()))
+            return True
+        return False
     
+    @traced
     def add_to_sonarr(self, tvdb_id):
         lookup_url = f"{self.config.sonarr.url}/api/v3/series/lookup"
         params = {'term': f'tvdb:{tvdb_id}', 'apikey': self.config.sonarr.api_key}
         
-        lookup_res = requests.get(lookup_url, params=params)
+        lookup_res = self.http.get('sonarr', lookup_url, params=params)
         if lookup_res.status_code != 200:
             return False
         
@@ -97,32 +230,166 @@ class SharedUtils:
             'seriesType': 'standard'
         }
         
-        response = requests.post(
+        response = self.http.post(
+            'sonarr',
             f"{self.config.sonarr.url}/api/v3/series",
             json=payload,
             params={'apikey': self.config.sonarr.api_key}
         )
         
-        return response.status_code in [200, 201]
+        if response.status_code in [200, 201]:
+            self.library_index.upsert('tv', SeriesRecord.from_json(response.json()))
+            return True
+        return False
     
+    @traced
     def get_radarr_movies(self):
+        """Full Radarr library as MovieRecords; concurrent callers share one download"""
+        return self._library_flight.do('radarr', self._fetch_radarr_movies)
+    
+    def _fetch_radarr_movies(self):
         url = f"{self.config.radarr.url}/api/v3/movie"
-        response = requests.get(url, params={'apikey': self.config.radarr.api_key})
-        return response.json()
+        return self._fetch_library('radarr', url, self.config.radarr.api_key, MovieRecord)
     
+    @traced
     def get_sonarr_series(self):
+        """Full Sonarr library as SeriesRecords; concurrent callers share one download"""
+        return self._library_flight.do('sonarr', self._fetch_sonarr_series)
+    
+    def _fetch_sonarr_series(self):
         url = f"{self.config.sonarr.url}/api/v3/series"
-        response = requests.get(url, params={'apikey': self.config.sonarr.api_key})
-        return response.json()
+        return self._fetch_library('sonarr', url, self.config.sonarr.api_key, SeriesRecord)
+    
+    def _fetch_library(self, backend, url, api_key, record_type):
+        """Stream a full library listing, projecting each item as soon as it is parsed.
+        
+        Neither the whole body nor the whole parsed document is ever held, so the
+        peak during a refresh stays close to the size of the records themselves.
+        """
+        with self.http.get(backend, url, params={'apikey': api_key}, stream=True) as response:
+            response.raise_for_status()
+            items = iter_json_array(
+                response.iter_content(chunk_size=LIBRARY_CHUNK_SIZE),
+                f"{backend} library"
+            )
+            return [record_type.from_json(item) for item in items]
+    
+    def get_radarr_movie(self, movie_id):
+        """One Radarr movie as a MovieRecord, or None if Radarr no longer has it"""
+        url = f"{self.config.radarr.url}/api/v3/movie/{movie_id}"
+        with self.http.get('radarr', url, params={'apikey': self.config.radarr.api_key}) as response:
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return MovieRecord.from_json(response.json())
     
+    def get_sonarr_series_item(self, series_id):
+        """One Sonarr series as a SeriesRecord, or None if Sonarr no longer has it"""
+        url = f"{self.config.sonarr.url}/api/v3/series/{series_id}"
+        with self.http.get('sonarr', url, params={'apikey': self.config.sonarr.api_key}) as response:
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return SeriesRecord.from_json(response.json())
+    
+    def get_arr_history_since(self, backend, since):
+        """Radarr/Sonarr history records newer than `since` (epoch seconds)"""
+        settings = self.config.radarr if backend == 'radarr' else self.config.sonarr
+        params = {
+            'date': datetime.fromtimestamp(since, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'apikey': settings.api_key
+        }
+        with self.http.get(backend, f"{settings.url}/api/v3/history/since", params=params) as response:
+            response.raise_for_status()
+            records = response.json()
+        return records if isinstance(records, list) else []
+    
+    def get_radarr_changes(self, since):
+        """Movies in Radarr's history since `since`, as {movie_id: MovieRecord or None if deleted}"""
+        movie_ids = {record.get('movieId') for record in self.get_arr_history_since('radarr', since)}
+        return {movie_id: self.get_radarr_movie(movie_id) for movie_id in movie_ids if movie_id}
+    
+    def get_sonarr_changes(self, since):
+        """Series in Sonarr's history since `since`, as {series_id: SeriesRecord or None if deleted}"""
+        series_ids = {record.get('seriesId') for record in self.get_arr_history_since('sonarr', since)}
+        return {series_id: self.get_sonarr_series_item(series_id) for series_id in series_ids if series_id}
+    
+    def queue_arr_webhook(self, backend, payload):
+        """Apply a webhook on the upstream pool so the arr gets its answer immediately"""
+        def apply():
+            try:
+                self.handle_arr_webhook(backend, payload)
+            except Exception as e:
+                logging.error(f"Error applying {backend} webhook {payload.get('eventType')}: {str(e)}")
+        
+        self._executor.submit(apply)
+    
+    def handle_arr_webhook(self, backend, payload):
+        """Patch the library index for the one item a Radarr/Sonarr webhook is about.
+        
+        Adds, imports, renames and file deletions re-read just that item from
+        the arr; deletions drop it. Other events (grabs, health) are ignored.
+        """
+        event_type = payload.get('eventType')
+        media_type = 'movie' if backend == 'radarr' else 'tv'
+        # Any delivery, including Radarr/Sonarr's "Test" button, shows pushes are wired up
+        self.library_index.mark_pushed(media_type)
+        
+        item = payload.get('movie' if backend == 'radarr' else 'series') or {}
+        external_id = item.get('tmdbId' if backend == 'radarr' else 'tvdbId')
+        
+        if event_type in WEBHOOK_DELETE_EVENTS[backend]:
+            if external_id:
+                self.library_index.remove(media_type, external_id)
+            return
+        
+        if event_type not in WEBHOOK_REFRESH_EVENTS[backend] or not item.get('id'):
+            if self.config.app.debug:
+                logging.debug(f"Ignoring {backend} webhook event {event_type}")
+            return
+        
+        fetch = self.get_radarr_movie if backend == 'radarr' else self.get_sonarr_series_item
+        record = fetch(item['id'])
+        if record is None:
+            if external_id:
+                self.library_index.remove(media_type, external_id)
+        else:
+            self.library_index.upsert(media_type, record)
+        
+        if self.config.app.debug:
+            logging.debug(f"Applied {backend} webhook event {event_type} for {item.get('title')}")
+    
+    def get_library_status(self, media_type, external_id):
+        """Summarise whether an item is in the library, straight from the index"""
+        record = self.library_index.get(media_type, external_id)
+        if not record:
+            return {'in_library': False}
+        
+        status = {
+            'in_library': True,
+            'internal_id': record.id,
+            'monitored': record.monitored
+        }
+        if media_type == 'movie':
+            status['has_file'] = record.has_file
+        else:
+            status['episode_file_count'] = record.episode_file_count
+            status['episode_count'] = record.episode_count
+        return status
+    
+    @traced
     def get_radarr_details(self, tmdb_id):
-        existing_url = f"{self.config.radarr.url}/api/v3/movie"
-        existing = requests.get(existing_url, params={'apikey': self.config.radarr.api_key}).json()
+        movie = self.library_index.get('movie', tmdb_id)
         
-        for movie in existing:
-            if str(movie.get('tmdbId')) == str(tmdb_id):
-                movie_url = f"{self.config.radarr.url}/api/v3/movie/{movie['id']}"
-                full_details = requests.get(movie_url, params={'apikey': self.config.radarr.api_key}).json()
+        if movie:
+            movie_url = f"{self.config.radarr.url}/api/v3/movie/{movie.id}"
+            response = self.http.get('radarr', movie_url, params={'apikey': self.config.radarr.api_key})
+            
+            if response.status_code == 404:
+                # Removed from Radarr since the index was built
+                self.library_index.remove('movie', tmdb_id)
+            else:
+                full_details = response.json()
                 
                 if 'images' not in full_details:
                     full_details['images'] = []
@@ -141,7 +408,7 @@ class SharedUtils:
                 }
         
         lookup_url = f"{self.config.radarr.url}/api/v3/movie/lookup/tmdb"
-        lookup = requests.get(lookup_url, params={
+        lookup = self.http.get('radarr', lookup_url, params={
             'tmdbId': tmdb_id,
             'apikey': self.config.radarr.api_key
         }).json()
@@ -165,14 +432,19 @@ class SharedUtils:
             'monitored': False
         }
     
+    @traced
     def get_sonarr_details(self, tvdb_id):
-        existing_url = f"{self.config.sonarr.url}/api/v3/series"
-        existing = requests.get(existing_url, params={'apikey': self.config.sonarr.api_key}).json()
+        series = self.library_index.get('tv', tvdb_id)
         
-        for series in existing:
-            if str(series.get('tvdbId')) == str(tvdb_id):
-                status_url = f"{self.config.sonarr.url}/api/v3/series/{series['id']}"
-                details = requests.get(status_url, params={'apikey': self.config.sonarr.api_key}).json()
+        if series:
+            status_url = f"{self.config.sonarr.url}/api/v3/series/{series.id}"
+            response = self.http.get('sonarr', status_url, params={'apikey': self.config.sonarr.api_key})
+            
+            if response.status_code == 404:
+                # Removed from Sonarr since the index was built
+                self.library_index.remove('tv', tvdb_id)
+            else:
+                details = response.json()
                 
                 return {
                     'status': 'existing',
@@ -185,7 +457,7 @@ class SharedUtils:
                 }
         
         lookup_url = f"{self.config.sonarr.url}/api/v3/series/lookup"
-        lookup = requests.get(lookup_url, params={
+        lookup = self.http.get('sonarr', lookup_url, params={
             'term': f'tvdb:{tvdb_id}',
             'apikey': self.config.sonarr.api_key
         }).json()
@@ -201,23 +473,25 @@ class SharedUtils:
         
         return {'error': 'Series not found'}
     
+    @traced
     def get_tmdb_media_details(self, media_type, tmdb_id):
-        base_url = f"https://api.themoviedb.org/3/{media_type}/{tmdb_id}"
+        base_url = f"{self.config.tmdb.api_url}/{media_type}/{tmdb_id}"
         params = {
             'api_key': self.config.tmdb.key,
             'language': 'en-GB',
             'append_to_response': 'videos,images'
         }
         
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        # Cached and shared between callers - read only
+        data = self.tmdb_cache.get_json(base_url, params=params)
         
         result = {
             'title': data.get('name') or data.get('title'),
             'overview': data.get('overview'),
             'poster_path': data.get('poster_path'),
             'backdrop_path': data.get('backdrop_path'),
+            'poster': self.tmdb_image_candidates(data.get('poster_path'), 'poster'),
+            'backdrop': self.tmdb_image_candidates(data.get('backdrop_path'), 'backdrop'),
             'vote_average': data.get('vote_average'),
             'genres': [g['name'] for g in data.get('genres', [])],
             'first_air_date': data.get('first_air_date'),
@@ -237,6 +511,69 @@ class SharedUtils:
         
         return result
 
+    def get_tmdb_image_config(self):
+        """Image base URL and size buckets from TMDB's /configuration endpoint (cached)"""
+        try:
+            data = self.tmdb_cache.get_json(
+                f"{self.config.tmdb.api_url}/configuration",
+                params={'api_key': self.config.tmdb.key},
+                ttl=TMDB_CONFIGURATION_TTL
+            )
+            images = data.get('images') or {}
+            if images.get('secure_base_url'):
+                return images
+        except Exception as e:
+            logging.warning(f"Using default TMDB image sizes: {str(e)}")
+        return DEFAULT_TMDB_IMAGE_CONFIG
+    
+    def tmdb_image_candidates(self, path, kind='poster'):
+        """Ready-made srcset for a TMDB image path across TMDB's width buckets"""
+        if not path:
+            return None
+        
+        images = self.get_tmdb_image_config()
+        base_url = images.get('secure_base_url') or DEFAULT_TMDB_IMAGE_CONFIG['secure_base_url']
+        sizes = images.get(f"{kind}_sizes") or DEFAULT_TMDB_IMAGE_CONFIG[f"{kind}_sizes"]
+        
+        # Only width buckets can be described in a srcset; "original" has no known width
+        candidates = [
+            {'width': int(size[1:]), 'url': f"{base_url}{size}{path}"}
+            for size in sizes
+            if size.startswith('w') and size[1:].isdigit()
+        ]
+        candidates.sort(key=lambda c: c['width'])
+        original = f"{base_url}original{path}"
+        
+        default_width = TMDB_DEFAULT_WIDTHS[kind]
+        src = next((c['url'] for c in candidates if c['width'] >= default_width),
+                   candidates[-1]['url'] if candidates else original)
+        
+        return {
+            'src': src,
+            'srcset': ', '.join(f"{c['url']} {c['width']}w" for c in candidates),
+            'candidates': candidates,
+            'original': original
+        }
+
+    def attach_store(self, store):
+        """Share the library index, TMDB responses, live events, metrics and the slow request log with other worker processes"""
+        if store is None:
+            return
+        self.store = store
+        self.tmdb_cache.attach_store(store)
+        self.library_index.attach_store(store)
+        if self.events is not None:
+            self.events.attach_store(store)
+        if self.metrics is not None:
+            self.metrics.attach_store(store)
+        if self.tracer is not None:
+            self.tracer.attach_store(store)
+
+    def shutdown(self):
+        """Stop the upstream worker pools"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._search_executor.shutdown(wait=False, cancel_futures=True)
+
     def check_auth(self, username, password):
         """Check authentication"""
         if not self.config.auth.enabled:
@@ -0,0 +1,179 @@
+"""Production entry point.
+
+    python wsgi.py
+
+Serves Addarr with gunicorn using SERVER_WORKERS processes of SERVER_THREADS
+threads each. Where gunicorn is unavailable (Windows) it falls back to
+waitress, which runs a single process with SERVER_THREADS threads.
+
+`python app.py` keeps using the Flask development server.
+"""
+import os
+import sys
+import signal
+import logging
+import tempfile
+import threading
+
+import app as addarr
+from cache_store import create_store
+
+application = addarr.app
+CONFIG = addarr.CONFIG
+
+# Held open for the life of the worker that runs the background services
+_leader_lock = None
+
+def _acquire_leader_lock():
+    """Try to become the one worker that runs the background services.
+
+    The lock is an flock on a per-port file, released by the OS when its
+    holder exits, so a replacement worker takes over from a crashed one.
+    """
+    import fcntl
+
+    path = os.path.join(tempfile.gettempdir(), f"addarr-{CONFIG.app.port}.leader.lock")
+    handle = open(path, 'a+')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+
+    handle.seek(0)
+    handle.truncate()
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+# ============ GUNICORN HOOKS ============
+
+def on_starting(server):
+    """Master, before any worker exists: updates and tunnel run once here"""
+    if not addarr.run_startup_checks():
+        sys.exit(0)
+
+def when_ready(server):
+    addarr.print_welcome()
+
+def post_fork(server, worker):
+    # The tunnel belongs to the master; workers only inherit its public URL
+    addarr.tunnel_process = None
+    # The master's startup checks may have left keep-alive sockets in the pool
+    addarr.http_client.reset_after_fork()
+
+def post_worker_init(worker):
+    global _leader_lock
+    # Every worker holds its own caches, so every worker governs its own memory
+    addarr.memory_manager.start(processes=CONFIG.server.workers)
+    addarr.events.server_threads = CONFIG.server.threads
+    _end_streams_on_exit(worker)
+    _leader_lock = _acquire_leader_lock()
+    if _leader_lock:
+        logging.info(f"Worker {os.getpid()} is running the background services")
+        addarr.start_background_services()
+
+def _end_streams_on_exit(worker):
+    """End SSE streams as soon as the worker is told to stop.
+
+    worker_exit only runs once open requests have finished, and a stream
+    left open would hold the worker for the whole SERVER_GRACEFUL_TIMEOUT.
+    """
+    handle_exit = worker.handle_exit
+
+    def exit_and_end_streams(signum, frame):
+        handle_exit(signum, frame)
+        # Not in the signal handler itself: stopping the bus joins its relay thread
+        threading.Thread(target=addarr.events.stop, daemon=True, name="EndEventStreams").start()
+
+    worker.handle_exit = exit_and_end_streams
+    signal.signal(signal.SIGTERM, exit_and_end_streams)
+    # As gunicorn set it up: the signal must not interrupt system calls of active requests
+    signal.siginterrupt(signal.SIGTERM, False)
+
+def worker_exit(server, worker):
+    addarr.shutdown_sequence()
+
+def on_exit(server):
+    addarr.shutdown_sequence()
+
+def _gunicorn_options():
+    return {
+        'bind': f"0.0.0.0:{CONFIG.app.port}",
+        'workers': CONFIG.server.workers,
+        'threads': CONFIG.server.threads,
+        'worker_class': 'gthread',
+        'timeout': CONFIG.server.timeout,
+        'graceful_timeout': CONFIG.server.graceful_timeout,
+        'max_requests': CONFIG.server.max_requests,
+        'max_requests_jitter': CONFIG.server.max_requests // 10,
+        # Workers are forked from the already imported app so they share its secret key
+        'preload_app': True,
+        'accesslog': '-' if CONFIG.app.debug else None,
+        'on_starting': on_starting,
+        'when_ready': when_ready,
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+        'on_exit': on_exit
+    }
+
+def serve_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    # Workers share one copy of the library and TMDB caches instead of warming their own
+    addarr.utils.attach_store(create_store(CONFIG, processes=CONFIG.server.workers))
+
+    class AddarrServer(BaseApplication):
+        def __init__(self, wsgi_app, options):
+            self.application = wsgi_app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    AddarrServer(application, _gunicorn_options()).run()
+
+def serve_waitress():
+    from waitress import serve
+
+    addarr.memory_manager.start()
+    if not addarr.run_startup_checks():
+        return
+    addarr.events.server_threads = CONFIG.server.threads
+    addarr.start_background_services()
+    addarr.print_welcome()
+
+    def stop(signum, frame):
+        addarr.shutdown_sequence()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    if CONFIG.server.workers > 1:
+        logging.warning("waitress serves from a single process; SERVER_WORKERS is ignored")
+    serve(application, host='0.0.0.0', port=CONFIG.app.port, threads=CONFIG.server.threads)
+
+def main():
+    try:
+        import fcntl  # noqa: F401 - gunicorn needs a POSIX platform
+        import gunicorn  # noqa: F401
+    except ImportError:
+        try:
+            import waitress  # noqa: F401
+        except ImportError:
+            print("❌ No production server available - install: pip install gunicorn (or waitress on Windows)")
+            sys.exit(1)
+        serve_waitress()
+        return
+
+    serve_gunicorn()
+
+if __name__ == '__main__':
+    main()